@@ -1,15 +1,19 @@
 from functools import wraps
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 
 
+# Each role decorator also does login_required's job (redirect to LOGIN_URL with ?next=),
+# so views need only the one decorator.
+
 def super_admin_required(view_func):
     """Decorator that requires super_admin role."""
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            return redirect('accounts:login')
+            return redirect_to_login(request.get_full_path())
         if request.user.role != 'super_admin':
             messages.error(request, _('You do not have permission to access this page.'))
             return redirect('accounts:dashboard')
@@ -22,7 +26,7 @@ def teacher_or_admin_required(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            return redirect('accounts:login')
+            return redirect_to_login(request.get_full_path())
         if request.user.role not in ['super_admin', 'teacher']:
             messages.error(request, _('You do not have permission to access this page.'))
             return redirect('accounts:dashboard')
@@ -35,7 +39,7 @@ def student_required(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            return redirect('accounts:login')
+            return redirect_to_login(request.get_full_path())
         if request.user.role != 'student':
             messages.error(request, _('This page is for students only.'))
             return redirect('accounts:dashboard')
@@ -49,7 +53,7 @@ def role_required(allowed_roles):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
             if not request.user.is_authenticated:
-                return redirect('accounts:login')
+                return redirect_to_login(request.get_full_path())
             if request.user.role not in allowed_roles:
                 messages.error(request, _('You do not have permission to access this page.'))
                 return redirect('accounts:dashboard')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:37
+
+from django.db import migrations
+
+# Trigram indexes on UPPER(column), matching how icontains is compiled on PostgreSQL,
+# let those searches use an index instead of a sequential scan.
+# Other backends (e.g. SQLite in development) have no equivalent, so this is a no-op there.
+TRIGRAM_INDEXES = [
+    ('user_first_name_trgm', 'accounts_user', 'first_name'),
+    ('user_last_name_trgm', 'accounts_user', 'last_name'),
+    ('user_email_trgm', 'accounts_user', 'email'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_name_upper_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
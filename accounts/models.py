@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 
@@ -88,6 +89,10 @@ class User(AbstractUser):
         verbose_name = _('User')
         verbose_name_plural = _('Users')
         ordering = ['-created_at']
+        indexes = [
+            # Case-insensitive name lookups when linking master students to accounts
+            models.Index(Upper('first_name'), Upper('last_name'), name='user_name_upper_idx'),
+        ]
     
     def __str__(self):
         return self.get_full_name() or self.email
@@ -159,7 +159,6 @@ def password_change_view(request):
 
 # ============ Admin User Management ============
 
-@login_required
 @super_admin_required
 def users_list_view(request):
     """List all users with filtering."""
@@ -190,7 +189,6 @@ def users_list_view(request):
     return render(request, 'accounts/users_list.html', context)
 
 
-@login_required
 @super_admin_required
 def teacher_create_view(request):
     """Create new teacher."""
@@ -210,7 +208,6 @@ def teacher_create_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def teacher_edit_view(request, pk):
     """Edit existing teacher."""
@@ -233,7 +230,6 @@ def teacher_edit_view(request, pk):
     })
 
 
-@login_required
 @super_admin_required
 def admin_create_view(request):
     """Create new admin."""
@@ -253,7 +249,6 @@ def admin_create_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def admin_edit_view(request, pk):
     """Edit existing admin."""
@@ -281,7 +276,6 @@ def admin_edit_view(request, pk):
     })
 
 
-@login_required
 @super_admin_required
 def user_delete_view(request, pk):
     """Delete user (soft delete for data preservation)."""
@@ -301,7 +295,6 @@ def user_delete_view(request, pk):
     return render(request, 'accounts/user_confirm_delete.html', {'user_obj': user})
 
 
-@login_required
 @super_admin_required
 def admin_reset_password_view(request, pk):
     """Admin resets a user's password."""
@@ -76,6 +76,19 @@ DATABASES = {
     }
 }
 
+# Cache - shared by all worker processes and management commands, so cache
+# generation bumps, ETags and warm_analytics_cache results are seen everywhere.
+# The table is created by the analytics migrations (or `manage.py createcachetable`).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -97,6 +110,13 @@ AUTH_PASSWORD_VALIDATORS = [
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Loads request.user together with its primary school. ModelBackend stays listed
+# so sessions created before SchoolModelBackend was added still resolve
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.SchoolModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Internationalization - Multi-language support
 LANGUAGE_CODE = 'en'
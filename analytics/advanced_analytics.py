@@ -10,10 +10,12 @@ Provides data generators for:
 - Grade Distribution
 """
 
-import json
+import hashlib
 from decimal import Decimal
 from collections import defaultdict
-from django.db.models import Avg, Count, Max, Min, Sum, Q
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, Sum, Q, Value
+from django.db.models.functions import Floor, Least
 from django.utils import timezone
 
 from zipgrade.models import ZipGradeExam, ExamResult, SubjectSplit, SubjectResult
@@ -24,6 +26,55 @@ from schools.models import Subject, MasterStudent
 class AdvancedAnalyticsHelper:
     """Advanced analytics calculations for deep-dive visualizations."""
     
+    CACHE_TIMEOUT = 3600
+    
+    # ========== Caching ==========
+    
+    @staticmethod
+    def get_cached(prefix, compute, exam_ids, *key_parts, refresh=False):
+        """
+        Return compute() cached for the given exam selection and key parts.
+        Keys include the analytics cache generation, so entries are dropped when results change.
+        With refresh, recompute and store even if an entry exists (used by warm_analytics_cache).
+        """
+        from .utils import AnalyticsHelper
+        
+        exam_key = hashlib.md5(
+            ','.join(str(x) for x in sorted(set(exam_ids))).encode()
+        ).hexdigest()
+        cache_key = ':'.join(
+            [prefix, str(AnalyticsHelper.get_cache_generation())] +
+            [str(part) for part in key_parts] + [exam_key]
+        )
+        if refresh:
+            value = compute()
+            cache.set(cache_key, value, AdvancedAnalyticsHelper.CACHE_TIMEOUT)
+            return value
+        return cache.get_or_set(cache_key, compute, AdvancedAnalyticsHelper.CACHE_TIMEOUT)
+    
+    @staticmethod
+    def get_student_deep_dive(student_id, exam_ids, source='zipgrade', refresh=False):
+        """Get cached radar, trend, competency gap and weakest areas data for a student."""
+        helper = AdvancedAnalyticsHelper
+        return (
+            helper.get_cached(
+                'radar', lambda: helper.get_student_radar_data(student_id, exam_ids, source=source),
+                exam_ids, student_id, source, refresh=refresh
+            ),
+            helper.get_cached(
+                'trend', lambda: helper.get_progressive_trend(student_id, exam_ids, source=source),
+                exam_ids, student_id, source, refresh=refresh
+            ),
+            helper.get_cached(
+                'gap', lambda: helper.get_competency_gap(student_id, exam_ids, source=source),
+                exam_ids, student_id, source, refresh=refresh
+            ),
+            helper.get_cached(
+                'weakest', lambda: helper.get_weakest_areas(student_id, exam_ids, source=source),
+                exam_ids, student_id, source, refresh=refresh
+            ),
+        )
+    
     # ========== Multi-Exam Selection & Normalization ==========
     
     @staticmethod
@@ -83,14 +134,14 @@ class AdvancedAnalyticsHelper:
             if student_id:
                 filters['result__student_id'] = student_id
             
+            # Only the three columns summed below, not whole result rows
             subject_results = SubjectResult.objects.filter(
                 **filters
-            ).select_related('subject_split__subject')
+            ).values_list('subject_split__subject__name', 'earned_points', 'max_points')
             
-            for sr in subject_results:
-                subject_name = sr.subject_split.subject.name
-                aggregated[subject_name]['earned'] += float(sr.earned_points)
-                aggregated[subject_name]['max'] += float(sr.max_points)
+            for subject_name, earned_points, max_points in subject_results:
+                aggregated[subject_name]['earned'] += float(earned_points)
+                aggregated[subject_name]['max'] += float(max_points)
                 aggregated[subject_name]['count'] += 1
         
         # Calculate percentages
@@ -144,25 +195,23 @@ class AdvancedAnalyticsHelper:
             student_results = SubjectResult.objects.filter(
                 result__exam_id__in=exam_ids,
                 result__student_id=student_id
-            ).select_related('subject_split__subject')
+            ).values_list('subject_split__subject__name', 'earned_points', 'max_points')
             
             # Aggregate by subject
             student_scores = defaultdict(lambda: {'earned': 0, 'max': 0})
-            for sr in student_results:
-                subject_name = sr.subject_split.subject.name
-                student_scores[subject_name]['earned'] += float(sr.earned_points)
-                student_scores[subject_name]['max'] += float(sr.max_points)
+            for subject_name, earned_points, max_points in student_results:
+                student_scores[subject_name]['earned'] += float(earned_points)
+                student_scores[subject_name]['max'] += float(max_points)
             
             # Get class averages for same subjects
             all_results = SubjectResult.objects.filter(
                 result__exam_id__in=exam_ids
-            ).select_related('subject_split__subject')
+            ).values_list('subject_split__subject__name', 'earned_points', 'max_points')
             
             class_scores = defaultdict(lambda: {'earned': 0, 'max': 0, 'count': 0})
-            for sr in all_results:
-                subject_name = sr.subject_split.subject.name
-                class_scores[subject_name]['earned'] += float(sr.earned_points)
-                class_scores[subject_name]['max'] += float(sr.max_points)
+            for subject_name, earned_points, max_points in all_results:
+                class_scores[subject_name]['earned'] += float(earned_points)
+                class_scores[subject_name]['max'] += float(max_points)
                 class_scores[subject_name]['count'] += 1
             
             # Build radar data
@@ -202,41 +251,47 @@ class AdvancedAnalyticsHelper:
         if school:
             filters['result__exam__school'] = school
         
-        subject_results = SubjectResult.objects.filter(
-            **filters
-        ).select_related('result__student', 'subject_split__subject', 'result')
+        subject_results = SubjectResult.objects.filter(**filters)
         
-        # Filter by grade/section if specified
-        if grade or section:
-            filtered_results = []
-            for sr in subject_results:
-                student = sr.result.student
-                if student:
-                    if grade and str(student.grade) != str(grade):
-                        continue
-                    if section and student.section != section:
-                        continue
-                filtered_results.append(sr)
-            subject_results = filtered_results
+        # Filter by grade/section if specified (results without a linked student are kept)
+        if grade:
+            subject_results = subject_results.filter(
+                Q(result__student__isnull=True) | Q(result__student__grade=grade)
+            )
+        if section:
+            subject_results = subject_results.filter(
+                Q(result__student__isnull=True) | Q(result__student__section=section)
+            )
         
-        # Build matrix
+        # Student names, in result order
         students = {}  # student_id -> name
+        for result in ExamResult.objects.filter(
+            pk__in=subject_results.values('result_id')
+        ).select_related('student').order_by('pk'):
+            students[result.student_id or result.zipgrade_student_id] = result.display_name
+        
+        # Sum earned/max points per student and topic in the database
+        topic_totals = subject_results.values(
+            'result__student_id', 'result__zipgrade_student_id', 'subject_split__subject__name'
+        ).annotate(
+            earned=Sum('earned_points'),
+            max=Sum('max_points')
+        ).order_by()
+        
+        # Build matrix
         topics = set()
         matrix = defaultdict(dict)  # student_id -> {topic: percentage}
         
-        for sr in subject_results:
-            student_id = sr.result.student_id or sr.result.zipgrade_student_id
-            student_name = sr.result.display_name
-            topic = sr.subject_split.subject.name
-            
-            students[student_id] = student_name
+        for row in topic_totals:
+            student_id = row['result__student_id'] or row['result__zipgrade_student_id']
+            topic = row['subject_split__subject__name']
             topics.add(topic)
             
             if topic not in matrix[student_id]:
                 matrix[student_id][topic] = {'earned': 0, 'max': 0}
             
-            matrix[student_id][topic]['earned'] += float(sr.earned_points)
-            matrix[student_id][topic]['max'] += float(sr.max_points)
+            matrix[student_id][topic]['earned'] += float(row['earned'] or 0)
+            matrix[student_id][topic]['max'] += float(row['max'] or 0)
         
         # Convert to percentages
         topics_list = sorted(list(topics))
@@ -277,21 +332,18 @@ class AdvancedAnalyticsHelper:
         analysis = {}
         
         if source == 'zipgrade':
-            # Get all results with answers
-            results = ExamResult.objects.filter(exam_id=exam_id)
+            # Only the answers column is needed, already decoded by the JSONField
+            all_answers = ExamResult.objects.filter(exam_id=exam_id).values_list('answers', flat=True)
             
-            # Parse answers JSON and aggregate
+            # Aggregate answer choices per question
             question_answers = defaultdict(lambda: defaultdict(int))
             
-            for result in results:
-                if result.answers:
-                    try:
-                        answers = json.loads(result.answers) if isinstance(result.answers, str) else result.answers
-                        for q_num, answer in answers.items():
-                            if answer:  # Skip blank answers
-                                question_answers[q_num][str(answer).upper()] += 1
-                    except (json.JSONDecodeError, TypeError):
-                        continue
+            for answers in all_answers:
+                if not isinstance(answers, dict):
+                    continue
+                for q_num, answer in answers.items():
+                    if answer:  # Skip blank answers
+                        question_answers[q_num][str(answer).upper()] += 1
             
             # Build analysis with misconception detection
             for q_num, answer_counts in question_answers.items():
@@ -520,20 +572,30 @@ class AdvancedAnalyticsHelper:
         
         if source == 'zipgrade':
             results = ExamResult.objects.filter(exam_id__in=exam_ids)
-            scores = [float(r.percentage) for r in results]
         else:
-            attempts = ExamAttempt.objects.filter(
+            results = ExamAttempt.objects.filter(
                 exam_id__in=exam_ids,
                 status='completed'
             )
-            scores = [float(a.percentage) for a in attempts]
         
-        # Count frequencies
-        for score in scores:
-            bucket_idx = min(int(score // bucket_size), len(buckets) - 1)
-            frequencies[bucket_idx] += 1
+        # Count frequencies per bucket in the database
+        bucket_counts = results.annotate(
+            bucket=Least(
+                Floor(F('percentage') / bucket_size),
+                Value(len(buckets) - 1),
+                output_field=IntegerField()
+            )
+        ).values('bucket').annotate(count=Count('id')).order_by()
+        for row in bucket_counts:
+            frequencies[int(row['bucket'])] += row['count']
+        
+        summary = results.aggregate(
+            mean=Avg('percentage'),
+            max=Max('percentage'),
+            min=Min('percentage')
+        )
         
-        total = len(scores)
+        total = sum(frequencies)
         percentages = [round((f / total) * 100, 1) if total > 0 else 0 for f in frequencies]
         
         return {
@@ -541,9 +603,9 @@ class AdvancedAnalyticsHelper:
             'frequencies': frequencies,
             'percentages': percentages,
             'total': total,
-            'mean': round(sum(scores) / total, 1) if total > 0 else 0,
-            'max': max(scores) if scores else 0,
-            'min': min(scores) if scores else 0
+            'mean': round(float(summary['mean']), 1) if total > 0 else 0,
+            'max': float(summary['max']) if total > 0 else 0,
+            'min': float(summary['min']) if total > 0 else 0
         }
     
     # ========== Drill-Down Helpers ==========
@@ -557,24 +619,20 @@ class AdvancedAnalyticsHelper:
         missed = []
         
         if source == 'zipgrade':
-            result = ExamResult.objects.filter(
+            answers = ExamResult.objects.filter(
                 exam_id=exam_id,
                 student_id=student_id
-            ).first()
+            ).values_list('answers', flat=True).first()
             
-            if result and result.answers:
-                try:
-                    answers = json.loads(result.answers) if isinstance(result.answers, str) else result.answers
-                    # Note: We'd need answer key data to determine correct answers
-                    # For now, return the raw answers
-                    for q_num, answer in answers.items():
-                        # Mark questions with no answer or specific incorrect markers
-                        missed.append({
-                            'question_num': q_num,
-                            'student_answer': answer,
-                        })
-                except (json.JSONDecodeError, TypeError):
-                    pass
+            if isinstance(answers, dict):
+                # Note: We'd need answer key data to determine correct answers
+                # For now, return the raw answers
+                for q_num, answer in answers.items():
+                    # Mark questions with no answer or specific incorrect markers
+                    missed.append({
+                        'question_num': q_num,
+                        'student_answer': answer,
+                    })
         else:
             attempt = ExamAttempt.objects.filter(
                 exam_id=exam_id,
@@ -0,0 +1,43 @@
+import hashlib
+from functools import wraps
+from django.contrib import messages
+from django.utils import translation
+from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_cookie
+
+from .utils import AnalyticsHelper
+
+
+def analytics_cache_page(timeout):
+    """
+    Decorator that caches GET responses of an analytics page per user session.
+    The cache key includes the analytics cache generation, so cached pages are
+    dropped whenever results change (see analytics.signals).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # Never cache POSTs or pages that would render one-off flash messages
+            if request.method != 'GET' or len(messages.get_messages(request)):
+                return view_func(request, *args, **kwargs)
+            key_prefix = f'analytics.{AnalyticsHelper.get_cache_generation()}'
+            cached_view = cache_page(timeout, key_prefix=key_prefix)(vary_on_cookie(view_func))
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def analytics_etag(request, *args, **kwargs):
+    """
+    ETag for analytics pages, for use with django.views.decorators.http.condition.
+    Changes whenever analytics data changes (cache generation), or the user, language or query differ.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    key = '|'.join([
+        str(AnalyticsHelper.get_cache_generation()),
+        str(request.user.pk),
+        translation.get_language() or '',
+        request.get_full_path(),
+    ])
+    return hashlib.md5(key.encode()).hexdigest()
@@ -0,0 +1,71 @@
+"""
+Management command to precompute the advanced analytics cache.
+Run it periodically (e.g. hourly from cron) so class heatmaps and
+student deep-dive pages are served from the cache. Entries are written to
+the shared cache in settings.CACHES and recomputed on every run, so they
+do not expire between runs.
+"""
+from django.core.management.base import BaseCommand
+
+from analytics.advanced_analytics import AdvancedAnalyticsHelper
+from analytics.utils import AnalyticsHelper
+from schools.models import School
+from zipgrade.models import ExamResult, ZipGradeExam
+
+
+class Command(BaseCommand):
+    help = 'Precomputes class heatmaps, grade distributions and student deep-dive analytics'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only warm the cache for this school ID')
+        parser.add_argument('--students', action='store_true', help='Also warm per-student deep-dive data')
+    
+    def handle(self, *args, **options):
+        helper = AdvancedAnalyticsHelper
+        schools = School.objects.filter(is_active=True)
+        if options['school']:
+            schools = schools.filter(pk=options['school'])
+        
+        for school in schools:
+            # Same default selection as class_heatmap_view: the 10 most recent exams
+            exam_ids = list(ZipGradeExam.objects.filter(
+                school=school
+            ).order_by('-exam_date')[:10].values_list('pk', flat=True))
+            if not exam_ids:
+                continue
+            
+            helper.get_cached(
+                'distribution',
+                lambda: helper.get_grade_distribution(exam_ids, source='zipgrade'),
+                exam_ids, 'zipgrade', refresh=True
+            )
+            
+            class_filters = [(None, None)] + [
+                (c['grade'], c['section']) for c in AnalyticsHelper.get_classes_list(school)
+            ]
+            for grade, section in class_filters:
+                helper.get_cached(
+                    'heatmap',
+                    lambda: helper.get_topic_mastery_heatmap(
+                        exam_ids, school=school, grade=grade, section=section
+                    ),
+                    exam_ids, school.pk, grade, section, refresh=True
+                )
+            
+            student_count = 0
+            if options['students']:
+                # Same default selection as student_advanced_analytics_view: all exams with results
+                student_exams = {}
+                for student_id, exam_id in ExamResult.objects.filter(
+                    student__school=school
+                ).values_list('student_id', 'exam_id').distinct():
+                    student_exams.setdefault(student_id, []).append(exam_id)
+                for student_id, student_exam_ids in student_exams.items():
+                    helper.get_student_deep_dive(student_id, student_exam_ids, source='zipgrade', refresh=True)
+                student_count = len(student_exams)
+            
+            self.stdout.write(
+                f'{school.name}: {len(class_filters) - 1} classes, {student_count} students'
+            )
+        
+        self.stdout.write(self.style.SUCCESS('Analytics cache warmed.'))
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from exams.models import ExamAttempt, OnlineExam
+from schools.models import MasterStudent
+from zipgrade.models import ExamResult, SubjectResult, ZipGradeExam
+from .utils import AnalyticsHelper, CLASSES_CACHE_KEY, STUDENT_EXAM_IDS_CACHE_KEY
+
+
+@receiver([post_save, post_delete], sender=MasterStudent)
+def invalidate_classes_cache(sender, instance, **kwargs):
+    """Drop the cached class list of the student's school."""
+    cache.delete(CLASSES_CACHE_KEY.format(school_id=instance.school_id))
+
+
+@receiver([post_save, post_delete], sender=ExamResult)
+def invalidate_student_zipgrade_exams(sender, instance, **kwargs):
+    """Drop the cached ZipGrade exam ids of the result's student."""
+    if instance.student_id:
+        cache.delete(STUDENT_EXAM_IDS_CACHE_KEY.format(source='zipgrade', student_id=instance.student_id))
+
+
+@receiver([post_save, post_delete], sender=ExamAttempt)
+def invalidate_student_online_exams(sender, instance, **kwargs):
+    """Drop the cached online exam ids of the attempt's student."""
+    cache.delete(STUDENT_EXAM_IDS_CACHE_KEY.format(source='exams', student_id=instance.student_id))
+
+
+@receiver([post_save, post_delete], sender=ExamResult)
+@receiver([post_save, post_delete], sender=SubjectResult)
+@receiver([post_save, post_delete], sender=ZipGradeExam)
+@receiver([post_save, post_delete], sender=ExamAttempt)
+@receiver([post_save, post_delete], sender=OnlineExam)
+@receiver([post_save, post_delete], sender=MasterStudent)
+def invalidate_analytics_pages(sender, **kwargs):
+    """Drop cached analytics pages and fragments when results change."""
+    AnalyticsHelper.bump_cache_generation()
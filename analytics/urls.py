@@ -5,6 +5,7 @@ app_name = 'analytics'
 
 urlpatterns = [
     path('schools/', views.school_analytics_view, name='schools'),
+    path('filters_json/', views.filters_json_view, name='filters_json'),
     path('classes/', views.class_analytics_view, name='classes'),
     path('students/', views.student_analytics_view, name='students'),
     path('network/', views.network_analytics_view, name='network'),
@@ -1,12 +1,76 @@
+import tempfile
+import time
+from collections import defaultdict
+
+import orjson
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Avg, Count, Max, Min, Q, Sum
 from django.utils import timezone
 from openpyxl.utils import get_column_letter
 from exams.models import ExamAttempt, OnlineExam
 from zipgrade.models import ExamResult
 
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Exports larger than this are spooled to disk instead of being held in memory
+EXPORT_SPOOL_MAX_SIZE = 1024 * 1024
+# Excel export column widths (write-only sheets need them before the first row)
+EXPORT_COLUMN_WIDTHS = (32, 24, 14, 14, 10)
+
+# Class lists rarely change during a term; invalidated on MasterStudent changes
+CLASSES_CACHE_KEY = 'classes:{school_id}'
+CLASSES_CACHE_TIMEOUT = 300
+
+# Exam ids a student has results for (source is 'zipgrade' or 'exams')
+STUDENT_EXAM_IDS_CACHE_KEY = 'student_exam_ids:{source}:{student_id}'
+STUDENT_EXAM_IDS_CACHE_TIMEOUT = 300
+
+# Bumped whenever exam results change; part of every cached analytics page/fragment key
+ANALYTICS_CACHE_GENERATION_KEY = 'analytics:generation'
+
+# Upper bound on ids accepted from one filter parameter
+MAX_SELECTED_IDS = 200
+
+
+def parse_ids(request, name, maxlen=MAX_SELECTED_IDS):
+    """Parse a multi-value GET parameter into a list of ints, skipping non-numeric values."""
+    return [int(value) for value in request.GET.getlist(name) if value.isdigit()][:maxlen]
+
+
+def _dumps_json_bytes(data):
+    # Decimal/date values fall back to Django's encoder, as JsonResponse does
+    return orjson.dumps(data, default=DjangoJSONEncoder().default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_json(data):
+    """Serialize chart data for embedding in a template."""
+    return _dumps_json_bytes(data).decode()
+
+
+def json_response(data, status=200):
+    """JSON response for the analytics API endpoints."""
+    from django.http import HttpResponse
+    
+    return HttpResponse(_dumps_json_bytes(data), content_type='application/json', status=status)
+
+
 class AnalyticsHelper:
     """Helper class for analytics calculations."""
 
+    @staticmethod
+    def get_cache_generation():
+        """Get the current analytics cache generation."""
+        # Seeded from the clock, so a counter evicted by cache culling never restarts
+        # at a value that older cached pages and fragments were stored under
+        return cache.get_or_set(ANALYTICS_CACHE_GENERATION_KEY, time.time_ns, None)
+
+    @staticmethod
+    def bump_cache_generation():
+        """Invalidate all cached analytics pages and fragments."""
+        # set() rather than incr(): the database cache's incr() re-saves with the default timeout
+        cache.set(ANALYTICS_CACHE_GENERATION_KEY, AnalyticsHelper.get_cache_generation() + 1, None)
+
     @staticmethod
     def get_school_stats(school):
         """Get overall statistics for a school."""
@@ -141,17 +205,36 @@ class AnalyticsHelper:
             'pass_rate': round((passed / total) * 100, 1)
         }
 
+    @staticmethod
+    def find_linked_user(student):
+        """Find the User account (pk only) linked to a MasterStudent by email local part or name."""
+        from accounts.models import User
+        
+        # Emails whose local part is exactly the student ID; a case-sensitive prefix
+        # LIKE, which PostgreSQL serves from the email column's _like index
+        return User.objects.filter(
+            Q(email__startswith=f"{student.student_id}@") |
+            Q(first_name__iexact=student.name, last_name__iexact=student.surname)
+        ).only('pk').first()
+
     @staticmethod
     def get_classes_list(school):
-        """Get distinct classes (grade + section) for a school."""
+        """Get distinct classes (grade + section) for a school (cached, see analytics.signals)."""
         from schools.models import MasterStudent
         
+        cache_key = CLASSES_CACHE_KEY.format(school_id=school.pk)
+        classes = cache.get(cache_key)
+        if classes is not None:
+            return classes
+        
         classes = MasterStudent.objects.filter(school=school).values(
             'grade', 'section'
         ).distinct().order_by('grade', 'section')
         
-        return [{'grade': c['grade'], 'section': c['section'], 
-                 'name': f"{c['grade']}{c['section']}"} for c in classes]
+        classes = [{'grade': c['grade'], 'section': c['section'], 
+                    'name': f"{c['grade']}{c['section']}"} for c in classes]
+        cache.set(cache_key, classes, CLASSES_CACHE_TIMEOUT)
+        return classes
 
     @staticmethod
     def get_class_stats(school, grade, section):
@@ -248,9 +331,17 @@ class AnalyticsHelper:
         if not exam_ids:
             return None
             
-        results = ExamResult.objects.filter(exam_id__in=exam_ids)
+        # Pass rate uses a 60% threshold; everything comes from one aggregate query
+        passing_threshold = 60
+        stats = ExamResult.objects.filter(exam_id__in=exam_ids).aggregate(
+            avg=Avg('percentage'),
+            max=Max('percentage'),
+            min=Min('percentage'),
+            total=Count('id'),
+            passed=Count('id', filter=Q(percentage__gte=passing_threshold)),
+        )
         
-        if not results.exists():
+        if not stats['total']:
             return {
                 'total_students': 0,
                 'total_exams': len(exam_ids),
@@ -261,17 +352,7 @@ class AnalyticsHelper:
                 'exams_info': []
             }
         
-        stats = results.aggregate(
-            avg=Avg('percentage'),
-            max=Max('percentage'),
-            min=Min('percentage'),
-            total=Count('id')
-        )
-        
-        # Calculate pass rate (60% as passing threshold)
-        passing_threshold = 60
-        passed = results.filter(percentage__gte=passing_threshold).count()
-        pass_rate = (passed / stats['total']) * 100 if stats['total'] > 0 else 0
+        pass_rate = (stats['passed'] / stats['total']) * 100
         
         # Get exam info
         exams = ZipGradeExam.objects.filter(pk__in=exam_ids)
@@ -297,98 +378,69 @@ class AnalyticsHelper:
     def get_zipgrade_class_breakdown(exam_ids, school):
         """Get breakdown by class for selected ZipGrade exams."""
         from zipgrade.models import ExamResult
-        from schools.models import MasterStudent
         
         if not exam_ids:
             return []
         
-        results = ExamResult.objects.filter(
+        # Group by class (grade + section) in the database
+        class_stats = ExamResult.objects.filter(
             exam_id__in=exam_ids,
             student__isnull=False
-        ).select_related('student')
+        ).values('student__grade', 'student__section').annotate(
+            student_count=Count('id'),
+            avg=Avg('percentage'),
+            max=Max('percentage'),
+            min=Min('percentage'),
+            passed=Count('id', filter=Q(percentage__gte=60))
+        ).order_by('student__grade', 'student__section')
         
-        # Group by class (grade + section)
-        class_stats = {}
-        for result in results:
-            if result.student:
-                key = f"{result.student.grade}{result.student.section}"
-                if key not in class_stats:
-                    class_stats[key] = {
-                        'grade': result.student.grade,
-                        'section': result.student.section,
-                        'name': key,
-                        'scores': [],
-                        'student_count': 0
-                    }
-                class_stats[key]['scores'].append(float(result.percentage))
-                class_stats[key]['student_count'] += 1
-        
-        # Calculate averages
         breakdown = []
-        for key, data in class_stats.items():
-            avg_score = sum(data['scores']) / len(data['scores']) if data['scores'] else 0
-            passed = sum(1 for s in data['scores'] if s >= 60)
-            pass_rate = (passed / len(data['scores'])) * 100 if data['scores'] else 0
-            
+        for data in class_stats:
+            grade = data['student__grade']
+            section = data['student__section']
             breakdown.append({
-                'name': data['name'],
-                'grade': data['grade'],
-                'section': data['section'],
+                'name': f"{grade}{section}",
+                'grade': grade,
+                'section': section,
                 'student_count': data['student_count'],
-                'avg_score': round(avg_score, 1),
-                'pass_rate': round(pass_rate, 1),
-                'max_score': round(max(data['scores']) if data['scores'] else 0, 1),
-                'min_score': round(min(data['scores']) if data['scores'] else 0, 1)
+                'avg_score': round(float(data['avg'] or 0), 1),
+                'pass_rate': round((data['passed'] / data['student_count']) * 100, 1),
+                'max_score': round(float(data['max'] or 0), 1),
+                'min_score': round(float(data['min'] or 0), 1)
             })
         
-        # Sort by class name
-        breakdown.sort(key=lambda x: (x['grade'], x['section']))
         return breakdown
 
     @staticmethod
     def get_zipgrade_subject_breakdown(exam_ids):
         """Get breakdown by subject for selected ZipGrade exams (if subject splits exist)."""
-        from zipgrade.models import SubjectResult, SubjectSplit
+        from zipgrade.models import SubjectResult
         
         if not exam_ids:
             return []
         
-        # Get all subject results for the selected exams
-        subject_results = SubjectResult.objects.filter(
+        # Group subject results by subject in the database
+        subject_stats = SubjectResult.objects.filter(
             result__exam_id__in=exam_ids
-        ).select_related('subject_split__subject')
-        
-        if not subject_results.exists():
-            return []
-        
-        # Group by subject
-        subject_stats = {}
-        for sr in subject_results:
-            subject_name = sr.subject_split.subject.name
-            if subject_name not in subject_stats:
-                subject_stats[subject_name] = {
-                    'name': subject_name,
-                    'scores': []
-                }
-            subject_stats[subject_name]['scores'].append(float(sr.percentage))
+        ).values('subject_split__subject__name').annotate(
+            student_count=Count('id'),
+            avg=Avg('percentage'),
+            max=Max('percentage'),
+            min=Min('percentage'),
+            passed=Count('id', filter=Q(percentage__gte=60))
+        ).order_by('subject_split__subject__name')
         
-        # Calculate aggregates
         breakdown = []
-        for name, data in subject_stats.items():
-            avg = sum(data['scores']) / len(data['scores']) if data['scores'] else 0
-            passed = sum(1 for s in data['scores'] if s >= 60)
-            pass_rate = (passed / len(data['scores'])) * 100 if data['scores'] else 0
-            
+        for data in subject_stats:
             breakdown.append({
-                'name': name,
-                'student_count': len(data['scores']),
-                'avg_score': round(avg, 1),
-                'pass_rate': round(pass_rate, 1),
-                'max_score': round(max(data['scores']) if data['scores'] else 0, 1),
-                'min_score': round(min(data['scores']) if data['scores'] else 0, 1)
+                'name': data['subject_split__subject__name'],
+                'student_count': data['student_count'],
+                'avg_score': round(float(data['avg'] or 0), 1),
+                'pass_rate': round((data['passed'] / data['student_count']) * 100, 1),
+                'max_score': round(float(data['max'] or 0), 1),
+                'min_score': round(float(data['min'] or 0), 1)
             })
         
-        breakdown.sort(key=lambda x: x['name'])
         return breakdown
 
     @staticmethod
@@ -447,6 +499,133 @@ class AnalyticsHelper:
         ranking.sort(key=lambda x: x['avg_score'], reverse=True)
         return ranking[:limit]
 
+    @staticmethod
+    def get_zipgrade_full_report(exam_ids, school, request=None, limit=20):
+        """
+        Get stats, class/subject breakdowns and student ranking for selected ZipGrade exams.
+        When a request is given, the report is memoized on it for the rest of the request.
+        """
+        cache_key = (tuple(exam_ids), school.pk if school else None, limit)
+        report_cache = getattr(request, '_zipgrade_report_cache', None) if request else None
+        if report_cache is not None and cache_key in report_cache:
+            return report_cache[cache_key]
+        
+        report = AnalyticsHelper._build_zipgrade_report(exam_ids, limit)
+        
+        if request is not None:
+            if report_cache is None:
+                report_cache = request._zipgrade_report_cache = {}
+            report_cache[cache_key] = report
+        return report
+
+    @staticmethod
+    def _build_zipgrade_report(exam_ids, limit):
+        """
+        The get_zipgrade_full_report() sections from one pass over the selected results:
+        overall stats, per-exam averages, class breakdown and ranking share a single
+        ExamResult query. Subject results live in their own table and are grouped separately.
+        """
+        from zipgrade.models import ZipGradeExam
+        
+        if not exam_ids:
+            return {'stats': None, 'class_breakdown': [], 'subject_breakdown': [], 'student_ranking': []}
+        
+        passing_threshold = 60
+        
+        def summary(scores):
+            return {
+                'avg_score': round(sum(scores) / len(scores), 1),
+                'max_score': round(max(scores), 1),
+                'min_score': round(min(scores), 1),
+                'pass_rate': round(sum(1 for score in scores if score >= passing_threshold) / len(scores) * 100, 1),
+            }
+        
+        all_scores = []
+        exam_scores = defaultdict(list)
+        class_scores = defaultdict(list)
+        student_stats = {}
+        rows = ExamResult.objects.filter(exam_id__in=exam_ids).values_list(
+            'exam_id', 'percentage', 'zipgrade_student_id',
+            'manual_first_name', 'manual_last_name', 'zipgrade_first_name', 'zipgrade_last_name',
+            'student_id', 'student__name', 'student__surname', 'student__grade', 'student__section',
+        )
+        for (exam_id, percentage, zipgrade_id, manual_first, manual_last, zg_first, zg_last,
+             student_id, name, surname, grade, section) in rows:
+            score = float(percentage)
+            all_scores.append(score)
+            exam_scores[exam_id].append(score)
+            
+            # Same naming as ExamResult.display_name: linked student > manual name > ZipGrade name
+            if student_id:
+                class_scores[(grade, section)].append(score)
+                key = f"student_{student_id}"
+                display = f"{surname} {name}"
+            else:
+                key = f"zg_{zipgrade_id}"
+                grade = section = '-'
+                if manual_first or manual_last:
+                    display = ' '.join(part for part in (manual_last, manual_first) if part)
+                elif zg_first or zg_last:
+                    display = ' '.join(part for part in (zg_last, zg_first) if part)
+                else:
+                    display = f"Unknown ({zipgrade_id})"
+            if key not in student_stats:
+                student_stats[key] = {'name': display, 'grade': grade, 'section': section, 'scores': []}
+            student_stats[key]['scores'].append(score)
+        
+        if all_scores:
+            exams = ZipGradeExam.objects.filter(pk__in=exam_ids).only('pk', 'title', 'exam_date', 'total_students')
+            overall = summary(all_scores)
+            stats = {
+                'total_students': len(all_scores),
+                'total_exams': len(exam_ids),
+                'avg_score': overall['avg_score'],
+                'max_score': overall['max_score'],
+                'min_score': overall['min_score'],
+                'pass_rate': overall['pass_rate'],
+                'exams_info': [{
+                    'id': e.pk,
+                    'title': e.title,
+                    'date': e.exam_date,
+                    'total_students': e.total_students,
+                    'avg_score': summary(exam_scores[e.pk])['avg_score'] if exam_scores[e.pk] else 0,
+                } for e in exams],
+            }
+        else:
+            stats = {
+                'total_students': 0,
+                'total_exams': len(exam_ids),
+                'avg_score': 0,
+                'max_score': 0,
+                'min_score': 0,
+                'pass_rate': 0,
+                'exams_info': []
+            }
+        
+        class_breakdown = [
+            {'name': f"{grade}{section}", 'grade': grade, 'section': section,
+             'student_count': len(scores), **summary(scores)}
+            for (grade, section), scores in sorted(class_scores.items())
+        ]
+        
+        ranking = [{
+            'name': data['name'],
+            'grade': data['grade'],
+            'section': data['section'],
+            'avg_score': round(sum(data['scores']) / len(data['scores']), 1),
+            'exams_taken': len(data['scores']),
+            'best_score': round(max(data['scores']), 1),
+            'worst_score': round(min(data['scores']), 1),
+        } for data in student_stats.values()]
+        ranking.sort(key=lambda x: x['avg_score'], reverse=True)
+        
+        return {
+            'stats': stats,
+            'class_breakdown': class_breakdown,
+            'subject_breakdown': AnalyticsHelper.get_zipgrade_subject_breakdown(exam_ids),
+            'student_ranking': ranking[:limit],
+        }
+
     @staticmethod
     def get_growth_chart_data(school=None):
         """Get growth chart data (last 12 weeks)."""
@@ -493,12 +672,13 @@ class AnalyticsHelper:
             s_exam_ids_list = list(s_exams.values_list('pk', flat=True))
             if s_exam_ids_list:
                 if selected_subject_id:
-                    subject_results = SubjectResult.objects.filter(
+                    percentages = SubjectResult.objects.filter(
                         result__exam_id__in=s_exam_ids_list,
                         subject_split__subject_id=selected_subject_id
-                    )
-                    if subject_results.exists():
-                        avg = sum(float(sr.percentage) for sr in subject_results) / subject_results.count()
+                    ).values_list('percentage', flat=True)
+                    scores = [float(percentage) for percentage in percentages]
+                    if scores:
+                        avg = sum(scores) / len(scores)
                     else:
                         avg = 0
                 else:
@@ -516,95 +696,97 @@ class ReportGenerator:
     """Helper for generating analytic reports."""
     
     @staticmethod
-    def generate_excel_report(school):
-        """Generate Excel report for school analytics."""
+    def _new_sheet(title):
+        """Create a write-only workbook with a single sheet."""
         import openpyxl
-        from openpyxl.styles import Font, Alignment
-        from django.http import HttpResponse
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "School Analytics"
-        
-        # Header
-        ws['A1'] = f"Analytics Report: {school.name}"
-        ws['A1'].font = Font(size=14, bold=True)
-        ws.merge_cells('A1:D1')
         
-        ws['A3'] = "Generated at:"
-        ws['B3'] = timezone.now().strftime("%Y-%m-%d %H:%M")
-        
-        # Stats
-        stats = AnalyticsHelper.get_school_stats(school)['online_exams']
-        
-        ws['A5'] = "Overview"
-        ws['A5'].font = Font(bold=True)
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+        return wb, ws
+    
+    @staticmethod
+    def _styled(ws, value, **font):
+        """Build a write-only cell with the given font settings."""
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
         
-        data = [
-            ("Total Exams Taken", stats['count']),
-            ("Average Score", f"{stats['avg_score']}%"),
-            ("Pass Rate", f"{stats['pass_rate']}%"),
-            ("Best Score", f"{stats['max_score']}%"),
-        ]
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(**font)
+        return cell
+    
+    @staticmethod
+    def _append_rows(ws, rows, widths):
+        """Set column widths, then write rows to a write-only sheet as they are produced."""
+        # Column widths must be set before any row is written
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        
+        for row in rows:
+            ws.append(row)
+    
+    @staticmethod
+    def _streaming_response(write, content_type, filename):
+        """Render an export into a spooled buffer and stream it back in chunks."""
+        from django.http import FileResponse
         
-        row = 6
-        for label, value in data:
-            ws.cell(row=row, column=1, value=label)
-            ws.cell(row=row, column=2, value=value)
-            row += 1
+        buffer = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+        write(buffer)
+        buffer.seek(0)
+        return FileResponse(buffer, as_attachment=True, filename=filename, content_type=content_type)
+    
+    @staticmethod
+    def generate_excel_report(school):
+        """Generate Excel report for school analytics."""
+        wb, ws = ReportGenerator._new_sheet("School Analytics")
+        bold = ReportGenerator._styled
+        
+        def rows():
+            # Header
+            yield [bold(ws, f"Analytics Report: {school.name}", size=14, bold=True)]
+            yield []
+            yield ["Generated at:", timezone.now().strftime("%Y-%m-%d %H:%M")]
+            yield []
             
-        # Subject Performance
-        row += 2
-        ws.cell(row=row, column=1, value="Subject Performance").font = Font(bold=True)
-        row += 1
-        headers = ["Subject", "Total Exams", "Avg Score", "Pass Rate"]
-        for col, h in enumerate(headers, 1):
-             ws.cell(row=row, column=col, value=h).font = Font(bold=True)
-        row += 1
-        
-        subject_stats = AnalyticsHelper.get_online_exam_subject_performance(school)
-        for subj in subject_stats:
-            ws.cell(row=row, column=1, value=subj['name'])
-            ws.cell(row=row, column=2, value=subj['count'])
-            ws.cell(row=row, column=3, value=f"{subj['avg_score']}%")
-            ws.cell(row=row, column=4, value=f"{subj['pass_rate']}%")
-            row += 1
+            # Stats
+            stats = AnalyticsHelper.get_school_stats(school)['online_exams']
+            
+            yield [bold(ws, "Overview", bold=True)]
+            yield ["Total Exams Taken", stats['count']]
+            yield ["Average Score", f"{stats['avg_score']}%"]
+            yield ["Pass Rate", f"{stats['pass_rate']}%"]
+            yield ["Best Score", f"{stats['max_score']}%"]
             
-        # Recent Activity
-        ws.cell(row=row+2, column=1, value="Recent Exams").font = Font(bold=True)
-        row += 3
-        
-        headers = ["Title", "Subject", "Created By", "Date"]
-        for col, h in enumerate(headers, 1):
-            cell = ws.cell(row=row, column=col, value=h)
-            cell.font = Font(bold=True)
+            # Subject Performance
+            yield from ([], [])
+            yield [bold(ws, "Subject Performance", bold=True)]
+            headers = ["Subject", "Total Exams", "Avg Score", "Pass Rate"]
+            yield [bold(ws, h, bold=True) for h in headers]
             
-        exams = OnlineExam.objects.filter(school=school).order_by('-created_at')[:20]
-        row += 1
-        for exam in exams:
-            ws.cell(row=row, column=1, value=exam.title)
-            ws.cell(row=row, column=2, value=exam.subject.name)
-            ws.cell(row=row, column=3, value=exam.created_by.get_full_name())
-            ws.cell(row=row, column=4, value=exam.created_at.strftime("%Y-%m-%d"))
-            row += 1
+            subject_stats = AnalyticsHelper.get_online_exam_subject_performance(school)
+            for subj in subject_stats:
+                yield [subj['name'], subj['count'], f"{subj['avg_score']}%", f"{subj['pass_rate']}%"]
             
-        # Auto-adjust columns
-        for col in ws.columns:
-            max_length = 0
-            column = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column].width = adjusted_width
+            # Recent Activity
+            yield from ([], [])
+            yield [bold(ws, "Recent Exams", bold=True)]
+            headers = ["Title", "Subject", "Created By", "Date"]
+            yield [bold(ws, h, bold=True) for h in headers]
             
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename=analytics_{school.pk}_{timezone.now().date()}.xlsx'
-        wb.save(response)
-        return response
+            exams = OnlineExam.objects.filter(school=school).order_by('-created_at')[:20]
+            for exam in exams:
+                yield [
+                    exam.title,
+                    exam.subject.name,
+                    exam.created_by.get_full_name(),
+                    exam.created_at.strftime("%Y-%m-%d"),
+                ]
+        
+        ws.merged_cells.add('A1:D1')
+        ReportGenerator._append_rows(ws, rows(), EXPORT_COLUMN_WIDTHS)
+        return ReportGenerator._streaming_response(
+            wb.save, XLSX_CONTENT_TYPE,
+            f'analytics_{school.pk}_{timezone.now().date()}.xlsx'
+        )
 
     @staticmethod
     def generate_pdf_report(school):
@@ -613,11 +795,7 @@ class ReportGenerator:
         from reportlab.lib.pagesizes import letter
         from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
         from reportlab.lib.styles import getSampleStyleSheet
-        from django.http import HttpResponse
-        import io
         
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
         elements = []
         styles = getSampleStyleSheet()
         
@@ -675,85 +853,56 @@ class ReportGenerator:
             elements.append(d)
             elements.append(Spacer(1, 20))
         
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename=analytics_{school.pk}_{timezone.now().date()}.pdf'
-        return response
+        return ReportGenerator._streaming_response(
+            lambda buffer: SimpleDocTemplate(buffer, pagesize=letter).build(elements),
+            'application/pdf',
+            f'analytics_{school.pk}_{timezone.now().date()}.pdf'
+        )
 
     @staticmethod
     def generate_class_excel_report(school, grade, section):
         """Generate Excel report for class analytics."""
-        import openpyxl
-        from openpyxl.styles import Font
-        from django.http import HttpResponse
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"Class {grade}{section} Analytics"
-        
-        # Header
-        ws['A1'] = f"Class Analytics Report: {grade}{section}"
-        ws['A1'].font = Font(size=14, bold=True)
-        ws.merge_cells('A1:D1')
-        
-        ws['A2'] = f"School: {school.name}"
-        ws['A3'] = f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')}"
-        
-        # Stats
-        stats = AnalyticsHelper.get_class_stats(school, grade, section)
-        
-        ws['A5'] = "Overview"
-        ws['A5'].font = Font(bold=True)
-        
-        data = [
-            ("Total Students", stats['total_students']),
-            ("Total Exams Taken", stats['total_exams']),
-            ("Average Score", f"{stats['avg_score']}%"),
-            ("Pass Rate", f"{stats['pass_rate']}%"),
-            ("Best Score", f"{stats['max_score']}%"),
-            ("Lowest Score", f"{stats['min_score']}%"),
-        ]
-        
-        row = 6
-        for label, value in data:
-            ws.cell(row=row, column=1, value=label)
-            ws.cell(row=row, column=2, value=value)
-            row += 1
-        
-        # Top students
-        if stats['top_students']:
-            row += 2
-            ws.cell(row=row, column=1, value="Top Performers").font = Font(bold=True)
-            row += 1
-            headers = ["#", "Student Name", "Avg Score", "Exams"]
-            for col, h in enumerate(headers, 1):
-                ws.cell(row=row, column=col, value=h).font = Font(bold=True)
-            row += 1
-            for i, student in enumerate(stats['top_students'], 1):
-                ws.cell(row=row, column=1, value=i)
-                ws.cell(row=row, column=2, value=f"{student['student__first_name']} {student['student__last_name']}")
-                ws.cell(row=row, column=3, value=f"{round(student['avg_score'], 1)}%")
-                ws.cell(row=row, column=4, value=student['exams_taken'])
-                row += 1
-        
-        # Auto-adjust columns
-        for col in ws.columns:
-            max_length = 0
-            column = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            ws.column_dimensions[column].width = max_length + 2
-        
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename=class_{grade}{section}_{timezone.now().date()}.xlsx'
-        wb.save(response)
-        return response
+        wb, ws = ReportGenerator._new_sheet(f"Class {grade}{section} Analytics")
+        bold = ReportGenerator._styled
+        
+        def rows():
+            # Header
+            yield [bold(ws, f"Class Analytics Report: {grade}{section}", size=14, bold=True)]
+            yield [f"School: {school.name}"]
+            yield [f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')}"]
+            yield []
+            
+            # Stats
+            stats = AnalyticsHelper.get_class_stats(school, grade, section)
+            
+            yield [bold(ws, "Overview", bold=True)]
+            yield ["Total Students", stats['total_students']]
+            yield ["Total Exams Taken", stats['total_exams']]
+            yield ["Average Score", f"{stats['avg_score']}%"]
+            yield ["Pass Rate", f"{stats['pass_rate']}%"]
+            yield ["Best Score", f"{stats['max_score']}%"]
+            yield ["Lowest Score", f"{stats['min_score']}%"]
+            
+            # Top students
+            if stats['top_students']:
+                yield from ([], [])
+                yield [bold(ws, "Top Performers", bold=True)]
+                headers = ["#", "Student Name", "Avg Score", "Exams"]
+                yield [bold(ws, h, bold=True) for h in headers]
+                for i, student in enumerate(stats['top_students'], 1):
+                    yield [
+                        i,
+                        f"{student['student__first_name']} {student['student__last_name']}",
+                        f"{round(student['avg_score'], 1)}%",
+                        student['exams_taken'],
+                    ]
+        
+        ws.merged_cells.add('A1:D1')
+        ReportGenerator._append_rows(ws, rows(), EXPORT_COLUMN_WIDTHS)
+        return ReportGenerator._streaming_response(
+            wb.save, XLSX_CONTENT_TYPE,
+            f'class_{grade}{section}_{timezone.now().date()}.xlsx'
+        )
 
     @staticmethod
     def generate_class_pdf_report(school, grade, section):
@@ -762,11 +911,7 @@ class ReportGenerator:
         from reportlab.lib.pagesizes import letter
         from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
         from reportlab.lib.styles import getSampleStyleSheet
-        from django.http import HttpResponse
-        import io
         
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
         elements = []
         styles = getSampleStyleSheet()
         
@@ -850,95 +995,67 @@ class ReportGenerator:
                 elements.append(d)
                 elements.append(Spacer(1, 20))
         
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename=class_{grade}{section}_{timezone.now().date()}.pdf'
-        return response
+        return ReportGenerator._streaming_response(
+            lambda buffer: SimpleDocTemplate(buffer, pagesize=letter).build(elements),
+            'application/pdf',
+            f'class_{grade}{section}_{timezone.now().date()}.pdf'
+        )
 
     @staticmethod
     def generate_student_excel_report(student):
         """Generate Excel report for student analytics."""
-        import openpyxl
-        from openpyxl.styles import Font
-        from django.http import HttpResponse
         from django.db.models import Avg, Max, Min
         
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Student Analytics"
-        
-        # Header
-        ws['A1'] = f"Student Analytics Report: {student.get_full_name()}"
-        ws['A1'].font = Font(size=14, bold=True)
-        ws.merge_cells('A1:D1')
-        
-        ws['A2'] = f"Email: {student.email}"
-        ws['A3'] = f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')}"
-        
-        # Get attempts
-        attempts = ExamAttempt.objects.filter(student=student, status='completed').order_by('-started_at')
+        wb, ws = ReportGenerator._new_sheet("Student Analytics")
+        bold = ReportGenerator._styled
         
-        if attempts.exists():
-            stats = attempts.aggregate(
-                avg=Avg('percentage'),
-                max=Max('percentage'),
-                min=Min('percentage')
-            )
-            passed = sum(1 for a in attempts if a.percentage >= (a.exam.passing_score or 60))
-            
-            ws['A5'] = "Overview"
-            ws['A5'].font = Font(bold=True)
-            
-            data = [
-                ("Total Exams", attempts.count()),
-                ("Passed Exams", passed),
-                ("Average Score", f"{round(stats['avg'] or 0, 1)}%"),
-                ("Best Score", f"{round(stats['max'] or 0, 1)}%"),
-                ("Lowest Score", f"{round(stats['min'] or 0, 1)}%"),
-            ]
+        def rows():
+            # Header
+            yield [bold(ws, f"Student Analytics Report: {student.get_full_name()}", size=14, bold=True)]
+            yield [f"Email: {student.email}"]
+            yield [f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')}"]
+            yield []
             
-            row = 6
-            for label, value in data:
-                ws.cell(row=row, column=1, value=label)
-                ws.cell(row=row, column=2, value=value)
-                row += 1
+            # Get attempts
+            attempts = ExamAttempt.objects.filter(student=student, status='completed').order_by('-started_at')
             
-            # Exam history
-            row += 2
-            ws.cell(row=row, column=1, value="Exam History").font = Font(bold=True)
-            row += 1
-            headers = ["Exam", "Subject", "Score", "Date", "Status"]
-            for col, h in enumerate(headers, 1):
-                ws.cell(row=row, column=col, value=h).font = Font(bold=True)
-            row += 1
-            for attempt in attempts[:20]:
-                ws.cell(row=row, column=1, value=attempt.exam.title)
-                ws.cell(row=row, column=2, value=attempt.exam.subject.name)
-                ws.cell(row=row, column=3, value=f"{attempt.percentage}%")
-                ws.cell(row=row, column=4, value=attempt.started_at.strftime("%Y-%m-%d"))
-                ws.cell(row=row, column=5, value="Passed" if attempt.is_passed else "Failed")
-                row += 1
-        else:
-            ws['A5'] = "No exam data available"
-        
-        # Auto-adjust columns
-        for col in ws.columns:
-            max_length = 0
-            column = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            ws.column_dimensions[column].width = max_length + 2
-        
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename=student_{student.pk}_{timezone.now().date()}.xlsx'
-        wb.save(response)
-        return response
+            if attempts.exists():
+                stats = attempts.aggregate(
+                    avg=Avg('percentage'),
+                    max=Max('percentage'),
+                    min=Min('percentage')
+                )
+                passed = sum(1 for a in attempts if a.percentage >= (a.exam.passing_score or 60))
+                
+                yield [bold(ws, "Overview", bold=True)]
+                yield ["Total Exams", attempts.count()]
+                yield ["Passed Exams", passed]
+                yield ["Average Score", f"{round(stats['avg'] or 0, 1)}%"]
+                yield ["Best Score", f"{round(stats['max'] or 0, 1)}%"]
+                yield ["Lowest Score", f"{round(stats['min'] or 0, 1)}%"]
+                
+                # Exam history
+                yield from ([], [])
+                yield [bold(ws, "Exam History", bold=True)]
+                headers = ["Exam", "Subject", "Score", "Date", "Status"]
+                yield [bold(ws, h, bold=True) for h in headers]
+                for attempt in attempts[:20]:
+                    yield [
+                        attempt.exam.title,
+                        attempt.exam.subject.name,
+                        f"{attempt.percentage}%",
+                        attempt.started_at.strftime("%Y-%m-%d"),
+                        "Passed" if attempt.is_passed else "Failed",
+                    ]
+            else:
+                yield ["No exam data available"]
+        
+        ws.merged_cells.add('A1:D1')
+        ReportGenerator._append_rows(ws, rows(), EXPORT_COLUMN_WIDTHS)
+        return ReportGenerator._streaming_response(
+            wb.save, XLSX_CONTENT_TYPE,
+            f'student_{student.pk}_{timezone.now().date()}.xlsx'
+        )
 
     @staticmethod
     def generate_student_pdf_report(student):
@@ -947,12 +1064,8 @@ class ReportGenerator:
         from reportlab.lib.pagesizes import letter
         from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
         from reportlab.lib.styles import getSampleStyleSheet
-        from django.http import HttpResponse
         from django.db.models import Avg, Max, Min
-        import io
         
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
         elements = []
         styles = getSampleStyleSheet()
         
@@ -1046,9 +1159,8 @@ class ReportGenerator:
         else:
             elements.append(Paragraph("No exam data available for this student.", styles['Normal']))
         
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename=student_{student.pk}_{timezone.now().date()}.pdf'
-        return response
+        return ReportGenerator._streaming_response(
+            lambda buffer: SimpleDocTemplate(buffer, pagesize=letter).build(elements),
+            'application/pdf',
+            f'student_{student.pk}_{timezone.now().date()}.pdf'
+        )
@@ -1,5 +1,6 @@
 from django.shortcuts import render, get_object_or_404
-from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.views.decorators.http import condition
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Avg, Count, Q
 from django.utils import timezone
@@ -8,11 +9,15 @@ from datetime import timedelta
 from accounts.decorators import teacher_or_admin_required, super_admin_required
 from schools.models import School
 from exams.models import OnlineExam, ExamAttempt
-from .utils import AnalyticsHelper
+from .decorators import analytics_cache_page, analytics_etag
+from .utils import (
+    AnalyticsHelper, STUDENT_EXAM_IDS_CACHE_KEY, STUDENT_EXAM_IDS_CACHE_TIMEOUT,
+    MAX_SELECTED_IDS, dumps_json, json_response, parse_ids
+)
 
 
-@login_required
 @teacher_or_admin_required
+@analytics_cache_page(300)
 def school_analytics_view(request):
     """School analytics dashboard with Exam/ZipGrade toggle and comparison charts."""
     # Determine which school to show
@@ -23,7 +28,7 @@ def school_analytics_view(request):
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id', '')
         if school_id and school_id != 'all':
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         # If 'all' or empty, school remains None (will aggregate all schools)
         schools = all_schools
     else:
@@ -47,9 +52,8 @@ def school_analytics_view(request):
     school_comparison_labels = []
     school_comparison_data = []
     
-    # Available exams and subjects for filters
-    available_exams = []
-    available_subjects = []
+    # Filter options are loaded lazily via filters_json_view; only the count is needed here
+    available_exams_count = 0
     available_folders = []
     selected_folder_ids = []
     selected_exam_ids = request.GET.getlist('exam_ids')
@@ -83,24 +87,23 @@ def school_analytics_view(request):
             zipgrade_exams = ZipGradeExam.objects.all()
             available_folders = []
             
-        available_exams = list(ZipGradeExam.objects.all().values('pk', 'title', 'school__name'))
-        available_subjects = list(Subject.objects.filter(is_active=True).values('pk', 'name'))
+        available_exams_count = ZipGradeExam.objects.count()
         
         # Filter by selected folders if provided
         selected_folder_ids = request.GET.getlist('folder_ids')
         folder_exam_ids = []
         if selected_folder_ids:
-            folder_ids = [int(fid) for fid in selected_folder_ids if fid.isdigit()]
+            folder_ids = parse_ids(request, 'folder_ids')
             if folder_ids:
                 folder_exams = ZipGradeExam.objects.filter(folder__id__in=folder_ids)
                 folder_exam_ids = list(folder_exams.values_list('pk', flat=True))
         
         # Filter by selected exams if provided
         if selected_exam_ids:
-            exam_ids = [int(eid) for eid in selected_exam_ids if eid.isdigit()]
+            exam_ids = parse_ids(request, 'exam_ids')
             # Combine with folder exams (Union)
             if folder_exam_ids:
-                exam_ids = list(set(exam_ids) | set(folder_exam_ids))
+                exam_ids = list(dict.fromkeys(exam_ids + folder_exam_ids))
         elif folder_exam_ids:
             exam_ids = folder_exam_ids
         else:
@@ -114,16 +117,30 @@ def school_analytics_view(request):
                     result__exam_id__in=exam_ids,
                     subject_split__subject_id=selected_subject_id
                 )
-                if subject_results.exists():
-                    scores = [float(sr.percentage) for sr in subject_results]
-                    passed_count = sum(1 for sr in subject_results if sr.percentage >= 60)
+                # Single pass over the scores
+                count = 0
+                total = 0.0
+                max_score = float('-inf')
+                min_score = float('inf')
+                passed_count = 0
+                for percentage in subject_results.values_list('percentage', flat=True).iterator(chunk_size=2000):
+                    p = float(percentage)
+                    count += 1
+                    total += p
+                    if p > max_score:
+                        max_score = p
+                    if p < min_score:
+                        min_score = p
+                    if p >= 60:
+                        passed_count += 1
+                if count:
                     stats = {
                         'online_exams': {
-                            'count': len(scores),
-                            'avg_score': round(sum(scores) / len(scores), 1) if scores else 0,
-                            'pass_rate': round(passed_count / len(scores) * 100, 1) if scores else 0,
-                            'max_score': round(max(scores), 1) if scores else 0,
-                            'min_score': round(min(scores), 1) if scores else 0,
+                            'count': count,
+                            'avg_score': round(total / count, 1),
+                            'pass_rate': round(passed_count / count * 100, 1),
+                            'max_score': round(max_score, 1),
+                            'min_score': round(min_score, 1),
                         }
                     }
                 else:
@@ -166,13 +183,13 @@ def school_analytics_view(request):
         'schools': schools,
         'stats': stats,
         'recent_exams': recent_exams,
+        'cache_generation': AnalyticsHelper.get_cache_generation(),
         'chart_labels': chart_labels,
         'chart_data': chart_data,
         'source': source,
         'school_comparison_labels': school_comparison_labels,
         'school_comparison_data': school_comparison_data,
-        'available_exams': available_exams,
-        'available_subjects': available_subjects,
+        'available_exams_count': available_exams_count,
         'selected_exam_ids': selected_exam_ids,
         'selected_subject_id': selected_subject_id,
         'available_folders': available_folders,
@@ -182,16 +199,28 @@ def school_analytics_view(request):
     return render(request, 'analytics/schools.html', context)
 
 
+@teacher_or_admin_required
+def filters_json_view(request):
+    """API endpoint for ZipGrade exam/subject filter options on the school analytics page."""
+    from zipgrade.models import ZipGradeExam
+    from schools.models import Subject
+    
+    exams = list(ZipGradeExam.objects.values('pk', 'title', 'school__name'))
+    subjects = list(Subject.objects.filter(is_active=True).values('pk', 'name'))
+    
+    return json_response({'exams': exams, 'subjects': subjects})
+
+
 
-@login_required
 @teacher_or_admin_required
+@analytics_cache_page(300)
 def class_analytics_view(request):
     """Class analytics view with per-class statistics and source toggle."""
     # Determine school
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id')
         if school_id:
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         else:
             school = School.objects.first()
         schools = School.objects.all()
@@ -296,7 +325,6 @@ def class_analytics_view(request):
 
 
 
-@login_required
 @teacher_or_admin_required
 def student_analytics_view(request):
     """Enhanced Student Analytics with MasterStudent list and filters."""
@@ -326,7 +354,7 @@ def student_analytics_view(request):
     
     # Determine selected school
     if school_id:
-        selected_school = get_object_or_404(School, pk=school_id)
+        selected_school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
     elif request.user.is_super_admin:
         selected_school = schools.first()
     else:
@@ -366,13 +394,20 @@ def student_analytics_view(request):
     student = None
     student_id = request.GET.get('student_id')
     if student_id:
-        student = get_object_or_404(MasterStudent, pk=student_id)
+        student = get_object_or_404(
+            MasterStudent.objects.select_related('school').only(
+                'id', 'school__name', 'grade', 'section', 'name', 'surname', 'student_id'
+            ),
+            pk=student_id
+        )
     
     # Get available exams for multi-select
     available_exams = []
     available_subjects = []
     if selected_school and source == 'zipgrade':
-        available_exams = ZipGradeExam.objects.filter(school=selected_school).order_by('-exam_date')
+        available_exams = ZipGradeExam.objects.filter(
+            school=selected_school
+        ).only('pk', 'title', 'exam_date').order_by('-exam_date')[:MAX_SELECTED_IDS]
         from schools.models import Subject
         available_subjects = Subject.objects.filter(Q(school=selected_school) | Q(school__isnull=True)).order_by('name')
     
@@ -405,15 +440,16 @@ def student_analytics_view(request):
             if selected_exam_ids:
                 results = results.filter(exam_id__in=selected_exam_ids)
             
-            if results.exists():
-                scores = [float(r.percentage) for r in results]
-                passed_count = sum(1 for r in results if r.percentage >= 60)
+            results_list = list(results)
+            if results_list:
+                scores = [float(r.percentage) for r in results_list]
+                passed_count = sum(1 for r in results_list if r.percentage >= 60)
                 
                 # Get subject breakdown with strength/weakness analysis
-                result_ids = [r.pk for r in results]
+                result_ids = [r.pk for r in results_list]
                 subject_results = SubjectResult.objects.filter(
                     result_id__in=result_ids
-                ).select_related('subject_split__subject')
+                )
                 
                 # Filter by selected subjects if any
                 if selected_subject_ids:
@@ -421,14 +457,20 @@ def student_analytics_view(request):
                 
                 # Aggregate subject scores
                 subject_scores = {}
-                for sr in subject_results:
-                    subject_name = sr.subject_split.subject.name
-                    subject_id = sr.subject_split.subject.pk
-                    if subject_name not in subject_scores:
-                        subject_scores[subject_name] = {'total': 0, 'count': 0, 'id': subject_id, 'scores': []}
-                    subject_scores[subject_name]['total'] += float(sr.percentage)
-                    subject_scores[subject_name]['count'] += 1
-                    subject_scores[subject_name]['scores'].append(float(sr.percentage))
+                for row in subject_results.values(
+                    'subject_split__subject__id', 'subject_split__subject__name', 'percentage'
+                ).iterator(chunk_size=500):
+                    subject_name = row['subject_split__subject__name']
+                    subject_id = row['subject_split__subject__id']
+                    entry = subject_scores.setdefault(
+                        subject_name, {'total': 0, 'count': 0, 'id': subject_id, 'first': None, 'last': None}
+                    )
+                    percentage = float(row['percentage'])
+                    entry['total'] += percentage
+                    entry['count'] += 1
+                    if entry['first'] is None:
+                        entry['first'] = percentage
+                    entry['last'] = percentage
                 
                 # Calculate averages and determine strengths/weaknesses
                 subject_breakdown = []
@@ -442,7 +484,7 @@ def student_analytics_view(request):
                         'name': name,
                         'avg_score': avg,
                         'exam_count': data['count'],
-                        'trend': 'up' if len(data['scores']) > 1 and data['scores'][-1] > data['scores'][0] else 'down'
+                        'trend': 'up' if data['last'] > data['first'] else 'down'
                     })
                     radar_labels.append(name)
                     radar_data.append(avg)
@@ -461,20 +503,20 @@ def student_analytics_view(request):
                 
                 # Get class average for comparison
                 class_avg = ExamResult.objects.filter(
-                    student__school=student.school,
+                    student__school_id=student.school_id,
                     student__grade=student.grade
                 ).aggregate(avg=Avg('percentage'))['avg'] or 0
                 
                 context.update({
-                    'total_exams': results.count(),
+                    'total_exams': len(results_list),
                     'avg_score': round(sum(scores) / len(scores), 1),
                     'max_score': round(max(scores), 1),
                     'min_score': round(min(scores), 1),
                     'passed_exams': passed_count,
                     'class_avg': round(class_avg, 1),
-                    'attempts': results,
-                    'chart_labels': [r.exam.title[:15] for r in reversed(list(results))],
-                    'chart_data': [float(r.percentage) for r in reversed(list(results))],
+                    'attempts': results_list,
+                    'chart_labels': [r.exam.title[:15] for r in reversed(results_list)],
+                    'chart_data': [float(r.percentage) for r in reversed(results_list)],
                     'subject_breakdown': subject_breakdown,
                     'radar_labels': radar_labels,
                     'radar_data': radar_data,
@@ -484,11 +526,7 @@ def student_analytics_view(request):
         else:
             # Online Exams source
             # Match via email if student has linked user account
-            from accounts.models import User
-            user_student = User.objects.filter(
-                Q(email__icontains=student.student_id) | 
-                Q(first_name=student.name, last_name=student.surname)
-            ).first()
+            user_student = AnalyticsHelper.find_linked_user(student)
             
             if user_student:
                 attempts = ExamAttempt.objects.filter(student=user_student, status='completed').order_by('-started_at')
@@ -515,14 +553,12 @@ def student_analytics_view(request):
     return render(request, 'analytics/students.html', context)
 
 
-@login_required
 @super_admin_required
 def network_analytics_view(request):
     """Network-wide analytics view - placeholder."""
     return render(request, 'analytics/network.html')
 
 
-@login_required
 @teacher_or_admin_required
 def export_analytics_excel_view(request):
     """Export analytics to Excel."""
@@ -533,7 +569,7 @@ def export_analytics_excel_view(request):
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id')
         if school_id:
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         else:
             school = School.objects.first()
     else:
@@ -545,7 +581,6 @@ def export_analytics_excel_view(request):
     return ReportGenerator.generate_excel_report(school)
 
 
-@login_required
 @teacher_or_admin_required
 def export_analytics_pdf_view(request):
     """Export analytics to PDF."""
@@ -555,7 +590,7 @@ def export_analytics_pdf_view(request):
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id')
         if school_id:
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         else:
             school = School.objects.first()
     else:
@@ -567,7 +602,6 @@ def export_analytics_pdf_view(request):
     return ReportGenerator.generate_pdf_report(school)
 
 
-@login_required
 @teacher_or_admin_required
 def export_class_excel_view(request):
     """Export class analytics to Excel."""
@@ -577,7 +611,7 @@ def export_class_excel_view(request):
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id')
         if school_id:
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         else:
             school = School.objects.first()
     else:
@@ -595,7 +629,6 @@ def export_class_excel_view(request):
     return ReportGenerator.generate_class_excel_report(school, grade, section)
 
 
-@login_required
 @teacher_or_admin_required
 def export_class_pdf_view(request):
     """Export class analytics to PDF."""
@@ -605,7 +638,7 @@ def export_class_pdf_view(request):
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id')
         if school_id:
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         else:
             school = School.objects.first()
     else:
@@ -623,7 +656,6 @@ def export_class_pdf_view(request):
     return ReportGenerator.generate_class_pdf_report(school, grade, section)
 
 
-@login_required
 @teacher_or_admin_required
 def export_student_excel_view(request, student_id):
     """Export student analytics to Excel."""
@@ -634,7 +666,6 @@ def export_student_excel_view(request, student_id):
     return ReportGenerator.generate_student_excel_report(student)
 
 
-@login_required
 @teacher_or_admin_required
 def export_student_pdf_view(request, student_id):
     """Export student analytics to PDF."""
@@ -645,8 +676,8 @@ def export_student_pdf_view(request, student_id):
     return ReportGenerator.generate_student_pdf_report(student)
 
 
-@login_required
 @teacher_or_admin_required
+@analytics_cache_page(300)
 def zipgrade_analytics_view(request):
     """ZipGrade exam analytics with multi-exam selection."""
     from zipgrade.models import ZipGradeExam
@@ -655,7 +686,7 @@ def zipgrade_analytics_view(request):
     if request.user.is_super_admin:
         school_id = request.GET.get('school_id')
         if school_id:
-            school = get_object_or_404(School, pk=school_id)
+            school = get_object_or_404(School.objects.only('id', 'name'), pk=school_id)
         else:
             school = School.objects.first()
         schools = School.objects.all()
@@ -685,11 +716,12 @@ def zipgrade_analytics_view(request):
         selected_exam_ids = [int(x) for x in request.GET.get('exam_ids', '').split(',') if x.isdigit()]
     
     if selected_exam_ids:
-        # Get aggregated stats
-        stats = AnalyticsHelper.get_zipgrade_exam_stats(selected_exam_ids)
-        class_breakdown = AnalyticsHelper.get_zipgrade_class_breakdown(selected_exam_ids, school)
-        subject_breakdown = AnalyticsHelper.get_zipgrade_subject_breakdown(selected_exam_ids)
-        student_ranking = AnalyticsHelper.get_zipgrade_student_ranking(selected_exam_ids, limit=20)
+        # Get aggregated stats and breakdowns in one report
+        report = AnalyticsHelper.get_zipgrade_full_report(selected_exam_ids, school, request=request)
+        stats = report['stats']
+        class_breakdown = report['class_breakdown']
+        subject_breakdown = report['subject_breakdown']
+        student_ranking = report['student_ranking']
     
     # Prepare chart data
     chart_labels = [c['name'] for c in class_breakdown]
@@ -713,21 +745,19 @@ def zipgrade_analytics_view(request):
 
 # ============ Advanced Analytics Views ============
 
-@login_required
 @teacher_or_admin_required
 def item_analysis_view(request, exam_id):
     """Item-level distractor analysis for a specific exam."""
     from .advanced_analytics import AdvancedAnalyticsHelper
     from zipgrade.models import ZipGradeExam
-    import json
     
     source = request.GET.get('source', 'zipgrade')
     
     if source == 'zipgrade':
-        exam = get_object_or_404(ZipGradeExam, pk=exam_id)
+        exam = get_object_or_404(ZipGradeExam.objects.only('id', 'title', 'school_id'), pk=exam_id)
         exam_title = exam.title
     else:
-        exam = get_object_or_404(OnlineExam, pk=exam_id)
+        exam = get_object_or_404(OnlineExam.objects.only('id', 'title', 'school_id'), pk=exam_id)
         exam_title = exam.title
     
     analysis = AdvancedAnalyticsHelper.get_distractor_analysis(exam_id, source=source)
@@ -736,71 +766,68 @@ def item_analysis_view(request, exam_id):
         'exam': exam,
         'exam_title': exam_title,
         'analysis': analysis,
-        'analysis_json': json.dumps(analysis),
+        'analysis_json': dumps_json(analysis),
         'source': source,
     }
     
     return render(request, 'analytics/item_analysis.html', context)
 
 
-@login_required
 @teacher_or_admin_required
+@condition(etag_func=analytics_etag)
 def student_advanced_analytics_view(request, student_id):
     """Advanced analytics for a specific student: radar, trend, gaps."""
     from .advanced_analytics import AdvancedAnalyticsHelper
     from schools.models import MasterStudent
     from zipgrade.models import ZipGradeExam, ExamResult
-    import json
     
     source = request.GET.get('source', 'zipgrade')
     
     # Get student from MasterStudent (not User)
-    student = get_object_or_404(MasterStudent, pk=student_id)
+    student = get_object_or_404(MasterStudent.objects.only('id', 'school_id', 'grade', 'section', 'name', 'surname', 'student_id'), pk=student_id)
     
     # Get exam IDs from request or use all available for this student
-    exam_ids = request.GET.getlist('exam_ids')
+    exam_ids = parse_ids(request, 'exam_ids')
     
     if source == 'zipgrade':
         if not exam_ids:
             # Get all exams where this student has results
-            exam_ids = list(ExamResult.objects.filter(
-                student=student
-            ).values_list('exam_id', flat=True).distinct())
-        else:
-            exam_ids = [int(x) for x in exam_ids if x.isdigit()]
+            exam_ids = cache.get_or_set(
+                STUDENT_EXAM_IDS_CACHE_KEY.format(source='zipgrade', student_id=student.pk),
+                lambda: list(ExamResult.objects.filter(
+                    student=student
+                ).values_list('exam_id', flat=True).distinct()),
+                STUDENT_EXAM_IDS_CACHE_TIMEOUT
+            )
         
         student_id_for_calc = student.pk
         
         # Get available exams for multi-select
         available_exams = ZipGradeExam.objects.filter(
-            school=student.school
-        ).order_by('-exam_date')
+            school_id=student.school_id
+        ).only('pk', 'title', 'exam_date').order_by('-exam_date')[:MAX_SELECTED_IDS]
     else:
         # Online Exams source - try to find linked User account
-        from accounts.models import User
-        from django.db.models import Q
-        
-        user_student = User.objects.filter(
-            Q(email__icontains=student.student_id) |
-            Q(first_name__iexact=student.name, last_name__iexact=student.surname)
-        ).first()
+        user_student = AnalyticsHelper.find_linked_user(student)
         
         if not exam_ids:
             if user_student:
-                exam_ids = list(ExamAttempt.objects.filter(
-                    student=user_student, status='completed'
-                ).values_list('exam_id', flat=True))
+                exam_ids = cache.get_or_set(
+                    STUDENT_EXAM_IDS_CACHE_KEY.format(source='exams', student_id=user_student.pk),
+                    lambda: list(ExamAttempt.objects.filter(
+                        student=user_student, status='completed'
+                    ).values_list('exam_id', flat=True)),
+                    STUDENT_EXAM_IDS_CACHE_TIMEOUT
+                )
             else:
                 exam_ids = []
-        else:
-            exam_ids = [int(x) for x in exam_ids if x.isdigit()]
         
         student_id_for_calc = user_student.pk if user_student else None
         
         # Get available exams for multi-select
         available_exams = OnlineExam.objects.filter(
-            school=student.school
-        ).order_by('-created_at')
+            school_id=student.school_id
+        ).only('pk', 'title', 'created_at').order_by('-created_at')[:MAX_SELECTED_IDS]
     
     # Generate chart data
     radar_data = []
@@ -809,16 +836,7 @@ def student_advanced_analytics_view(request, student_id):
     weakest_areas = []
     
     if exam_ids and student_id_for_calc:
-        radar_data = AdvancedAnalyticsHelper.get_student_radar_data(
-            student_id_for_calc, exam_ids, source=source
-        )
-        trend_data = AdvancedAnalyticsHelper.get_progressive_trend(
-            student_id_for_calc, exam_ids, source=source
-        )
-        gap_data = AdvancedAnalyticsHelper.get_competency_gap(
-            student_id_for_calc, exam_ids, source=source
-        )
-        weakest_areas = AdvancedAnalyticsHelper.get_weakest_areas(
+        radar_data, trend_data, gap_data, weakest_areas = AdvancedAnalyticsHelper.get_student_deep_dive(
             student_id_for_calc, exam_ids, source=source
         )
     
@@ -826,9 +844,9 @@ def student_advanced_analytics_view(request, student_id):
         'student': student,
         'available_exams': available_exams,
         'selected_exam_ids': [str(x) for x in exam_ids],
-        'radar_data': json.dumps(radar_data),
-        'trend_data': json.dumps(trend_data),
-        'gap_data': json.dumps(gap_data),
+        'radar_data': dumps_json(radar_data),
+        'trend_data': dumps_json(trend_data),
+        'gap_data': dumps_json(gap_data),
         'weakest_areas': weakest_areas,
         'source': source,
     }
@@ -836,40 +854,47 @@ def student_advanced_analytics_view(request, student_id):
     return render(request, 'analytics/student_advanced.html', context)
 
 
-@login_required
 @teacher_or_admin_required  
+@condition(etag_func=analytics_etag)
 def class_heatmap_view(request):
     """Topic mastery heatmap for a class."""
     from .advanced_analytics import AdvancedAnalyticsHelper
     from zipgrade.models import ZipGradeExam
-    import json
     
     school = request.user.primary_school
     grade = request.GET.get('grade')
     section = request.GET.get('section')
-    exam_ids = request.GET.getlist('exam_ids')
+    exam_ids = parse_ids(request, 'exam_ids')
     
     if not exam_ids:
         # Use recent exams
         exam_ids = list(ZipGradeExam.objects.filter(
             school=school
         ).order_by('-exam_date')[:10].values_list('pk', flat=True))
-    else:
-        exam_ids = [int(x) for x in exam_ids]
     
     # Get available classes
     classes = AnalyticsHelper.get_classes_list(school) if school else []
     
     # Get available exams
-    available_exams = ZipGradeExam.objects.filter(school=school).order_by('-exam_date')
+    available_exams = ZipGradeExam.objects.filter(
+        school=school
+    ).only('pk', 'title', 'exam_date').order_by('-exam_date')[:MAX_SELECTED_IDS]
     
     # Generate heatmap
-    heatmap_data = AdvancedAnalyticsHelper.get_topic_mastery_heatmap(
-        exam_ids, school=school, grade=grade, section=section
+    heatmap_data = AdvancedAnalyticsHelper.get_cached(
+        'heatmap',
+        lambda: AdvancedAnalyticsHelper.get_topic_mastery_heatmap(
+            exam_ids, school=school, grade=grade, section=section
+        ),
+        exam_ids, school.pk if school else None, grade, section
     )
     
     # Grade distribution
-    distribution = AdvancedAnalyticsHelper.get_grade_distribution(exam_ids, source='zipgrade')
+    distribution = AdvancedAnalyticsHelper.get_cached(
+        'distribution',
+        lambda: AdvancedAnalyticsHelper.get_grade_distribution(exam_ids, source='zipgrade'),
+        exam_ids, 'zipgrade'
+    )
     
     context = {
         'school': school,
@@ -878,8 +903,8 @@ def class_heatmap_view(request):
         'selected_section': section,
         'available_exams': available_exams,
         'selected_exam_ids': [str(x) for x in exam_ids],
-        'heatmap_data': json.dumps(heatmap_data),
-        'distribution_data': json.dumps(distribution),
+        'heatmap_data': dumps_json(heatmap_data),
+        'distribution_data': dumps_json(distribution),
     }
     
     return render(request, 'analytics/class_heatmap.html', context)
@@ -887,91 +912,96 @@ def class_heatmap_view(request):
 
 # ============ API Endpoints for AJAX ============
 
-@login_required
 @teacher_or_admin_required
 def api_radar_data(request):
     """API endpoint for radar chart data."""
     from .advanced_analytics import AdvancedAnalyticsHelper
-    from django.http import JsonResponse
     
-    student_id = request.GET.get('student_id')
-    exam_ids = request.GET.getlist('exam_ids')
+    student_id = request.GET.get('student_id', '')
+    exam_ids = parse_ids(request, 'exam_ids', maxlen=None)
     source = request.GET.get('source', 'zipgrade')
     
-    if not student_id or not exam_ids:
-        return JsonResponse({'error': 'Missing parameters'}, status=400)
+    if not student_id.isdigit() or not exam_ids:
+        return json_response({'error': 'Missing parameters'}, status=400)
+    if len(exam_ids) > MAX_SELECTED_IDS:
+        return json_response({'error': 'Too many exam_ids'}, status=400)
     
-    exam_ids = [int(x) for x in exam_ids]
-    data = AdvancedAnalyticsHelper.get_student_radar_data(
-        int(student_id), exam_ids, source=source
+    student_id = int(student_id)
+    data = AdvancedAnalyticsHelper.get_cached(
+        'radar',
+        lambda: AdvancedAnalyticsHelper.get_student_radar_data(student_id, exam_ids, source=source),
+        exam_ids, student_id, source
     )
     
-    return JsonResponse({'data': data})
+    return json_response({'data': data})
 
 
-@login_required
 @teacher_or_admin_required
 def api_trend_data(request):
     """API endpoint for trend line data."""
     from .advanced_analytics import AdvancedAnalyticsHelper
-    from django.http import JsonResponse
     
-    student_id = request.GET.get('student_id')
-    exam_ids = request.GET.getlist('exam_ids') or None
+    student_id = request.GET.get('student_id', '')
+    exam_ids = parse_ids(request, 'exam_ids', maxlen=None) or None
     source = request.GET.get('source', 'zipgrade')
     
-    if not student_id:
-        return JsonResponse({'error': 'Missing student_id'}, status=400)
-    
-    if exam_ids:
-        exam_ids = [int(x) for x in exam_ids]
+    if not student_id.isdigit():
+        return json_response({'error': 'Missing student_id'}, status=400)
+    if exam_ids and len(exam_ids) > MAX_SELECTED_IDS:
+        return json_response({'error': 'Too many exam_ids'}, status=400)
     
     data = AdvancedAnalyticsHelper.get_progressive_trend(
         int(student_id), exam_ids, source=source
     )
     
-    return JsonResponse(data)
+    return json_response(data)
 
 
-@login_required
 @teacher_or_admin_required
 def api_distribution_data(request):
     """API endpoint for grade distribution data."""
     from .advanced_analytics import AdvancedAnalyticsHelper
-    from django.http import JsonResponse
     
-    exam_ids = request.GET.getlist('exam_ids')
+    exam_ids = parse_ids(request, 'exam_ids', maxlen=None)
     source = request.GET.get('source', 'zipgrade')
     
     if not exam_ids:
-        return JsonResponse({'error': 'Missing exam_ids'}, status=400)
-    
-    exam_ids = [int(x) for x in exam_ids]
-    data = AdvancedAnalyticsHelper.get_grade_distribution(exam_ids, source=source)
+        return json_response({'error': 'Missing exam_ids'}, status=400)
+    if len(exam_ids) > MAX_SELECTED_IDS:
+        return json_response({'error': 'Too many exam_ids'}, status=400)
+    
+    data = AdvancedAnalyticsHelper.get_cached(
+        'distribution',
+        lambda: AdvancedAnalyticsHelper.get_grade_distribution(exam_ids, source=source),
+        exam_ids, source
+    )
     
-    return JsonResponse(data)
+    return json_response(data)
 
 
-@login_required
 @teacher_or_admin_required
 def api_heatmap_data(request):
     """API endpoint for heatmap data."""
     from .advanced_analytics import AdvancedAnalyticsHelper
-    from django.http import JsonResponse
     
-    exam_ids = request.GET.getlist('exam_ids')
+    exam_ids = parse_ids(request, 'exam_ids', maxlen=None)
     grade = request.GET.get('grade')
     section = request.GET.get('section')
     source = request.GET.get('source', 'zipgrade')
     
     if not exam_ids:
-        return JsonResponse({'error': 'Missing exam_ids'}, status=400)
+        return json_response({'error': 'Missing exam_ids'}, status=400)
+    if len(exam_ids) > MAX_SELECTED_IDS:
+        return json_response({'error': 'Too many exam_ids'}, status=400)
     
-    exam_ids = [int(x) for x in exam_ids]
     school = request.user.primary_school
     
-    data = AdvancedAnalyticsHelper.get_topic_mastery_heatmap(
-        exam_ids, school=school, grade=grade, section=section
+    data = AdvancedAnalyticsHelper.get_cached(
+        'heatmap',
+        lambda: AdvancedAnalyticsHelper.get_topic_mastery_heatmap(
+            exam_ids, school=school, grade=grade, section=section
+        ),
+        exam_ids, school.pk if school else None, grade, section
     )
     
-    return JsonResponse(data)
+    return json_response(data)
@@ -1,25 +1,26 @@
 import os
+import re
 
 file_path = r'c:\Users\ariet\OneDrive\Desktop\AM - EDU 2.0\schools\templates\schools\school_list.html'
 
+# Missing spaces around == in status comparisons, e.g. status=="active"
+STATUS_PATTERN = re.compile(r'status==\s*"(active|inactive)"')
+
 print(f"Reading file: {file_path}")
 try:
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    # Check if the error exists
-    if 'status=="active"' in content:
-        print("Found incorrect syntax 'status==\"active\"'. Fixing...")
-        content = content.replace('status=="active"', 'status == "active"')
+    # Fix all occurrences in a single pass
+    content, count = STATUS_PATTERN.subn(r'status == "\1"', content)
     
-    if 'status=="inactive"' in content:
-        print("Found incorrect syntax 'status==\"inactive\"'. Fixing...")
-        content = content.replace('status=="inactive"', 'status == "inactive"')
-        
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-        
-    print("File updated successfully.")
+    if count:
+        print(f"Found {count} incorrect status comparison(s). Fixing...")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print("File updated successfully.")
+    else:
+        print("No incorrect syntax found. Nothing to do.")
     
 except Exception as e:
     print(f"Error detected: {e}")
@@ -1,14 +1,36 @@
 import os
+import re
 import struct
 import sys
 
-def generate_mo(pofile, mofile):
+# PO escape sequences, resolved in a single pass
+_ESCAPE_RE = re.compile(r'\\([nt"\\])')
+_ESCAPE_MAP = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+
+
+def _po_stamp(pofile):
+    # Identifies the PO file contents a compiled MO was built from
+    st = os.stat(pofile)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def generate_mo(pofile, mofile, force=False):
+    stamp_file = mofile + '.stamp'
     try:
-        with open(pofile, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        stamp = _po_stamp(pofile)
     except FileNotFoundError:
         print(f"File not found: {pofile}")
         return
+    
+    # Skip recompiling when the PO file is unchanged since the last build
+    if not force and os.path.exists(mofile) and os.path.exists(stamp_file):
+        with open(stamp_file, 'r') as f:
+            if f.read().strip() == stamp:
+                print(f"{mofile} is up to date")
+                return
+
+    with open(pofile, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
 
     mess = {}
     current_msgid = None
@@ -17,11 +39,7 @@ def generate_mo(pofile, mofile):
 
     def unescape(s):
         # Handle basic escapes found in PO files
-        s = s.replace('\\n', '\n')
-        s = s.replace('\\"', '"')
-        s = s.replace('\\t', '\t')
-        s = s.replace('\\\\', '\\')
-        return s
+        return _ESCAPE_RE.sub(lambda m: _ESCAPE_MAP[m.group(1)], s)
 
     for line in lines:
         line = line.strip()
@@ -67,54 +85,49 @@ def generate_mo(pofile, mofile):
     # We need to sort keys
     keys = sorted(mess.keys())
     
-    # Original strings table
-    otable = b''
-    ttable = b''
-    strings_content = b''
+    # Encode every original/translated string once
+    encoded = [(k.encode('utf-8'), mess[k].encode('utf-8')) for k in keys]
     
-    # We will put all strings after the tables
-    # Header (28) + OTable (N*8) + TTable (N*8)
+    # Layout: Header (28) + OTable (N*8) + TTable (N*8) + strings
     num_strings = len(keys)
-    string_offset_base = 28 + (num_strings * 8) * 2
+    otable_offset = 28
+    ttable_offset = otable_offset + num_strings * 8
+    string_offset_base = ttable_offset + num_strings * 8
+    strings_size = sum(len(k_enc) + len(v_enc) + 2 for k_enc, v_enc in encoded)
     
-    current_offset = string_offset_base
+    buf = bytearray(string_offset_base + strings_size)
     
-    # Pass 1: Original strings
-    for k in keys:
-        k_enc = k.encode('utf-8') + b'\0'
-        length = len(k_enc) - 1
-        otable += struct.pack('II', length, current_offset)
-        strings_content += k_enc
-        current_offset += len(k_enc)
-        
-    # Pass 2: Translated strings
-    for k in keys:
-        v_enc = mess[k].encode('utf-8') + b'\0'
-        length = len(v_enc) - 1
-        ttable += struct.pack('II', length, current_offset)
-        strings_content += v_enc
-        current_offset += len(v_enc)
+    struct.pack_into('7I', buf, 0,
+                     0x950412de,  # magic
+                     0,  # revision
+                     num_strings,
+                     otable_offset,  # offset of original strings table
+                     ttable_offset,  # offset of trans strings table
+                     0,  # size of hash table
+                     0)  # offset of hash table
+    
+    current_offset = string_offset_base
     
-    header = struct.pack('I', 0x950412de) # magic
-    header += struct.pack('I', 0) # revision
-    header += struct.pack('I', num_strings)
-    header += struct.pack('I', 28) # offset of original strings table
-    header += struct.pack('I', 28 + num_strings * 8) # offset of trans strings table
-    header += struct.pack('I', 0) # size of hash table
-    header += struct.pack('I', 0) # offset of hash table
+    # Pass 1: Original strings, Pass 2: Translated strings (NUL-terminated)
+    for table_offset, column in ((otable_offset, 0), (ttable_offset, 1)):
+        for i, pair in enumerate(encoded):
+            data = pair[column]
+            struct.pack_into('II', buf, table_offset + i * 8, len(data), current_offset)
+            buf[current_offset:current_offset + len(data)] = data
+            current_offset += len(data) + 1
         
     try:
         with open(mofile, 'wb') as f:
-            f.write(header)
-            f.write(otable)
-            f.write(ttable)
-            f.write(strings_content)
+            f.write(buf)
+        with open(stamp_file, 'w') as f:
+            f.write(stamp)
         print(f"Compiled {pofile} to {mofile} ({num_strings} messages)")
     except Exception as e:
         print(f"Error writing mofile: {e}")
 
 if __name__ == '__main__':
-    if len(sys.argv) < 3:
-        print("Usage: python compile_mo.py <pofile> <mofile>")
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    if len(args) < 2:
+        print("Usage: python compile_mo.py <pofile> <mofile> [--force]")
     else:
-        generate_mo(sys.argv[1], sys.argv[2])
+        generate_mo(args[0], args[1], force='--force' in sys.argv)
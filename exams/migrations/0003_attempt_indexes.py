@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_attemptanswer_text_answer_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='onlineexam',
+            name='show_results_immediately',
+            field=models.BooleanField(default=False, verbose_name='Show Results Immediately'),
+        ),
+        migrations.AddIndex(
+            model_name='attemptanswer',
+            index=models.Index(fields=['attempt', 'is_correct'], name='answer_attempt_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['student', 'status'], name='attempt_student_status_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:36
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_total_points(apps, schema_editor):
+    OnlineExam = apps.get_model('exams', 'OnlineExam')
+    ExamQuestion = apps.get_model('exams', 'ExamQuestion')
+    OnlineExam.objects.update(
+        total_points_cached=Coalesce(
+            Subquery(
+                ExamQuestion.objects.filter(exam=OuterRef('pk')).values('exam').annotate(
+                    total=Sum('points')
+                ).values('total')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_attempt_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='onlineexam',
+            name='total_points_cached',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Total Points'),
+        ),
+        migrations.RunPython(populate_total_points, migrations.RunPython.noop),
+    ]
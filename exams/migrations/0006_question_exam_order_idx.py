@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0005_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examquestion',
+            index=models.Index(fields=['exam', 'order'], name='question_exam_order_idx'),
+        ),
+    ]
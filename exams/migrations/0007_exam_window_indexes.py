@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0006_question_exam_order_idx'),
+        ('schools', '0002_school_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['exam', 'status'], name='attempt_exam_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='onlineexam',
+            index=models.Index(fields=['school', 'is_active', 'start_time', 'end_time'], name='exam_active_window_idx'),
+        ),
+    ]
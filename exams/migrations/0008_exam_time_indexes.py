@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0007_exam_window_indexes'),
+        ('schools', '0002_school_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='onlineexam',
+            index=models.Index(fields=['start_time'], name='exam_start_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='onlineexam',
+            index=models.Index(fields=['end_time'], name='exam_end_time_idx'),
+        ),
+    ]
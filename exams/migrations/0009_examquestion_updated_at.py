@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0008_exam_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examquestion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
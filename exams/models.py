@@ -1,7 +1,35 @@
 from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+class OnlineExamQuerySet(models.QuerySet):
+    """QuerySet for online exams."""
+    
+    def with_stats(self):
+        """Annotate question count, used by total_questions."""
+        qs = self.annotate(
+            _total_questions=models.Count('questions'),
+        )
+        # Meta.ordering is not applied to GROUP BY queries, so keep it explicit
+        if not qs.query.order_by:
+            qs = qs.order_by(*self.model._meta.ordering)
+        return qs
+    
+    def with_attempt_for(self, student):
+        """Annotate the student's attempt fields as my_* via a LEFT JOIN."""
+        return self.annotate(
+            my_attempt=models.FilteredRelation('attempts', condition=models.Q(attempts__student=student)),
+        ).annotate(
+            my_attempt_id=models.F('my_attempt__pk'),
+            my_status=models.F('my_attempt__status'),
+            my_is_locked=models.F('my_attempt__is_locked'),
+            my_score=models.F('my_attempt__score'),
+            my_percentage=models.F('my_attempt__percentage'),
+        )
 
 
 class OnlineExam(models.Model):
@@ -68,13 +96,24 @@ class OnlineExam(models.Model):
     )
     
     is_active = models.BooleanField(default=True, verbose_name=_('Active'))
+    
+    # Sum of question points, kept up to date by exams.signals
+    total_points_cached = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Total Points'))
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OnlineExamQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Online Exam')
         verbose_name_plural = _('Online Exams')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['school', 'is_active', 'start_time', 'end_time'], name='exam_active_window_idx'),
+            models.Index(fields=['start_time'], name='exam_start_time_idx'),
+            models.Index(fields=['end_time'], name='exam_end_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.subject.name}"
@@ -87,11 +126,26 @@ class OnlineExam(models.Model):
     
     @property
     def total_questions(self):
+        if getattr(self, '_total_questions', None) is not None:
+            return self._total_questions
         return self.questions.count()
     
     @property
     def total_points(self):
-        return self.questions.aggregate(total=models.Sum('points'))['total'] or 0
+        return self.total_points_cached
+    
+    def update_total_points(self):
+        """Recalculate the stored sum of question points."""
+        OnlineExam.objects.filter(pk=self.pk).update(
+            total_points_cached=Coalesce(
+                models.Subquery(
+                    ExamQuestion.objects.filter(exam=models.OuterRef('pk')).values('exam').annotate(
+                        total=models.Sum('points')
+                    ).values('total')
+                ),
+                0
+            )
+        )
 
 
 class ExamQuestion(models.Model):
@@ -138,14 +192,45 @@ class ExamQuestion(models.Model):
     )
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _('Exam Question')
         verbose_name_plural = _('Exam Questions')
         ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['exam', 'order'], name='question_exam_order_idx'),
+        ]
     
     def __str__(self):
         return f"Q{self.order}: {self.question_text[:50]}"
+    
+    @cached_property
+    def correct_variants(self):
+        """Normalized (stripped, lowercased) correct answers for fill_blanks questions."""
+        return frozenset(v.strip().lower() for v in self.correct_answers.split('|'))
+    
+    def answer_key(self):
+        """What decides correctness: the accepted variants or the ids of the correct options."""
+        if self.question_type == 'fill_blanks':
+            if not self.correct_answers:
+                return (self.question_type, frozenset())
+            return (self.question_type, frozenset(v.strip().lower() for v in self.correct_answers.split('|')))
+        return (self.question_type, frozenset(self.options.filter(is_correct=True).values_list('pk', flat=True)))
+    
+    def regrade_answers(self):
+        """Recompute is_correct for all saved answers to this question, saving only the ones that changed."""
+        # The answer key may have been edited since correct_variants was cached
+        self.__dict__.pop('correct_variants', None)
+        changed = []
+        for answer in self.attempt_answers.select_related('selected_option'):
+            answer.question = self
+            was_correct = answer.is_correct
+            answer.check_answer()
+            if answer.is_correct != was_correct:
+                changed.append(answer)
+        AttemptAnswer.objects.bulk_update(changed, ['is_correct'], batch_size=500)
+        return len(changed)
 
 
 class QuestionOption(models.Model):
@@ -231,6 +316,10 @@ class ExamAttempt(models.Model):
         verbose_name_plural = _('Exam Attempts')
         ordering = ['-started_at']
         unique_together = ['exam', 'student']  # One attempt per student per exam
+        indexes = [
+            models.Index(fields=['student', 'status'], name='attempt_student_status_idx'),
+            models.Index(fields=['exam', 'status'], name='attempt_exam_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student} - {self.exam.title}"
@@ -250,14 +339,30 @@ class ExamAttempt(models.Model):
     
     def calculate_score(self):
         """Calculate and save the score."""
-        correct_answers = self.answers.filter(is_correct=True)
-        self.score = sum(a.question.points for a in correct_answers)
+        if getattr(self, '_correct_points', None) is not None:
+            self.score = self._correct_points
+        else:
+            self.score = self.answers.filter(is_correct=True).aggregate(
+                total=models.Sum('question__points')
+            )['total'] or 0
         total_points = self.exam.total_points
         if total_points > 0:
             self.percentage = (self.score / total_points) * 100
         else:
             self.percentage = 0
         self.save()
+    
+    @classmethod
+    def recompute_scores(cls, attempt_ids):
+        """Recalculate and save scores for the given attempts, loading points in bulk."""
+        attempts = list(cls.objects.filter(pk__in=attempt_ids).select_related('exam').annotate(
+            _correct_points=Coalesce(
+                models.Sum('answers__question__points', filter=models.Q(answers__is_correct=True)), 0
+            )
+        ))
+        for attempt in attempts:
+            attempt.calculate_score()
+        return len(attempts)
 
 
 class AttemptAnswer(models.Model):
@@ -298,24 +403,26 @@ class AttemptAnswer(models.Model):
         verbose_name = _('Attempt Answer')
         verbose_name_plural = _('Attempt Answers')
         unique_together = ['attempt', 'question']
+        indexes = [
+            models.Index(fields=['attempt', 'is_correct'], name='answer_attempt_correct_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        # Auto-check if answer is correct
+        self.check_answer()
+        super().save(*args, **kwargs)
+    
+    def check_answer(self):
+        """Set is_correct from the selected option or text answer."""
         if self.question.question_type == 'fill_blanks':
             # Check text answer against correct_answers field
             if self.text_answer and self.question.correct_answers:
-                correct_variants = [
-                    v.strip().lower() 
-                    for v in self.question.correct_answers.split('|')
-                ]
-                self.is_correct = self.text_answer.strip().lower() in correct_variants
+                self.is_correct = self.text_answer.strip().lower() in self.question.correct_variants
             else:
                 self.is_correct = False
         elif self.selected_option:
             self.is_correct = self.selected_option.is_correct
         else:
             self.is_correct = False
-        super().save(*args, **kwargs)
 
 
 class ProctorEvent(models.Model):
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ExamQuestion, OnlineExam
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def update_exam_total_points(sender, instance, **kwargs):
+    """Keep OnlineExam.total_points_cached in sync with its questions."""
+    OnlineExam(pk=instance.exam_id).update_total_points()
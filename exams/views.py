@@ -1,14 +1,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.utils.translation import gettext as _
+from django.utils import translation
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.views.decorators.http import require_POST
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, Q
+from django.db.models.functions import Coalesce
+from django.views.decorators.http import condition, require_POST
+import hashlib
 import json
 import random
+from collections import defaultdict
 
 from accounts.decorators import role_required
 from schools.models import School, Subject
@@ -18,16 +23,18 @@ from .models import (
 )
 from .forms import OnlineExamForm, ExamQuestionForm, QuestionOptionFormSet
 
+# Upper bound on events accepted in one batched proctoring request
+MAX_PROCTOR_EVENTS_PER_REQUEST = 100
+
 
 # ============================================
 # TEACHER/ADMIN VIEWS
 # ============================================
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def exam_list_view(request):
     """List all online exams."""
-    exams = OnlineExam.objects.select_related('subject', 'school', 'created_by')
+    exams = OnlineExam.objects.with_stats().select_related('subject', 'school', 'created_by')
     
     # Filter by school for teachers
     if request.user.is_teacher and request.user.primary_school:
@@ -62,7 +69,6 @@ def exam_list_view(request):
     })
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def exam_create_view(request):
     """Create a new online exam."""
@@ -88,7 +94,6 @@ def exam_create_view(request):
     })
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def exam_edit_view(request, pk):
     """Edit an existing exam."""
@@ -115,7 +120,6 @@ def exam_edit_view(request, pk):
     })
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def exam_delete_view(request, pk):
     """Delete an exam."""
@@ -129,11 +133,25 @@ def exam_delete_view(request, pk):
     return render(request, 'exams/exam_confirm_delete.html', {'exam': exam})
 
 
-@login_required
+def exam_questions_etag(request, pk):
+    """ETag for exam_questions_view from the exam's and its questions' last changes."""
+    if len(messages.get_messages(request)):
+        return None
+    state = OnlineExam.objects.filter(pk=pk).annotate(
+        question_count=Count('questions'),
+        questions_updated=Max('questions__updated_at'),
+    ).values_list('updated_at', 'question_count', 'questions_updated').first()
+    key = '|'.join(str(part) for part in [
+        pk, state, request.user.pk, translation.get_language(),
+    ])
+    return hashlib.md5(key.encode()).hexdigest()
+
+
 @role_required(['super_admin', 'teacher'])
+@condition(etag_func=exam_questions_etag)
 def exam_questions_view(request, pk):
     """Manage questions for an exam."""
-    exam = get_object_or_404(OnlineExam, pk=pk)
+    exam = get_object_or_404(OnlineExam.objects.with_stats(), pk=pk)
     questions = exam.questions.prefetch_related('options').all()
     
     return render(request, 'exams/exam_questions.html', {
@@ -142,7 +160,6 @@ def exam_questions_view(request, pk):
     })
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def add_question_view(request, exam_pk):
     """Add a question to an exam."""
@@ -153,11 +170,16 @@ def add_question_view(request, exam_pk):
         if form.is_valid():
             question = form.save(commit=False)
             question.exam = exam
-            question.order = exam.questions.count() + 1
-            question.save()
+            # Lock the exam row so concurrent adds can't pick the same order
+            with transaction.atomic():
+                OnlineExam.objects.select_for_update().only('pk').get(pk=exam.pk)
+                max_order = exam.questions.aggregate(m=Coalesce(Max('order'), 0))['m']
+                question.order = max_order + 1
+                question.save()
             
             # For fill_blanks questions, don't validate/save formset
             if question.question_type == 'fill_blanks':
+                _rescore_finished_attempts(exam)
                 messages.success(request, _('Question added successfully.'))
                 return redirect('exams:exam_questions', pk=exam.pk)
             
@@ -165,6 +187,7 @@ def add_question_view(request, exam_pk):
             formset = QuestionOptionFormSet(request.POST, instance=question)
             if formset.is_valid():
                 formset.save()
+                _rescore_finished_attempts(exam)
                 messages.success(request, _('Question added successfully.'))
                 return redirect('exams:exam_questions', pk=exam.pk)
             else:
@@ -185,7 +208,14 @@ def add_question_view(request, exam_pk):
     })
 
 
-@login_required
+def _rescore_finished_attempts(exam):
+    """Rescore an exam's submitted attempts after its total points changed."""
+    # In-progress attempts are scored on submit; saving them here could overwrite proctoring updates
+    ExamAttempt.recompute_scores(
+        exam.attempts.exclude(status='in_progress').values_list('pk', flat=True)
+    )
+
+
 @role_required(['super_admin', 'teacher'])
 def edit_question_view(request, pk):
     """Edit a question."""
@@ -193,12 +223,27 @@ def edit_question_view(request, pk):
     exam = question.exam
     
     if request.method == 'POST':
+        # Snapshot before validation, which already copies the posted values onto the instance
+        answer_key = question.answer_key()
+        points = question.points
         form = ExamQuestionForm(request.POST, request.FILES, instance=question)
         formset = QuestionOptionFormSet(request.POST, instance=question)
         
         if form.is_valid() and formset.is_valid():
             form.save()
             formset.save()
+            
+            # Regrade saved answers only if the answer key changed
+            key_changed = question.answer_key() != answer_key
+            if key_changed:
+                question.regrade_answers()
+            if question.points != points:
+                # The exam's total points changed, which moves every attempt's percentage
+                _rescore_finished_attempts(exam)
+            elif key_changed:
+                ExamAttempt.recompute_scores(
+                    question.attempt_answers.values_list('attempt_id', flat=True)
+                )
             messages.success(request, _('Question updated successfully.'))
             return redirect('exams:exam_questions', pk=exam.pk)
     else:
@@ -214,7 +259,6 @@ def edit_question_view(request, pk):
     })
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def delete_question_view(request, pk):
     """Delete a question."""
@@ -223,6 +267,7 @@ def delete_question_view(request, pk):
     
     if request.method == 'POST':
         question.delete()
+        _rescore_finished_attempts(exam)
         messages.success(request, _('Question deleted.'))
         return redirect('exams:exam_questions', pk=exam.pk)
     
@@ -232,11 +277,10 @@ def delete_question_view(request, pk):
     })
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def exam_results_view(request, pk):
     """View all attempts/results for an exam."""
-    exam = get_object_or_404(OnlineExam, pk=pk)
+    exam = get_object_or_404(OnlineExam.objects.with_stats(), pk=pk)
     attempts = exam.attempts.select_related('student').order_by('-started_at')
     
     # Filter by status
@@ -274,7 +318,6 @@ def exam_results_view(request, pk):
     })
 
 
-@login_required
 @role_required(['super_admin'])
 def unlock_attempt_view(request, pk):
     """Admin unlock a locked exam attempt."""
@@ -287,31 +330,60 @@ def unlock_attempt_view(request, pk):
         attempt.tab_switch_count = 0
         attempt.lock_reason = ''
         attempt.started_at = timezone.now()  # Reset timer
-        attempt.save()
-        
-        # Delete previous answers
-        attempt.answers.all().delete()
         
-        # Log unlock event
-        ProctorEvent.objects.create(
-            attempt=attempt,
-            event_type='admin_unlock',
-            details={'unlocked_by': request.user.email}
-        )
+        # Reset, clear answers and log the unlock together, or not at all
+        with transaction.atomic():
+            attempt.save(update_fields=['is_locked', 'status', 'tab_switch_count', 'lock_reason', 'started_at'])
+            
+            # Delete previous answers
+            AttemptAnswer.objects.filter(attempt=attempt).delete()
+            
+            # Log unlock event
+            ProctorEvent.objects.create(
+                attempt=attempt,
+                event_type='admin_unlock',
+                details={'unlocked_by': request.user.email}
+            )
         
         messages.success(request, _('Attempt unlocked. Student can retake the exam.'))
-        return redirect('exams:exam_results', pk=attempt.exam.pk)
+        return redirect('exams:exam_results', pk=attempt.exam_id)
     
     return render(request, 'exams/unlock_confirm.html', {'attempt': attempt})
 
 
-@login_required
 @role_required(['super_admin', 'teacher'])
 def view_attempt_answers_view(request, pk):
     """View detailed answers for a specific exam attempt."""
-    attempt = get_object_or_404(ExamAttempt, pk=pk)
+    attempt = get_object_or_404(ExamAttempt.objects.select_related('student', 'exam'), pk=pk)
     exam = attempt.exam
-    answers = attempt.answers.select_related('question', 'selected_option').order_by('question__order')
+    
+    # Read answers and options as flat rows and nest them here, without building model instances
+    rows = list(attempt.answers.order_by('question__order').values(
+        'question_id', 'selected_option_id', 'text_answer', 'is_correct',
+        'question__order', 'question__question_text', 'question__question_type',
+        'question__points', 'question__correct_answers',
+    ))
+    options_by_question = defaultdict(list)
+    for option in QuestionOption.objects.filter(
+        question_id__in=[row['question_id'] for row in rows]
+    ).values('pk', 'question_id', 'text', 'is_correct'):
+        options_by_question[option['question_id']].append(option)
+    
+    question_types = dict(ExamQuestion.QUESTION_TYPES)
+    answers = [{
+        'selected_option_id': row['selected_option_id'],
+        'text_answer': row['text_answer'],
+        'is_correct': row['is_correct'],
+        'question': {
+            'order': row['question__order'],
+            'question_text': row['question__question_text'],
+            'question_type': row['question__question_type'],
+            'question_type_label': question_types.get(row['question__question_type'], ''),
+            'points': row['question__points'],
+            'correct_answers': row['question__correct_answers'],
+            'options': options_by_question[row['question_id']],
+        },
+    } for row in rows]
     
     return render(request, 'exams/attempt_answers.html', {
         'attempt': attempt,
@@ -339,25 +411,11 @@ def student_exams_view(request):
     if request.user.primary_school:
         exams = exams.filter(school=request.user.primary_school)
     
-    # Get student's attempts
-    attempts = {
-        a.exam_id: a 
-        for a in ExamAttempt.objects.filter(student=request.user)
-    }
-    
-    exams_data = []
-    for exam in exams:
-        attempt = attempts.get(exam.pk)
-        exams_data.append({
-            'exam': exam,
-            'attempt': attempt,
-            'can_start': attempt is None or (attempt.is_locked and False),  # Only one attempt
-            'is_completed': attempt and attempt.status == 'completed',
-            'is_locked': attempt and attempt.is_locked,
-        })
+    # Join in the student's attempt, if any (one attempt per exam)
+    exams = exams.select_related('subject').with_attempt_for(request.user)
     
     return render(request, 'exams/student_exams.html', {
-        'exams_data': exams_data,
+        'exams': exams,
     })
 
 
@@ -403,7 +461,7 @@ def start_exam_view(request, pk):
 @login_required
 def take_exam_view(request, pk):
     """Main exam-taking interface with proctoring."""
-    attempt = get_object_or_404(ExamAttempt, pk=pk, student=request.user)
+    attempt = get_object_or_404(ExamAttempt.objects.select_related('exam'), pk=pk, student=request.user)
     
     # Check if locked
     if attempt.is_locked:
@@ -423,32 +481,34 @@ def take_exam_view(request, pk):
         return redirect('exams:exam_result', pk=attempt.pk)
     
     exam = attempt.exam
-    questions = list(exam.questions.prefetch_related('options').all())
+    # Load only the columns the exam page renders
+    questions = list(exam.questions.order_by('order', 'id').only(
+        'exam', 'question_text', 'question_image', 'question_type', 'points', 'order'
+    ).prefetch_related(
+        Prefetch('options', queryset=QuestionOption.objects.order_by('order', 'id').only('question', 'text'))
+    ))
     
     # Shuffle if needed
     if exam.shuffle_questions:
         random.shuffle(questions)
     
+    saved_answers = list(attempt.answers.values_list('question_id', 'selected_option_id', 'text_answer'))
+    
     # Get existing answers for multiple choice
-    existing_answers = {
-        a.question_id: a.selected_option_id
-        for a in attempt.answers.all()
-        if a.selected_option_id
-    }
+    existing_answers = {q: o for q, o, _ in saved_answers if o}
     
     # Get existing text answers for fill_blanks
-    existing_text_answers = {
-        a.question_id: a.text_answer
-        for a in attempt.answers.all()
-        if a.text_answer
-    }
+    existing_text_answers = {q: t for q, _, t in saved_answers if t}
+    
+    # Attach saved answers to each question so the template needs no per-option lookups
+    for question in questions:
+        question.saved_option_id = existing_answers.get(question.pk)
+        question.saved_text_answer = existing_text_answers.get(question.pk, '')
     
     return render(request, 'exams/take_exam.html', {
         'attempt': attempt,
         'exam': exam,
         'questions': questions,
-        'existing_answers': existing_answers,
-        'existing_text_answers': existing_text_answers,
         'time_remaining': attempt.time_remaining,
     })
 
@@ -457,7 +517,7 @@ def take_exam_view(request, pk):
 @require_POST
 def save_answer_view(request, attempt_pk):
     """Save an answer via AJAX."""
-    attempt = get_object_or_404(ExamAttempt, pk=attempt_pk, student=request.user)
+    attempt = get_object_or_404(ExamAttempt.objects.select_related('exam'), pk=attempt_pk, student=request.user)
     
     if attempt.is_locked or attempt.status != 'in_progress':
         return JsonResponse({'error': 'Exam is not active'}, status=400)
@@ -468,32 +528,36 @@ def save_answer_view(request, attempt_pk):
         option_id = data.get('option_id')
         text_answer = data.get('text_answer', '')
         
-        question = get_object_or_404(ExamQuestion, pk=question_id, exam=attempt.exam)
+        # Validate the option and its question in one query when an option is sent
+        if option_id:
+            option = get_object_or_404(
+                QuestionOption.objects.select_related('question'),
+                pk=option_id, question_id=question_id, question__exam_id=attempt.exam_id
+            )
+            question = option.question
+        else:
+            option = None
+            question = get_object_or_404(ExamQuestion, pk=question_id, exam_id=attempt.exam_id)
         
         # Handle different question types
         if question.question_type == 'fill_blanks':
             # Text-based answer
-            answer, created = AttemptAnswer.objects.update_or_create(
-                attempt=attempt,
-                question=question,
-                defaults={
-                    'text_answer': text_answer,
-                    'selected_option': None
-                }
-            )
+            answer = AttemptAnswer(attempt=attempt, question=question, text_answer=text_answer)
         else:
             # Option-based answer (multiple_choice)
-            option = get_object_or_404(QuestionOption, pk=option_id, question=question) if option_id else None
-            answer, created = AttemptAnswer.objects.update_or_create(
-                attempt=attempt,
-                question=question,
-                defaults={
-                    'selected_option': option,
-                    'text_answer': ''
-                }
-            )
+            answer = AttemptAnswer(attempt=attempt, question=question, selected_option=option)
+        
+        # Insert or overwrite the answer in one statement
+        answer.check_answer()
+        AttemptAnswer.objects.bulk_create(
+            [answer],
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_option', 'text_answer', 'is_correct', 'answered_at']
+        )
         
-        return JsonResponse({'success': True, 'is_correct': answer.is_correct})
+        # The page only checks that the save succeeded
+        return HttpResponse(status=204)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
@@ -501,41 +565,52 @@ def save_answer_view(request, attempt_pk):
 @login_required
 @require_POST
 def log_proctor_event_view(request, attempt_pk):
-    """Log a proctoring event via AJAX."""
-    attempt = get_object_or_404(ExamAttempt, pk=attempt_pk, student=request.user)
+    """Log one proctoring event, or a batch sent as {"events": [...]}, via AJAX."""
+    attempt = get_object_or_404(ExamAttempt.objects.select_related('exam'), pk=attempt_pk, student=request.user)
     
     if attempt.status != 'in_progress':
         return JsonResponse({'locked': attempt.is_locked})
     
     try:
         data = json.loads(request.body)
-        event_type = data.get('event_type')
+        raw_events = data['events'] if 'events' in data else [data]
         
-        # Log the event
-        ProctorEvent.objects.create(
-            attempt=attempt,
-            event_type=event_type,
-            details=data.get('details', {})
-        )
+        # Count tab switches over the whole batch, so none escape the lock when it is trimmed below
+        tab_switches = sum(1 for event in raw_events if event.get('event_type') in ['tab_switch', 'window_blur'])
         
-        # Handle tab switches
-        if event_type in ['tab_switch', 'window_blur']:
-            attempt.tab_switch_count += 1
-            
-            if attempt.tab_switch_count >= attempt.exam.max_tab_switches:
-                attempt.is_locked = True
-                attempt.status = 'locked'
-                attempt.lock_reason = _('Too many tab switches')
-                attempt.finished_at = timezone.now()
-                attempt.calculate_score()
+        events = [
+            ProctorEvent(
+                attempt=attempt,
+                event_type=event.get('event_type'),
+                details=event.get('details', {})
+            )
+            for event in raw_events[:MAX_PROCTOR_EVENTS_PER_REQUEST]
+        ]
+        
+        # Update the counter and log the events together, so they cannot get out of step
+        with transaction.atomic():
+            # Handle tab switches
+            if tab_switches:
+                attempt.tab_switch_count += tab_switches
                 
-                ProctorEvent.objects.create(
-                    attempt=attempt,
-                    event_type='exam_locked',
-                    details={'reason': 'max_tab_switches', 'count': attempt.tab_switch_count}
-                )
+                if attempt.tab_switch_count >= attempt.exam.max_tab_switches:
+                    attempt.is_locked = True
+                    attempt.status = 'locked'
+                    attempt.lock_reason = _('Too many tab switches')
+                    attempt.finished_at = timezone.now()
+                    # calculate_score() saves the attempt, including the lock fields
+                    attempt.calculate_score()
+                    
+                    events.append(ProctorEvent(
+                        attempt=attempt,
+                        event_type='exam_locked',
+                        details={'reason': 'max_tab_switches', 'count': attempt.tab_switch_count}
+                    ))
+                else:
+                    attempt.save(update_fields=['tab_switch_count'])
             
-            attempt.save()
+            # Log all events in a single INSERT
+            ProctorEvent.objects.bulk_create(events)
         
         return JsonResponse({
             'success': True,
@@ -559,6 +634,33 @@ def submit_exam_view(request, pk):
     if attempt.status == 'completed':
         return redirect('exams:exam_result', pk=attempt.pk)
     
+    # Save answers posted with the form in one upsert, in case an AJAX save was missed
+    if request.method == 'POST':
+        answers = []
+        for question in attempt.exam.questions.prefetch_related('options'):
+            if question.question_type == 'fill_blanks':
+                text_answer = request.POST.get(f'question_{question.pk}_text', '')
+                if not text_answer:
+                    continue
+                answer = AttemptAnswer(attempt=attempt, question=question, text_answer=text_answer)
+            else:
+                option_id = request.POST.get(f'question_{question.pk}')
+                option = next((o for o in question.options.all() if str(o.pk) == option_id), None)
+                if option is None:
+                    continue
+                answer = AttemptAnswer(attempt=attempt, question=question, selected_option=option)
+            answer.check_answer()
+            answers.append(answer)
+        
+        if answers:
+            AttemptAnswer.objects.bulk_create(
+                answers,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['attempt', 'question'],
+                update_fields=['selected_option', 'text_answer', 'is_correct', 'answered_at']
+            )
+    
     # Mark as completed
     attempt.status = 'completed'
     attempt.finished_at = timezone.now()
@@ -577,7 +679,7 @@ def submit_exam_view(request, pk):
 @login_required
 def exam_result_view(request, pk):
     """View exam result."""
-    attempt = get_object_or_404(ExamAttempt, pk=pk, student=request.user)
+    attempt = get_object_or_404(ExamAttempt.objects.select_related('exam'), pk=pk, student=request.user)
     
     if attempt.status == 'in_progress' and not attempt.is_locked:
         return redirect('exams:take_exam', pk=attempt.pk)
@@ -1,46 +1,30 @@
+import json
 import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # Directory to search (current directory)
 BASE_DIR = os.getcwd()
 
+# mtimes of already-checked templates, so reruns skip unchanged files
+CACHE_FILE = os.path.join(BASE_DIR, '.fixcache.json')
+
+# Directories that never contain project templates
+SKIP_DIRS = {'venv', '.venv', '.git', '__pycache__'}
+
+# '==' with a non-space character on at least one side:
+# (?<=\S)==(?=[\s\S]) matches == preceded by non-whitespace
+# (?<=\s)==(?=\S) matches == preceded by space, followed by non-whitespace
+EQ_PATTERN = re.compile(r'(?<=\S)==(?=[\s\S])|(?<=\s)==(?=\S)')
+
 def fix_template_syntax(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # Regex to find '==' without spaces around it, likely inside {% if ... %}
-        # This is a simple heuristic: looks for non-space char, then ==, then non-space char
-        # correctly handles {{ ... }} variables too if they use == (though rare in print tags)
-        # We focus on capturing the pattern and enforcing spaces.
-        
-        # Pattern: (anything not space)==(anything not space)
-        # We want to replace it with \1 == \2
-        # Use a lookbehind and lookahead to check for missing spaces
-        
-        # Simple replacement strategies for known patterns seen in logs
-        # 1. foo==bar -> foo == bar
-        # 2. foo=='bar' -> foo == 'bar'
-        
-        # Improve regex: Find `==` that is NOT surrounded by spaces
-        # We replace `==` with ` == ` and then collapse multiple spaces just in case, 
-        # but a safer way is specific patterns.
-        
-        # Regex explanation:
-        # (?<=\S)==(?=\S) matches == preceded and followed by non-whitespace
-        # (?<=\s)==(?=\S) matches == preceded by space, followed by non-whitespace
-        # (?<=\S)==(?=\s) matches == preceded by non-whitespace, followed by space
-        
-        new_content = content
-        
-        # Fix: "foo==bar" -> "foo == bar"
-        new_content = re.sub(r'(?<=\S)==(?=\S)', ' == ', new_content)
-        
-        # Fix: "foo ==bar" -> "foo == bar"
-        new_content = re.sub(r'(?<=\s)==(?=\S)', ' == ', new_content)
-
-        # Fix: "foo== bar" -> "foo == bar"
-        new_content = re.sub(r'(?<=\S)==(?=\s)', ' == ', new_content)
+        # Fix: "foo==bar", "foo ==bar" and "foo== bar" -> "foo == bar"
+        new_content = EQ_PATTERN.sub(' == ', content)
 
         if new_content != content:
             with open(file_path, 'w', encoding='utf-8') as f:
@@ -53,17 +37,49 @@ def fix_template_syntax(file_path):
         print(f"Error processing {file_path}: {e}")
         return False
 
-count = 0
-print(f"Scanning for templates in {BASE_DIR}...")
-for root, dirs, files in os.walk(BASE_DIR):
-    # Skip venv and .git
-    if 'venv' in root or '.git' in root or '__pycache__' in root:
-        continue
+def find_templates(base_dir):
+    """Collect .html paths under base_dir, skipping SKIP_DIRS."""
+    paths = []
+    for root, dirs, files in os.walk(base_dir):
+        # Skip venv and .git without descending into them
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
         
-    for file in files:
-        if file.endswith('.html'):
-            full_path = os.path.join(root, file)
-            if fix_template_syntax(full_path):
-                count += 1
+        for file in files:
+            if file.endswith('.html'):
+                paths.append(os.path.join(root, file))
+    return paths
+
+
+def load_mtime_cache():
+    """Return {path: mtime_ns} recorded by the previous run."""
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_mtime_cache(paths):
+    """Record the current mtime of every checked template."""
+    cache = {path: os.stat(path).st_mtime_ns for path in paths if os.path.exists(path)}
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+
 
-print(f"Finished. Fixed {count} files.")
+if __name__ == '__main__':
+    print(f"Scanning for templates in {BASE_DIR}...")
+    paths = find_templates(BASE_DIR)
+    
+    # Skip files unchanged since the last run, unless --force is given
+    if '--force' in sys.argv:
+        pending = paths
+    else:
+        cache = load_mtime_cache()
+        pending = [path for path in paths if cache.get(path) != os.stat(path).st_mtime_ns]
+    
+    # Each file is independent, so spread them across worker processes
+    with ProcessPoolExecutor() as executor:
+        count = sum(executor.map(fix_template_syntax, pending, chunksize=32))
+    
+    save_mtime_cache(paths)
+    print(f"Finished. Checked {len(pending)} of {len(paths)} files, fixed {count}.")
@@ -27,46 +27,17 @@ content = pattern2.sub(r'{% trans "All Schools" %}', content)
 # Fix 3: Split tags ending with {%
 # e.g. ...{% endif %}">{%
 # trans "Exams" %}
-# We look for {% at end of line (ignoring whitespace), and next line completing it.
-def fix_split_tag_match(match):
-    return match.group(1).rstrip() + ' ' + match.group(2).lstrip()
+# A line ending in {% is joined with the next line when that line completes the tag
+split_tag_pattern = re.compile(r'\{%[ \t]*\n[ \t]*([^\n]*%\}(?:</a>|</option>)?)[ \t]*$', re.M)
+content, split_tag_count = split_tag_pattern.subn(r'{% \1', content)
+print(f"Fixed {split_tag_count} split tags")
 
-# Match {% followed by whitespace/newline, then tag content, then %}
-# Use a specific regex for the patterns we saw
-# Capture: (...{%) \n (   tag content %})
-pattern_generic = re.compile(r'(.*{%)\s*\n\s*(.*%}.*)')
-# This is a bit risky if it matches too much, but let's iterate line by line for safety
+# Fix 4: Any remaining split inside a trans tag: {% trans "All ... \n Schools" %}
+split_trans_pattern = re.compile(r'(trans "All[^\n]*?)[ \t]*\n[ \t]*([^\n]*Schools" %\})')
+content, split_trans_count = split_trans_pattern.subn(r'\1 \2', content)
+print(f"Fixed {split_trans_count} split trans tags")
 
-lines = content.split('\n')
-fixed_lines = []
-i = 0
-while i < len(lines):
-    line = lines[i]
-    stripped = line.rstrip()
-    
-    # Check for split {% at end
-    if stripped.endswith('{%'):
-        if i + 1 < len(lines):
-            next_line = lines[i+1].strip()
-            # If next line completes the tag (heuristically)
-            if next_line.endswith('%}') or next_line.endswith('%}</a>') or next_line.endswith('%}</option>'):
-                 print(f"Fixing match at line {i+1}: {stripped} + {next_line}")
-                 fixed_lines.append(stripped + ' ' + next_line)
-                 i += 2
-                 continue
-
-    # Check for split inside trans tag: {% trans "All
-    if 'trans "All' in line and not line.endswith('All Schools" %}'):
-         if i + 1 < len(lines) and 'Schools" %}' in lines[i+1]:
-             print(f"Fixing trans split at line {i+1}")
-             fixed_lines.append(line.rstrip() + ' ' + lines[i+1].lstrip())
-             i += 2
-             continue
-             
-    fixed_lines.append(line)
-    i += 1
-
-new_content = '\n'.join(fixed_lines)
+new_content = content
 
 print(f"New length: {len(new_content)}")
 
@@ -1,105 +1,167 @@
+import mmap
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Comparison operators to space inside {% ... %}, matched in one pass
+_OPS = ('==', '!=', '>=', '<=')
+_OP_RE = re.compile('|'.join(re.escape(op) for op in _OPS))
+# Same operators as bytes, for the prefilter that runs before decoding
+_OPS_BYTES = tuple(op.encode() for op in _OPS)
+_OP_RE_BYTES = re.compile(b'|'.join(re.escape(op) for op in _OPS_BYTES))
+
+# Templates at least this big are scanned through mmap instead of read into memory
+_LARGE_FILE_SIZE = 256 * 1024
+
+
+def _space_operator(match):
+    """Add a space on each side of the operator that lacks one."""
+    text, start, end = match.string, match.start(), match.end()
+    before = ' ' if start > 0 and not text[start - 1].isspace() else ''
+    after = ' ' if end < len(text) and not text[end].isspace() else ''
+    return f'{before}{match.group(0)}{after}'
+
+
+def _space_operator_bytes(match):
+    """Bytes counterpart of _space_operator, for the mmap path."""
+    text, start, end = match.string, match.start(), match.end()
+    before = b' ' if start > 0 and not text[start - 1:start].isspace() else b''
+    after = b' ' if end < len(text) and not text[end:end + 1].isspace() else b''
+    return before + match.group(0) + after
+
+
+# Regex to find Django block tags {% ... %}
+# We use lazy matching explicitly
+_TAG_RE = re.compile(r'\{%(.+?)%\}', re.DOTALL)
+_TAG_RE_BYTES = re.compile(rb'\{%(.+?)%\}', re.DOTALL)
+
+
+def _fix_tag_content(match):
+    """Space comparison operators inside one {% ... %} match; used as a _TAG_RE.sub callback."""
+    tag_full = match.group(0) # {% ... %}
+    tag_inner = match.group(1) # content inside
+    
+    # Every operator contains '=', so most tags need no regex at all
+    if '=' not in tag_inner:
+        return tag_full
+    
+    # Fix multi-char operators: ==, !=, <=, >=
+    # e.g. "val1==val2" -> "val1 == val2"
+    new_inner = _OP_RE.sub(_space_operator, tag_inner)
+
+    # For single char ops > and <, it's trickier because they might be part of filters or other syntax?
+    # For safety, let's stick to the requested "== type" errors which are usually equality/inequality.
+    # The user specifically mentioned errors like "show_unknown=='0'".
+    
+    if new_inner != tag_inner:
+        return f"{{%{new_inner}%}}"
+    return tag_full
+
+
+def _fix_tag_content_bytes(match):
+    """Bytes counterpart of _fix_tag_content; the operators are ASCII in utf-8 and cp1251 alike."""
+    tag_inner = match.group(1)
+    if b'=' not in tag_inner:
+        return match.group(0)
+    return b'{%' + _OP_RE_BYTES.sub(_space_operator_bytes, tag_inner) + b'%}'
+
+
+# Directories never descended into
+_SKIP_DIRS = {'venv', '.venv', '.git', '__pycache__', 'node_modules'}
+
+
+def _walk_html(root):
+    """Yield .html paths under root, pruning _SKIP_DIRS as they are found."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in _SKIP_DIRS:
+                    yield from _walk_html(entry.path)
+            elif entry.name.endswith('.html'):
+                yield entry.path
+
+
+def _decode(data, filepath):
+    """Decode template bytes as utf-8, falling back to cp1251; None if neither works."""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        try:
+            return data.decode('cp1251')
+        except UnicodeDecodeError:
+            print(f"Skipping file due to encoding issue: {filepath}")
+            return None
+
+
+def _write_fixed(filepath, new_content):
+    """Write to a temp file and swap it in, so a failure never leaves a half-written template."""
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(new_content)
+    os.replace(tmp_path, filepath)
+    print(f"Fixed: {filepath}")
+
+
+def _fix_large(filepath):
+    """
+    Fix a large template by running the bytes regex over an mmap of it,
+    so files with nothing to fix are never copied into memory.
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm.find(b'{%') == -1 or not any(mm.find(op) != -1 for op in _OPS_BYTES):
+            return False
+        new_data = _TAG_RE_BYTES.sub(_fix_tag_content_bytes, mm)
+        # Fixing only ever inserts spaces, so an unchanged length means nothing changed
+        if len(new_data) == len(mm):
+            return False
+    
+    new_content = _decode(new_data, filepath)
+    if new_content is None:
+        return False
+    _write_fixed(filepath, new_content)
+    return True
+
+
+def _fix_one(filepath):
+    """Fix operator spacing in one template; return True if the file was rewritten."""
+    if os.path.getsize(filepath) >= _LARGE_FILE_SIZE:
+        return _fix_large(filepath)
+    
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    
+    # Cheap byte checks before decoding: nothing to fix without a tag and an operator
+    if b'{%' not in data or not any(op in data for op in _OPS_BYTES):
+        return False
+    
+    content = _decode(data, filepath)
+    if content is None:
+        return False
+    
+    new_content = _TAG_RE.sub(_fix_tag_content, content)
+    
+    if new_content != content:
+        _write_fixed(filepath, new_content)
+        return True
+    return False
+
 
 def fix_django_template_syntax(root_dir):
     """
     Scans for HTML files in the given directory and fixes Django template syntax errors,
     specifically improperly spaced comparison operators within {% ... %} tags.
     """
-    html_files_count = 0
-    fixed_files_count = 0
-    errors_fixed_count = 0
-
-    # Operators to fix: ==, !=, <=, >=, >, <
-    # We prioritize multi-char operators first to avoid double replacement
-    # Regex logic: 
-    # Look for the operator surrounded by non-spaces, or one side non-space, inside {% %}
-    
-    operators = ['==', '!=', '<=', '>=']
-    single_operators = ['<', '>'] # Handle separately if needed, but < and > can be part of HTML tags, so strictly only inside {% %}
-
     print(f"Scanning directory: {root_dir}...")
 
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        # Skip virtualenvs and git
-        if 'venv' in dirpath or '.git' in dirpath or '__pycache__' in dirpath or 'node_modules' in dirpath:
-            continue
-
-        for filename in filenames:
-            if filename.endswith('.html'):
-                html_files_count += 1
-                filepath = os.path.join(dirpath, filename)
-                
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                     try:
-                        with open(filepath, 'r', encoding='cp1251') as f:
-                            content = f.read()
-                     except:
-                        print(f"Skipping file due to encoding issue: {filepath}")
-                        continue
-                
-                original_content = content
-                
-                def fix_tag_content(match):
-                    tag_full = match.group(0) # {% ... %}
-                    tag_inner = match.group(1) # content inside
-                    
-                    # Fix multi-char operators: ==, !=, <=, >=
-                    # Pattern: anything not a space, followed by op, followed by anything
-                    # But we want to ensure spaces.
-                    
-                    # Fix '=='
-                    # Replace "val1==val2" with "val1 == val2"
-                    # We use negative lookbehind/ahead to ensure we don't mess up existing spaces too much or other Ops
-                    
-                    new_inner = tag_inner
-                    
-                    # List of ops to ensure spacing around
-                    ops = ['==', '!=', '>=', '<=']
-                    for op in ops:
-                        # Escape op for regex
-                        e_op = re.escape(op)
-                        # Regex: 
-                        # 1. No space before: (\S)(==) -> \1 ==
-                        # 2. No space after: (==)(\S) -> == \2
-                        
-                        # Pass 1: Add space before if missing
-                        # Negative lookbehind for space
-                        new_inner = re.sub(f'(?<=\S){e_op}', f' {op}', new_inner)
-                        
-                        # Pass 2: Add space after if missing
-                        # Negative lookahead for space/end of string
-                        # Note: after Pass 1, op might have a space before it now.
-                        # We match the op literal again.
-                        new_inner = re.sub(f'{e_op}(?=\S)', f'{op} ', new_inner)
-
-                    # For single char ops > and <, it's trickier because they might be part of filters or other syntax?
-                    # Generally in {% if %} tags they are explicitly comparisons.
-                    # Let's check for < and > only if strictly inside "if" block?
-                    # For safety, let's stick to the requested "== type" errors which are usually equality/inequality.
-                    # The user specifically mentioned errors like "show_unknown=='0'".
-                    
-                    if new_inner != tag_inner:
-                        return f"{{%{new_inner}%}}"
-                    return tag_full
-
-                # Regex to find Django block tags {% ... %}
-                # We use lazy matching explicitly
-                new_content = re.sub(r'\{%(.+?)%\}', fix_tag_content, content, flags=re.DOTALL)
-                
-                if new_content != original_content:
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
-                    print(f"Fixed: {filepath}")
-                    fixed_files_count += 1
-                    errors_fixed_count += 1 # Rough counting
+    filepaths = list(_walk_html(root_dir))
+    
+    # Files are independent, so fix them across worker processes
+    with ProcessPoolExecutor() as executor:
+        fixed_files_count = sum(executor.map(_fix_one, filepaths, chunksize=32))
     
     print("-" * 30)
     print(f"Scan complete.")
-    print(f"HTML files scanned: {html_files_count}")
+    print(f"HTML files scanned: {len(filepaths)}")
     print(f"Files fixed: {fixed_files_count}")
 
 if __name__ == "__main__":
@@ -1,6 +1,15 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from .models import School, Subject, MasterStudent
+from .utils import get_active_school_choices
+
+
+def use_cached_school_choices(field):
+    """Render a school ModelChoiceField from the cached choices; the queryset still validates."""
+    choices = get_active_school_choices()
+    if field.empty_label is not None:
+        choices = [('', field.empty_label)] + choices
+    field.choices = choices
 
 
 class SchoolForm(forms.ModelForm):
@@ -38,10 +47,9 @@ class SchoolForm(forms.ModelForm):
             'is_active': forms.CheckboxInput(attrs={'class': 'form-checkbox'}),
         }
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['name'].required = True
-        self.fields['code'].required = True
+    def clean_code(self):
+        # Match School.save(), so the unique check sees the stored value
+        return self.cleaned_data['code'].strip().upper()
 
 
 class SubjectForm(forms.ModelForm):
@@ -67,6 +75,7 @@ class SubjectForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['school'].queryset = School.objects.filter(is_active=True)
         self.fields['school'].required = False
+        use_cached_school_choices(self.fields['school'])
 
 
 class MasterStudentUploadForm(forms.Form):
@@ -92,6 +101,10 @@ class MasterStudentUploadForm(forms.Form):
         help_text=_('If checked, all existing students for this school will be deleted before import.')
     )
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        use_cached_school_choices(self.fields['school'])
+    
     def clean_file(self):
         file = self.cleaned_data.get('file')
         if file:
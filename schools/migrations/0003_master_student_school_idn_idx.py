@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0002_school_logo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='masterstudent',
+            name='student_id_normalized',
+            field=models.CharField(max_length=20, verbose_name='Normalized ID'),
+        ),
+        migrations.AddIndex(
+            model_name='masterstudent',
+            index=models.Index(fields=['school', 'student_id_normalized'], name='ms_school_idn_idx'),
+        ),
+    ]
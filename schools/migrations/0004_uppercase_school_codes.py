@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:50
+
+from django.db import migrations
+
+
+def uppercase_codes(apps, schema_editor):
+    School = apps.get_model('schools', 'School')
+    taken = set(School.objects.values_list('code', flat=True))
+    for school in School.objects.all():
+        code = school.code.strip().upper()
+        # Leave codes alone that would clash with an existing upper-case code
+        if code != school.code and code not in taken:
+            taken.discard(school.code)
+            taken.add(code)
+            School.objects.filter(pk=school.pk).update(code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0003_master_student_school_idn_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(uppercase_codes, migrations.RunPython.noop),
+    ]
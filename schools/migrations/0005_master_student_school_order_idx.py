@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0004_uppercase_school_codes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='masterstudent',
+            index=models.Index(fields=['school', 'grade', 'section', 'surname', 'name'], name='ms_school_order_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counts(apps, schema_editor):
+    School = apps.get_model('schools', 'School')
+    MasterStudent = apps.get_model('schools', 'MasterStudent')
+    User = apps.get_model('accounts', 'User')
+    School.objects.update(
+        cached_student_count=Coalesce(
+            Subquery(
+                MasterStudent.objects.filter(school=OuterRef('pk')).order_by().values('school').annotate(
+                    c=Count('pk')
+                ).values('c')
+            ),
+            0
+        ),
+        cached_teacher_count=Coalesce(
+            Subquery(
+                User.objects.filter(primary_school=OuterRef('pk'), role='teacher').order_by().values(
+                    'primary_school'
+                ).annotate(c=Count('pk')).values('c')
+            ),
+            0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_trigram_search_indexes'),
+        ('schools', '0005_master_student_school_order_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='cached_student_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Students'),
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='cached_teacher_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Teachers'),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
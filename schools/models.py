@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 
 
@@ -23,6 +24,10 @@ class School(models.Model):
     # Soft delete for data persistence
     is_active = models.BooleanField(default=True, verbose_name=_('Active'))
     
+    # Counts for the school list, kept up to date by schools.signals
+    cached_student_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Students'))
+    cached_teacher_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Teachers'))
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -32,8 +37,35 @@ class School(models.Model):
         verbose_name_plural = _('Schools')
         ordering = ['name']
     
+    def save(self, *args, **kwargs):
+        # Codes are stored upper-case so the unique index also rejects case variants
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return self.name
+    
+    def update_cached_counts(self):
+        """Recalculate the stored student and teacher counts."""
+        from accounts.models import User
+        School.objects.filter(pk=self.pk).update(
+            cached_student_count=Coalesce(
+                models.Subquery(
+                    MasterStudent.objects.filter(school=models.OuterRef('pk')).order_by().values('school').annotate(
+                        c=models.Count('pk')
+                    ).values('c')
+                ),
+                0
+            ),
+            cached_teacher_count=Coalesce(
+                models.Subquery(
+                    User.objects.filter(primary_school=models.OuterRef('pk'), role='teacher').order_by().values(
+                        'primary_school'
+                    ).annotate(c=models.Count('pk')).values('c')
+                ),
+                0
+            ),
+        )
 
 
 class Subject(models.Model):
@@ -81,7 +113,7 @@ class MasterStudent(models.Model):
     # Original ID (preserves leading zeros as string)
     student_id = models.CharField(max_length=20, verbose_name=_('Student ID'))
     # Normalized ID for matching (integer converted to string, no leading zeros)
-    student_id_normalized = models.CharField(max_length=20, db_index=True, verbose_name=_('Normalized ID'))
+    student_id_normalized = models.CharField(max_length=20, verbose_name=_('Normalized ID'))
     
     # Student info
     name = models.CharField(max_length=100, verbose_name=_('First Name'))
@@ -97,6 +129,12 @@ class MasterStudent(models.Model):
         verbose_name_plural = _('Master Students')
         ordering = ['grade', 'section', 'surname', 'name']
         unique_together = ['school', 'student_id']
+        indexes = [
+            # ZipGrade matching: filter(school=..., student_id_normalized=...)
+            models.Index(fields=['school', 'student_id_normalized'], name='ms_school_idn_idx'),
+            # School detail list: filter(school=...).order_by('grade', 'section', 'surname', 'name')
+            models.Index(fields=['school', 'grade', 'section', 'surname', 'name'], name='ms_school_order_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         # Normalize the student ID for matching
@@ -110,10 +148,14 @@ class MasterStudent(models.Model):
         Handles both string and integer inputs.
         Example: '01251001' -> '1251001'
         """
+        stripped = str(raw_id).strip()
+        # Fast path: plain ASCII digits only need their leading zeros dropped
+        if stripped.isascii() and stripped.isdigit():
+            return stripped.lstrip('0') or '0'
         try:
-            return str(int(str(raw_id).strip()))
-        except (ValueError, TypeError):
-            return str(raw_id).strip()
+            return str(int(stripped))
+        except ValueError:
+            return stripped
     
     def __str__(self):
         return f"{self.surname} {self.name} ({self.student_id})"
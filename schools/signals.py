@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from .models import MasterStudent, School, Subject
+from .utils import (
+    ACTIVE_SCHOOLS_CACHE_KEY, ACTIVE_SUBJECTS_CACHE_KEY, bump_list_pages_generation, invalidate_grades,
+)
+
+
+@receiver([post_save, post_delete], sender=School)
+def invalidate_active_schools(sender, **kwargs):
+    """Drop the cached active-school choices."""
+    cache.delete(ACTIVE_SCHOOLS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_active_subjects(sender, **kwargs):
+    """Drop the cached active-subject list."""
+    cache.delete(ACTIVE_SUBJECTS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=MasterStudent)
+def invalidate_student_grades(sender, instance, **kwargs):
+    """Drop the cached grade dropdowns of the student's school."""
+    invalidate_grades(instance.school_id)
+
+
+@receiver([post_save, post_delete], sender=School)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=MasterStudent)
+@receiver([post_save, post_delete], sender=User)
+def invalidate_list_pages(sender, **kwargs):
+    """Change the school and subject list ETags; they show names and student/teacher counts."""
+    bump_list_pages_generation()
+
+
+@receiver([post_save, post_delete], sender=MasterStudent)
+def update_school_student_count(sender, instance, **kwargs):
+    """Keep School.cached_student_count in sync with its master students."""
+    School(pk=instance.school_id).update_cached_counts()
+
+
+def _may_change_teacher_count(update_fields):
+    """False for saves that can't touch role or school, such as the last_login update on login."""
+    return update_fields is None or bool({'role', 'primary_school'} & set(update_fields))
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_school(sender, instance, update_fields=None, **kwargs):
+    """Note the school a user is saved away from, so its teacher count is refreshed too."""
+    if instance.pk and _may_change_teacher_count(update_fields):
+        instance._previous_school_id = User.objects.filter(pk=instance.pk).values_list(
+            'primary_school_id', flat=True
+        ).first()
+
+
+@receiver([post_save, post_delete], sender=User)
+def update_school_teacher_count(sender, instance, update_fields=None, **kwargs):
+    """Keep School.cached_teacher_count in sync with its teachers."""
+    if not _may_change_teacher_count(update_fields):
+        return
+    school_ids = {instance.primary_school_id, getattr(instance, '_previous_school_id', None)}
+    for school_id in school_ids - {None}:
+        School(pk=school_id).update_cached_counts()
@@ -1,20 +1,23 @@
+from functools import lru_cache
+
 from django import template
-from django.urls import translate_url, reverse, resolve
+from django.urls import NoReverseMatch, Resolver404, translate_url, reverse, resolve
 from django.utils import translation
 
 register = template.Library()
 
-@register.simple_tag(takes_context=True)
-def switch_lang(context, lang_code):
+
+@lru_cache(maxsize=2048)
+def _translated_path(path, lang_code, active_lang):
     """
-    Returns the URL for the current page in the given language code.
-    Fixes issues where standard translate_url might fail with prefix logic.
+    Path of the page at `path` in the given language, or None if it can't be resolved.
+    Cached per (path, target language, active language): resolving the
+    language prefix depends on the active language. The query string is not part of the key.
     """
-    path = context['request'].path
     try:
         # First, try standard translate_url
         url = translate_url(path, lang_code)
-        
+
         # If it returns the same path (and prefixes differ), it failed
         # E.g. /ru/schools/ -> /ru/schools/ when asking for 'ky'
         # Check if the prefix implies failure
@@ -23,12 +26,28 @@ def switch_lang(context, lang_code):
              match = resolve(path)
              with translation.override(lang_code):
                  url = reverse(match.view_name, args=match.args, kwargs=match.kwargs)
-        
-        # Append query parameters if they exist
-        query = context['request'].GET.urlencode()
-        if query:
-            url = f"{url}?{query}"
-            
         return url
-    except Exception:
+    except (Resolver404, NoReverseMatch):
+        return None
+
+
+@register.simple_tag(takes_context=True)
+def switch_lang(context, lang_code):
+    """
+    Returns the URL for the current page in the given language code.
+    Fixes issues where standard translate_url might fail with prefix logic.
+    """
+    request = context['request']
+    path = request.path
+    url = _translated_path(path, lang_code, translation.get_language())
+    if url is None:
         return path # Fallback to current path
+
+    # Append query parameters if they exist; encoded once per render, not per language link
+    query = context.render_context.get('switch_lang_query')
+    if query is None:
+        query = context.render_context['switch_lang_query'] = request.GET.urlencode()
+    if query:
+        url = f"{url}?{query}"
+
+    return url
@@ -2,9 +2,98 @@
 Utility functions for schools app.
 Handles Excel file parsing and Smart ID matching.
 """
+import time
+
 import openpyxl
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 
+ACTIVE_SCHOOLS_CACHE_KEY = 'schools:active:list'
+ACTIVE_SCHOOLS_CACHE_TIMEOUT = 300
+ACTIVE_SUBJECTS_CACHE_KEY = 'schools:active_subjects:list'
+ACTIVE_SUBJECTS_CACHE_TIMEOUT = 300
+LIST_PAGES_GENERATION_KEY = 'schools:lists:generation'
+
+# Distinct grades for the student filter dropdowns; school_id is 'all' across schools
+GRADES_CACHE_KEY = 'schools:grades:{school_id}'
+GRADES_CACHE_TIMEOUT = 600
+
+# Consecutive fully blank rows after which a master student sheet is taken to have ended
+MAX_BLANK_ROWS = 50
+
+# Master student list header (lower-cased) -> field it holds
+MASTER_STUDENT_HEADERS = {
+    **dict.fromkeys(['id', 'student_id', 'studentid', 'id студента', 'ид', 'student id'], 'student_id'),
+    **dict.fromkeys(['name', 'first_name', 'firstname', 'имя', 'first name'], 'name'),
+    **dict.fromkeys(['surname', 'last_name', 'lastname', 'фамилия', 'last name'], 'surname'),
+    **dict.fromkeys(['class', 'grade', 'класс', 'class/grade'], 'grade'),
+    **dict.fromkeys(['section', 'группа', 'секция', 'group'], 'section'),
+}
+
+
+def get_active_school_choices():
+    """
+    (pk, name) pairs of active schools, cached for form <select>s.
+    Cleared by schools.signals whenever a school changes.
+    """
+    choices = cache.get(ACTIVE_SCHOOLS_CACHE_KEY)
+    if choices is None:
+        from .models import School
+        choices = list(School.objects.filter(is_active=True).values_list('pk', 'name'))
+        cache.set(ACTIVE_SCHOOLS_CACHE_KEY, choices, ACTIVE_SCHOOLS_CACHE_TIMEOUT)
+    return choices
+
+
+def get_active_subjects():
+    """
+    {'id', 'name'} dicts of active subjects, cached for the subject split pickers.
+    Cleared by schools.signals whenever a subject changes.
+    """
+    subjects = cache.get(ACTIVE_SUBJECTS_CACHE_KEY)
+    if subjects is None:
+        from .models import Subject
+        subjects = list(Subject.objects.filter(is_active=True).values('id', 'name'))
+        cache.set(ACTIVE_SUBJECTS_CACHE_KEY, subjects, ACTIVE_SUBJECTS_CACHE_TIMEOUT)
+    return subjects
+
+
+def get_grades(school=None):
+    """
+    Sorted distinct grades of a school's master students, or of all students.
+    Cleared by schools.signals whenever a master student changes.
+    """
+    from .models import MasterStudent
+    
+    students = MasterStudent.objects.all()
+    if school is not None:
+        students = students.filter(school=school)
+    return cache.get_or_set(
+        GRADES_CACHE_KEY.format(school_id=school.pk if school is not None else 'all'),
+        lambda: list(students.order_by('grade').values_list('grade', flat=True).distinct()),
+        GRADES_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_grades(school_id):
+    """Drop the cached grades of one school and of all schools."""
+    cache.delete_many([
+        GRADES_CACHE_KEY.format(school_id=school_id),
+        GRADES_CACHE_KEY.format(school_id='all'),
+    ])
+
+
+def get_list_pages_generation():
+    """Current generation of the school and subject list pages."""
+    # Seeded from the clock, so a counter evicted by cache culling never restarts
+    # at a value an ETag was already issued for
+    return cache.get_or_set(LIST_PAGES_GENERATION_KEY, time.time_ns, None)
+
+
+def bump_list_pages_generation():
+    """Mark the school and subject list pages as changed."""
+    # set() rather than incr(): the database cache's incr() re-saves with the default timeout
+    cache.set(LIST_PAGES_GENERATION_KEY, get_list_pages_generation() + 1, None)
+
 
 def parse_master_student_excel(file):
     """
@@ -17,99 +106,31 @@ def parse_master_student_excel(file):
     - class / grade / класс
     - section / группа
     
-    Returns:
-        list of dicts with student data
+    Yields:
+        dicts with student data, one per row, so large rosters are never
+        held in memory as a whole
         
     Raises:
-        ValueError if file format is invalid
+        ValueError if file format is invalid (on first iteration)
     """
+    # Read uploads spooled to disk by path, which both readers open faster than a file object
+    if hasattr(file, 'temporary_file_path'):
+        file = file.temporary_file_path()
+    
     try:
-        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
-        ws = wb.active
-        
-        # Get headers from first row
-        headers = []
-        for cell in ws[1]:
-            if cell.value:
-                headers.append(str(cell.value).lower().strip())
-            else:
-                headers.append('')
-        
-        # Map column names to expected fields
-        column_mapping = {}
-        
-        # Student ID
-        for i, h in enumerate(headers):
-            if h in ['id', 'student_id', 'studentid', 'id студента', 'ид', 'student id']:
-                column_mapping['student_id'] = i
-                break
-        
-        # Name
-        for i, h in enumerate(headers):
-            if h in ['name', 'first_name', 'firstname', 'имя', 'first name']:
-                column_mapping['name'] = i
-                break
-        
-        # Surname
-        for i, h in enumerate(headers):
-            if h in ['surname', 'last_name', 'lastname', 'фамилия', 'last name']:
-                column_mapping['surname'] = i
-                break
-        
-        # Grade/Class
-        for i, h in enumerate(headers):
-            if h in ['class', 'grade', 'класс', 'class/grade']:
-                column_mapping['grade'] = i
-                break
-        
-        # Section
-        for i, h in enumerate(headers):
-            if h in ['section', 'группа', 'секция', 'group']:
-                column_mapping['section'] = i
-                break
+        rows = _calamine_rows(file)
+        if rows is not None:
+            yield from _iter_master_student_rows(rows)
+            return
         
-        # Validate required columns
-        required = ['student_id', 'name', 'surname', 'grade', 'section']
-        missing = [col for col in required if col not in column_mapping]
-        
-        if missing:
-            raise ValueError(
-                _('Missing required columns: %(columns)s. Found headers: %(headers)s') % {
-                    'columns': ', '.join(missing),
-                    'headers': ', '.join(headers)
-                }
-            )
-        
-        # Parse rows
-        students = []
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            # Skip empty rows
-            if not row or not any(row):
-                continue
-            
-            try:
-                student_id = row[column_mapping['student_id']]
-                name = row[column_mapping['name']]
-                surname = row[column_mapping['surname']]
-                grade = row[column_mapping['grade']]
-                section = row[column_mapping['section']]
-                
-                # Skip if no student ID
-                if not student_id:
-                    continue
-                
-                students.append({
-                    'student_id': str(student_id).strip(),
-                    'name': str(name).strip() if name else '',
-                    'surname': str(surname).strip() if surname else '',
-                    'grade': str(grade).strip() if grade else '',
-                    'section': str(section).strip() if section else '',
-                })
-            except IndexError:
-                continue  # Skip incomplete rows
-        
-        wb.close()
-        return students
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            # Some tools save wrong sheet dimensions; read rows as they actually are
+            ws.reset_dimensions()
+            yield from _iter_master_student_rows(ws.iter_rows(values_only=True))
+        finally:
+            wb.close()
         
     except Exception as e:
         if 'Missing required columns' in str(e):
@@ -117,6 +138,102 @@ def parse_master_student_excel(file):
         raise ValueError(_('Error reading Excel file: %(error)s') % {'error': str(e)})
 
 
+def _calamine_rows(file):
+    """
+    Row values of a single-sheet workbook read with python-calamine, which parses
+    far faster than openpyxl. None when calamine is not installed, the workbook has
+    several sheets (openpyxl picks the active one), or calamine can't read the file;
+    the caller then falls back to openpyxl.
+    """
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        return None
+    is_path = isinstance(file, str)
+    try:
+        wb = CalamineWorkbook.from_path(file) if is_path else CalamineWorkbook.from_filelike(file)
+        if len(wb.sheet_names) == 1:
+            return wb.get_sheet_by_index(0).iter_rows()
+    except Exception:
+        pass
+    if not is_path:
+        file.seek(0)
+    return None
+
+
+def _iter_master_student_rows(rows):
+    """Map the header row to fields and yield one dict per student row."""
+    rows = iter(rows)
+    
+    # Get headers from first row
+    headers = []
+    for value in next(rows, ()):
+        if value:
+            headers.append(str(value).lower().strip())
+        else:
+            headers.append('')
+    
+    # Map column names to expected fields; the first matching column wins
+    column_mapping = {}
+    for i, h in enumerate(headers):
+        field = MASTER_STUDENT_HEADERS.get(h)
+        if field and field not in column_mapping:
+            column_mapping[field] = i
+    
+    # Validate required columns
+    required = ['student_id', 'name', 'surname', 'grade', 'section']
+    missing = [col for col in required if col not in column_mapping]
+    
+    if missing:
+        raise ValueError(
+            _('Missing required columns: %(columns)s. Found headers: %(headers)s') % {
+                'columns': ', '.join(missing),
+                'headers': ', '.join(headers)
+            }
+        )
+    
+    # Resolve column positions once instead of per row
+    sid_i, name_i, surname_i, grade_i, section_i = (column_mapping[field] for field in required)
+    
+    # Parse rows
+    width = len(headers)
+    blank_run = 0
+    for row in rows:
+        # openpyxl ends a row at its last filled cell once dimensions are reset;
+        # pad short rows so a blank trailing column reads as empty
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        
+        # Skip rows without a student ID (blank rows included) before any other work
+        student_id = _cell_text(row[sid_i])
+        if not student_id:
+            # Sheets edited by hand can carry thousands of phantom empty rows at the end;
+            # stop once a long run of fully blank rows is reached
+            blank_run = 0 if any(row) else blank_run + 1
+            if blank_run >= MAX_BLANK_ROWS:
+                break
+            continue
+        blank_run = 0
+        
+        yield {
+            'student_id': student_id,
+            'name': _cell_text(row[name_i]),
+            'surname': _cell_text(row[surname_i]),
+            'grade': _cell_text(row[grade_i]),
+            'section': _cell_text(row[section_i]),
+        }
+
+
+def _cell_text(value):
+    """Stripped text of a cell value; '' for empty cells. Strings skip the str() copy."""
+    if isinstance(value, str):
+        return value.strip()
+    # calamine returns every number as a float; write whole numbers as openpyxl's ints would be
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if value else ''
+
+
 def normalize_student_id(raw_id):
     """
     Normalize student ID by removing leading zeros.
@@ -127,21 +244,49 @@ def normalize_student_id(raw_id):
         '1251001' -> '1251001'
         1251001 -> '1251001'
     """
+    stripped = str(raw_id).strip()
+    # Plain ASCII digits: drop leading zeros without an int round-trip
+    if stripped.isascii() and stripped.isdigit():
+        return stripped.lstrip('0') or '0'
     try:
-        # Convert to string, strip whitespace, convert to int to remove leading zeros
-        return str(int(str(raw_id).strip()))
-    except (ValueError, TypeError):
+        # Anything else (signs, underscores, non-ASCII digits) goes through int()
+        return str(int(stripped))
+    except ValueError:
         # If conversion fails, just return stripped string
-        return str(raw_id).strip()
+        return stripped
+
+
+def build_student_index(school, normalized_ids=None):
+    """
+    Map normalized student ID -> MasterStudent for one school, so a whole
+    ZipGrade upload can be matched with a single query.
+    Matches find_student_by_id: where two students share a normalized ID,
+    the first in default ordering wins.
+    When normalized_ids is given, only those students are loaded.
+    """
+    from .models import MasterStudent
+    
+    index = {}
+    students = MasterStudent.objects.filter(school=school)
+    if normalized_ids is not None:
+        students = students.filter(student_id_normalized__in=set(normalized_ids))
+    students = students.only(
+        'school', 'student_id', 'student_id_normalized', 'name', 'surname', 'grade', 'section'
+    )
+    for student in students:
+        index.setdefault(student.student_id_normalized, student)
+    return index
 
 
-def find_student_by_id(school, raw_student_id):
+def find_student_by_id(school, raw_student_id, index=None):
     """
     Find a MasterStudent by ID, handling leading zero discrepancies.
     
     Args:
         school: School instance
         raw_student_id: Student ID from ZipGrade (may have different format)
+        index: optional dict from build_student_index(school); when given,
+            the lookup is done in memory instead of querying
     
     Returns:
         MasterStudent instance or None if not found
@@ -150,6 +295,9 @@ def find_student_by_id(school, raw_student_id):
     
     normalized_id = normalize_student_id(raw_student_id)
     
+    if index is not None:
+        return index.get(normalized_id)
+    
     # Try to find by normalized ID
     student = MasterStudent.objects.filter(
         school=school,
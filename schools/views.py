@@ -1,29 +1,53 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.utils import translation
 from django.utils.translation import gettext_lazy as _
+from django.core.cache import cache
+from django.db import transaction
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import Q
 from django.http import JsonResponse
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition
+from itertools import islice
+import hashlib
 
 from accounts.decorators import super_admin_required, teacher_or_admin_required
 from .models import School, Subject, MasterStudent
 from .forms import SchoolForm, SubjectForm, MasterStudentUploadForm, MasterStudentForm
-from .utils import parse_master_student_excel
+from .utils import (
+    bump_list_pages_generation, get_grades, get_list_pages_generation, invalidate_grades,
+    parse_master_student_excel,
+)
+
+# Model instances built per bulk upsert during a roster import
+MASTER_STUDENT_UPSERT_CHUNK = 5000
+
+
+def list_page_etag(request):
+    """ETag for the school and subject lists from the list data generation and the request."""
+    if len(messages.get_messages(request)):
+        return None
+    key = '|'.join(str(part) for part in [
+        request.path, request.GET.urlencode(), get_list_pages_generation(),
+        request.user.pk, translation.get_language(),
+    ])
+    return hashlib.md5(key.encode()).hexdigest()
 
 
 # ============ School Views ============
 
-@login_required
 @super_admin_required
+@condition(etag_func=list_page_etag)
 def school_list_view(request):
     """List all schools."""
     search = request.GET.get('search', '')
     status = request.GET.get('status', '')
     
-    schools = School.objects.annotate(
-        student_count=Count('master_students'),
-        teacher_count=Count('users', filter=Q(users__role='teacher'))
+    # Student and teacher counts are stored on School by schools.signals
+    schools = School.objects.only(
+        'name', 'code', 'logo', 'is_active', 'cached_student_count', 'cached_teacher_count'
     ).order_by('name')
     
     if search:
@@ -47,7 +71,6 @@ def school_list_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def school_create_view(request):
     """Create a new school."""
@@ -67,7 +90,6 @@ def school_create_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def school_edit_view(request, pk):
     """Edit an existing school."""
@@ -90,7 +112,6 @@ def school_edit_view(request, pk):
     })
 
 
-@login_required
 @super_admin_required
 def school_delete_view(request, pk):
     """Delete a school (soft delete)."""
@@ -105,7 +126,6 @@ def school_delete_view(request, pk):
     return render(request, 'schools/school_confirm_delete.html', {'school': school})
 
 
-@login_required
 @super_admin_required
 def school_detail_view(request, pk):
     """View school details with students."""
@@ -115,7 +135,10 @@ def school_detail_view(request, pk):
     search = request.GET.get('search', '')
     grade_filter = request.GET.get('grade', '')
     
-    students = school.master_students.all().order_by('grade', 'section', 'surname', 'name')
+    # Only the columns the table shows; school is kept for the related manager's back-reference
+    students = school.master_students.only(
+        'school', 'student_id', 'name', 'surname', 'grade', 'section'
+    ).order_by('grade', 'section', 'surname', 'name')
     
     if search:
         students = students.filter(
@@ -128,7 +151,7 @@ def school_detail_view(request, pk):
         students = students.filter(grade=grade_filter)
     
     # Get unique grades for filter dropdown
-    grades = school.master_students.values_list('grade', flat=True).distinct().order_by('grade')
+    grades = get_grades(school)
     
     paginator = Paginator(students, 50)
     page = request.GET.get('page', 1)
@@ -145,14 +168,16 @@ def school_detail_view(request, pk):
 
 # ============ Subject Views ============
 
-@login_required
 @super_admin_required
+@condition(etag_func=list_page_etag)
 def subject_list_view(request):
     """List all subjects."""
     search = request.GET.get('search', '')
     school_filter = request.GET.get('school', '')
     
-    subjects = Subject.objects.filter(is_active=True).select_related('school').order_by('name')
+    subjects = Subject.objects.filter(is_active=True).select_related('school').only(
+        'name', 'code', 'school__name'
+    ).order_by('name')
     
     if search:
         subjects = subjects.filter(name__icontains=search)
@@ -160,7 +185,7 @@ def subject_list_view(request):
     if school_filter:
         subjects = subjects.filter(school_id=school_filter)
     
-    schools = School.objects.filter(is_active=True)
+    schools = School.objects.filter(is_active=True).only('name')
     
     paginator = Paginator(subjects, 20)
     page = request.GET.get('page', 1)
@@ -178,7 +203,6 @@ def subject_list_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def subject_create_view(request):
     """Create a new subject."""
@@ -198,7 +222,6 @@ def subject_create_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def subject_edit_view(request, pk):
     """Edit an existing subject."""
@@ -221,7 +244,6 @@ def subject_edit_view(request, pk):
     })
 
 
-@login_required
 @super_admin_required
 def subject_delete_view(request, pk):
     """Delete a subject (soft delete)."""
@@ -238,11 +260,12 @@ def subject_delete_view(request, pk):
 
 # ============ Master Student Views ============
 
-@login_required
 @super_admin_required
 def master_student_list_view(request):
     """List all master students."""
-    students = MasterStudent.objects.all().select_related('school')
+    students = MasterStudent.objects.select_related('school').only(
+        'student_id', 'name', 'surname', 'grade', 'section', 'school__name'
+    )
     
     # Search
     search = request.GET.get('search', '')
@@ -271,24 +294,32 @@ def master_student_list_view(request):
     students = paginator.get_page(page)
     
     # Get unique grades for filter
-    grades = MasterStudent.objects.values_list('grade', flat=True).distinct().order_by('grade')
+    grades = get_grades()
     
     context = {
         'students': students,
         'search': search,
         'school_filter': int(school_filter) if school_filter else '',
         'grade_filter': grade_filter,
-        'schools': School.objects.filter(is_active=True),
+        'schools': School.objects.filter(is_active=True).only('name'),
         'grades': grades,
     }
     
     return render(request, 'schools/master_student_list.html', context)
 
 
-@login_required
-@super_admin_required
+@csrf_exempt
 def master_student_upload_view(request):
     """Upload Master Student List from Excel file."""
+    # Spool the upload to a temporary file so the workbook is parsed from disk;
+    # handlers can only be swapped before request.POST is read, hence the inner csrf_protect
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    return _master_student_upload(request)
+
+
+@csrf_protect
+@super_admin_required
+def _master_student_upload(request):
     if request.method == 'POST':
         form = MasterStudentUploadForm(request.POST, request.FILES)
         if form.is_valid():
@@ -297,36 +328,63 @@ def master_student_upload_view(request):
             replace_existing = form.cleaned_data['replace_existing']
             
             try:
-                # Parse Excel file
-                students_data = parse_master_student_excel(file)
+                # Stream rows from the Excel file straight into one entry per student ID;
+                # later rows win when the file repeats a student ID
+                rows = {data['student_id']: data for data in parse_master_student_excel(file)}
                 
-                if not students_data:
+                if not rows:
                     messages.error(request, _('No valid student data found in the file.'))
                     return redirect('schools:master_student_upload')
                 
-                # Delete existing if requested
-                if replace_existing:
-                    MasterStudent.objects.filter(school=school).delete()
-                
-                # Create students
-                created_count = 0
-                updated_count = 0
+                # Replace and upsert together, so a failed import leaves the list untouched
+                with transaction.atomic():
+                    # Delete existing if requested: unlink results and delete in one statement each,
+                    # rather than loading every student to send post_delete; the caches those
+                    # signals would clear are reset after the import
+                    if replace_existing:
+                        from zipgrade.models import ExamResult
+                        existing = MasterStudent.objects.filter(school=school)
+                        ExamResult.objects.filter(student__in=existing).update(student=None)
+                        existing._raw_delete(existing.db)
                 
-                for data in students_data:
-                    obj, created = MasterStudent.objects.update_or_create(
-                        school=school,
-                        student_id=data['student_id'],
-                        defaults={
-                            'name': data['name'],
-                            'surname': data['surname'],
-                            'grade': data['grade'],
-                            'section': data['section'],
-                        }
+                    # Compare against the school's IDs in Python: an IN list of every uploaded ID
+                    # can exceed the database's parameter limit on large sheets
+                    existing_ids = rows.keys() & set(
+                        MasterStudent.objects.filter(school=school).values_list('student_id', flat=True)
                     )
-                    if created:
-                        created_count += 1
-                    else:
-                        updated_count += 1
+                    # Upsert all students in batches instead of one update_or_create per row,
+                    # building model instances a chunk at a time so large rosters stay light
+                    items = iter(rows.items())
+                    while chunk := list(islice(items, MASTER_STUDENT_UPSERT_CHUNK)):
+                        MasterStudent.objects.bulk_create(
+                            [
+                                MasterStudent(
+                                    school=school,
+                                    student_id=student_id,
+                                    student_id_normalized=MasterStudent.normalize_id(student_id),
+                                    name=data['name'],
+                                    surname=data['surname'],
+                                    grade=data['grade'],
+                                    section=data['section'],
+                                )
+                                for student_id, data in chunk
+                            ],
+                            batch_size=1000,
+                            update_conflicts=True,
+                            unique_fields=['school', 'student_id'],
+                            update_fields=['student_id_normalized', 'name', 'surname', 'grade', 'section', 'updated_at'],
+                        )
+                    # The bulk statements send no signals, so refresh the stored counts here
+                    school.update_cached_counts()
+                created_count = len(rows) - len(existing_ids)
+                updated_count = len(existing_ids)
+                
+                # bulk_create sends no post_save, so drop cached analytics explicitly
+                from analytics.utils import AnalyticsHelper, CLASSES_CACHE_KEY
+                cache.delete(CLASSES_CACHE_KEY.format(school_id=school.pk))
+                AnalyticsHelper.bump_cache_generation()
+                bump_list_pages_generation()
+                invalidate_grades(school.pk)
                 
                 messages.success(
                     request,
@@ -349,7 +407,6 @@ def master_student_upload_view(request):
     })
 
 
-@login_required
 @super_admin_required
 def master_student_add_view(request, school_pk):
     """Manually add a student to a school."""
@@ -374,18 +431,17 @@ def master_student_add_view(request, school_pk):
     })
 
 
-@login_required
 @super_admin_required
 def master_student_edit_view(request, pk):
     """Edit a student."""
-    student = get_object_or_404(MasterStudent, pk=pk)
+    student = get_object_or_404(MasterStudent.objects.select_related('school'), pk=pk)
     
     if request.method == 'POST':
         form = MasterStudentForm(request.POST, instance=student)
         if form.is_valid():
             form.save()
             messages.success(request, _('Student updated successfully.'))
-            return redirect('schools:detail', pk=student.school.pk)
+            return redirect('schools:detail', pk=student.school_id)
     else:
         form = MasterStudentForm(instance=student)
     
@@ -398,12 +454,11 @@ def master_student_edit_view(request, pk):
     })
 
 
-@login_required
 @super_admin_required
 def master_student_delete_view(request, pk):
     """Delete a student."""
     student = get_object_or_404(MasterStudent, pk=pk)
-    school_pk = student.school.pk
+    school_pk = student.school_id
     
     if request.method == 'POST':
         student.delete()
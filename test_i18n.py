@@ -3,11 +3,6 @@ import os
 import sys
 import django
 from django.conf import settings
-
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aims_exam.settings')
-django.setup()
-
 from django.utils import translation
 from django.urls import translate_url
 
@@ -69,5 +64,12 @@ def test_i18n():
     else:
          print("SUCCESS: translate_url changed prefix")
 
-if __name__ == "__main__":
+def main():
+    # Setup Django only when run as a script, so importing this module has no side effects
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aims_exam.settings')
+    django.setup()
     test_i18n()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 from django import forms
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from .models import ZipGradeExam, SubjectSplit
 from schools.models import School, Subject
 
+# First bytes of every .xlsx file (a zip archive)
+XLSX_SIGNATURE = b'PK\x03\x04'
+
 
 class ZipGradeUploadForm(forms.Form):
     """Form for uploading ZipGrade CSV files."""
@@ -42,6 +46,12 @@ class ZipGradeUploadForm(forms.Form):
     def clean_file(self):
         file = self.cleaned_data.get('file')
         if file:
+            # Check file size (max 10MB) first: it is known without reading the file
+            if file.size > 10 * 1024 * 1024:
+                raise forms.ValidationError(
+                    _('File too large. Maximum size is 10MB.')
+                )
+            
             # Check file extension
             name = file.name.lower()
             valid_extensions = ('.csv', '.txt', '.xlsx', '.xls')
@@ -50,11 +60,14 @@ class ZipGradeUploadForm(forms.Form):
                     _('Invalid file format. Please upload a CSV or XLSX file.')
                 )
             
-            # Check file size (max 10MB)
-            if file.size > 10 * 1024 * 1024:
-                raise forms.ValidationError(
-                    _('File too large. Maximum size is 10MB.')
-                )
+            # Workbooks are zip archives; reject renamed or corrupt files before parsing
+            if name.endswith(('.xlsx', '.xls')):
+                header = file.read(len(XLSX_SIGNATURE))
+                file.seek(0)
+                if header != XLSX_SIGNATURE:
+                    raise forms.ValidationError(
+                        _('Invalid file format. Please upload a CSV or XLSX file.')
+                    )
         
         return file
 
@@ -83,7 +96,7 @@ class SubjectSplitForm(forms.ModelForm):
         # Filter subjects by exam's school
         if exam and exam.school:
             self.fields['subject'].queryset = Subject.objects.filter(
-                models.Q(school=exam.school) | models.Q(school__isnull=True)
+                Q(school=exam.school) | Q(school__isnull=True)
             )
     
     def clean(self):
@@ -105,21 +118,25 @@ class SubjectSplitForm(forms.ModelForm):
                         {'total': self.exam.total_questions}
                     )
                 
-                # Check for overlapping ranges
-                existing_splits = self.exam.subject_splits.all()
+                # Check for overlapping ranges in the database; the first clash in order is reported
+                overlapping = self.exam.subject_splits.filter(
+                    start_question__lte=end, end_question__gte=start
+                )
                 if self.instance.pk:
-                    existing_splits = existing_splits.exclude(pk=self.instance.pk)
+                    overlapping = overlapping.exclude(pk=self.instance.pk)
+                split = overlapping.select_related('subject').only(
+                    'start_question', 'end_question', 'subject__name'
+                ).first()
                 
-                for split in existing_splits:
-                    if (start <= split.end_question and end >= split.start_question):
-                        raise forms.ValidationError(
-                            _('Question range overlaps with existing split: %(subject)s (Q%(start)s-Q%(end)s)') %
-                            {
-                                'subject': split.subject.name,
-                                'start': split.start_question,
-                                'end': split.end_question
-                            }
-                        )
+                if split:
+                    raise forms.ValidationError(
+                        _('Question range overlaps with existing split: %(subject)s (Q%(start)s-Q%(end)s)') %
+                        {
+                            'subject': split.subject.name,
+                            'start': split.start_question,
+                            'end': split.end_question
+                        }
+                    )
         
         return cleaned_data
 
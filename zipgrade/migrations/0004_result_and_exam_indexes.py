@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0006_school_cached_counts'),
+        ('zipgrade', '0003_examresult_manual_class_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['exam', '-percentage'], name='zg_result_exam_pct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subjectsplit',
+            index=models.Index(fields=['exam', 'start_question'], name='zg_split_exam_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zipgradeexam',
+            index=models.Index(fields=['school', '-exam_date', '-created_at'], name='zg_exam_school_date_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:14
+
+import json
+
+from django.db import migrations, models
+
+
+def _clean_json_text(model, field):
+    """Rewrite blank or malformed JSON text as '{}' so the column can become a JSONField."""
+    for pk, text in model.objects.values_list('pk', field).iterator():
+        try:
+            value = json.loads(text) if text else None
+        except (TypeError, ValueError):
+            value = None
+        cleaned = json.dumps(value) if value is not None else '{}'
+        if cleaned != text:
+            model.objects.filter(pk=pk).update(**{field: cleaned})
+
+
+def clean_json_text(apps, schema_editor):
+    _clean_json_text(apps.get_model('zipgrade', 'ExamResult'), 'answers')
+    _clean_json_text(apps.get_model('zipgrade', 'SubjectResult'), 'question_results')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zipgrade', '0004_result_and_exam_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_json_text, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='examresult',
+            name='answers',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Answers (JSON)'),
+        ),
+        migrations.AlterField(
+            model_name='subjectresult',
+            name='question_results',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Question Results (JSON)'),
+        ),
+    ]
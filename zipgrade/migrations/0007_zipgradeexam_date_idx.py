@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zipgrade', '0006_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='zipgradeexam',
+            index=models.Index(fields=['-exam_date', '-created_at'], name='zg_exam_date_idx'),
+        ),
+    ]
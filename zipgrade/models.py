@@ -1,9 +1,58 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from accounts.models import User
 from schools.models import School, Subject, MasterStudent
 
 
+class ExamFolderQuerySet(models.QuerySet):
+    """QuerySet for exam folders."""
+    
+    def with_counts(self):
+        """Annotate exam count, used by exam_count."""
+        qs = self.annotate(
+            _exam_count=models.Count('exams'),
+        )
+        # Meta.ordering is not applied to GROUP BY queries, so keep it explicit
+        if not qs.query.order_by:
+            qs = qs.order_by(*self.model._meta.ordering)
+        return qs
+
+
+class ZipGradeExamQuerySet(models.QuerySet):
+    """QuerySet for ZipGrade exams."""
+    
+    def with_average_score(self):
+        """Annotate the average result percentage, used by average_score."""
+        # A correlated subquery rather than a join + GROUP BY: the paginator's COUNT stays
+        # a plain count and only the rows of the requested page are averaged
+        average = (
+            ExamResult.objects.filter(exam=models.OuterRef('pk'))
+            .order_by()
+            .values('exam')
+            .annotate(avg=models.Avg('percentage'))
+            .values('avg')
+        )
+        return self.annotate(_average_score=models.Subquery(average))
+
+
+class ExamResultManager(models.Manager):
+    """Loads the student and exam used by display_name and __str__.
+    
+    Use only() or select_related(None) where a query doesn't need them.
+    """
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('student', 'exam')
+
+
+class SubjectResultManager(models.Manager):
+    """Loads the result, its student and the subject used by __str__."""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('result__student', 'subject_split__subject')
+
+
 class ExamFolder(models.Model):
     """Folder for organizing ZipGrade exams."""
     
@@ -27,6 +76,8 @@ class ExamFolder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ExamFolderQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Exam Folder')
         verbose_name_plural = _('Exam Folders')
@@ -39,6 +90,8 @@ class ExamFolder(models.Model):
     
     @property
     def exam_count(self):
+        if getattr(self, '_exam_count', None) is not None:
+            return self._exam_count
         return self.exams.count()
 
 
@@ -81,22 +134,87 @@ class ZipGradeExam(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ZipGradeExamQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('ZipGrade Exam')
         verbose_name_plural = _('ZipGrade Exams')
         ordering = ['-exam_date', '-created_at']
+        indexes = [
+            models.Index(fields=['school', '-exam_date', '-created_at'], name='zg_exam_school_date_idx'),
+            models.Index(fields=['-exam_date', '-created_at'], name='zg_exam_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.school.name} ({self.exam_date})"
     
-    @property
+    @cached_property
     def average_score(self):
-        """Calculate average score across all results."""
-        results = self.results.all()
-        if not results.exists():
+        """Calculate average score across all results (cached per instance; templates read it repeatedly)."""
+        if '_average_score' in self.__dict__:
+            avg = self._average_score
+        else:
+            avg = self.results.aggregate(avg=models.Avg('percentage'))['avg']
+        if avg is None:
             return 0
-        total = sum(r.percentage for r in results)
-        return round(total / results.count(), 1)
+        return round(avg, 1)
+    
+    def create_results_bulk(self, parsed_results, splits=(), answer_key=None, student_index=None):
+        """Create this exam's results from parser output, and subject results for splits
+        when an answer key is given to mark the answers against.
+        
+        Rows repeating a ZipGrade student ID keep the last row's values. bulk_create
+        sends no post_save, so callers drop any per-student caches. Returns the results.
+        """
+        from .utils import calculate_subject_scores_bulk
+        
+        student_index = student_index or {}
+        rows = {data['student_id']: data for data in parsed_results}
+        results = []
+        for data in rows.values():
+            student = student_index.get(data['student_id_normalized'])
+            results.append(ExamResult(
+                exam=self,
+                student=student,
+                zipgrade_student_id=data['student_id'],
+                zipgrade_first_name=data['first_name'],
+                zipgrade_last_name=data['last_name'],
+                earned_points=data['earned'],
+                max_points=data['max_points'],
+                percentage=data['percentage'],
+                answers=data['answers'],
+                is_unknown=student is None,
+            ))
+        
+        split_data = [{
+            'split_id': split.pk,
+            'subject_id': split.subject_id,
+            'start': split.start_question,
+            'end': split.end_question,
+            'points': float(split.points_per_question),
+        } for split in splits]
+        
+        with transaction.atomic():
+            ExamResult.objects.bulk_create(results, batch_size=500)
+            # Without an answer key there is nothing to mark; callers prorate instead
+            if split_data and answer_key:
+                all_scores = calculate_subject_scores_bulk(
+                    (result.answers for result in results), answer_key, split_data, True,
+                )
+                subject_results = [
+                    SubjectResult(
+                        result=result,
+                        subject_split_id=score['subject_split_id'],
+                        earned_points=score['earned'],
+                        max_points=score['max_points'],
+                        percentage=score['percentage'],
+                        question_results=score.get('question_results', {}),
+                    )
+                    for result, scores in zip(results, all_scores)
+                    for score in scores
+                ]
+                SubjectResult.objects.bulk_create(subject_results, batch_size=1000)
+        return results
 
 
 class SubjectSplit(models.Model):
@@ -132,6 +250,9 @@ class SubjectSplit(models.Model):
         verbose_name_plural = _('Subject Splits')
         ordering = ['start_question']
         unique_together = ['exam', 'subject']
+        indexes = [
+            models.Index(fields=['exam', 'start_question'], name='zg_split_exam_start_idx'),
+        ]
     
     def __str__(self):
         return f"{self.subject.name}: Q{self.start_question}-Q{self.end_question}"
@@ -175,8 +296,8 @@ class ExamResult(models.Model):
     max_points = models.DecimalField(max_digits=7, decimal_places=2, verbose_name=_('Max Points'))
     percentage = models.DecimalField(max_digits=5, decimal_places=2, verbose_name=_('Percentage'))
     
-    # Answer data (JSON string of answers)
-    answers = models.TextField(blank=True, verbose_name=_('Answers (JSON)'))
+    # Answer data ({question_num: answer})
+    answers = models.JSONField(default=dict, blank=True, verbose_name=_('Answers (JSON)'))
     
     # Unknown student flag
     is_unknown = models.BooleanField(default=False, verbose_name=_('Unknown Student'))
@@ -188,11 +309,16 @@ class ExamResult(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ExamResultManager()
+    
     class Meta:
         verbose_name = _('Exam Result')
         verbose_name_plural = _('Exam Results')
         ordering = ['-percentage']
         unique_together = ['exam', 'zipgrade_student_id']
+        indexes = [
+            models.Index(fields=['exam', '-percentage'], name='zg_result_exam_pct_idx'),
+        ]
     
     def __str__(self):
         if self.student:
@@ -205,10 +331,15 @@ class ExamResult(models.Model):
         if self.student:
             return self.student.full_name
         if self.manual_first_name or self.manual_last_name:
-            return f"{self.manual_last_name} {self.manual_first_name}".strip()
+            return ' '.join(part for part in (self.manual_last_name, self.manual_first_name) if part)
         if self.zipgrade_first_name or self.zipgrade_last_name:
-            return f"{self.zipgrade_last_name} {self.zipgrade_first_name}".strip()
+            return ' '.join(part for part in (self.zipgrade_last_name, self.zipgrade_first_name) if part)
         return f"Unknown ({self.zipgrade_student_id})"
+    
+    @property
+    def answers_dict(self):
+        """Answers as {question_num: answer}; the JSONField is decoded once on load."""
+        return self.answers if isinstance(self.answers, dict) else {}
 
 
 class SubjectResult(models.Model):
@@ -232,7 +363,9 @@ class SubjectResult(models.Model):
     percentage = models.DecimalField(max_digits=5, decimal_places=2, verbose_name=_('Percentage'))
     
     # Correct/incorrect per question (JSON)
-    question_results = models.TextField(blank=True, verbose_name=_('Question Results (JSON)'))
+    question_results = models.JSONField(default=dict, blank=True, verbose_name=_('Question Results (JSON)'))
+    
+    objects = SubjectResultManager()
     
     class Meta:
         verbose_name = _('Subject Result')
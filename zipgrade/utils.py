@@ -9,11 +9,61 @@ Parses ZipGrade export files (CSV format) and extracts:
 import csv
 import json
 import io
-from decimal import Decimal
-from typing import List, Dict, Any, Tuple, Optional
+import re
+import math
+import operator
+import os
+import tempfile
+import time
+import uuid
+from typing import List, Dict, Any, Iterable, Iterator, Sequence, Tuple, Optional
+
+import orjson
 
 from schools.utils import normalize_student_id
 
+# Answer column header patterns, matched against every header of an export
+_ANSWER_PREFIX_RE = re.compile(r'Q\s*[-_]?\s*\d|(?:QUESTION|KEY|VOPROS|ВОПРОС).*?\d')
+_TRAILING_DIGIT_RE = re.compile(r'(\d+)$')
+# Score text after the decimal comma, percent sign and underscores are normalised;
+# accepts the finite numbers Decimal() would, exponents included ('75', '.5', '1e2')
+_NUMBER_RE = re.compile(r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?')
+
+
+def _parse_number(row: Sequence[Any], index: Optional[int]) -> float:
+    """Score in row[index] as a float; 0.0 when missing or unparseable.
+    
+    XLSX cells already hold numbers and are taken as is; text cells may use a
+    decimal comma and a trailing percent sign.
+    """
+    if index is None or index >= len(row):
+        return 0.0
+    value = row[index]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = float(value)
+        return number if math.isfinite(number) else 0.0
+    text = '' if value is None else str(value).strip().replace('%', '').replace(',', '.').replace('_', '')
+    # Blank and dirty cells are common; reject them without raising
+    if not _NUMBER_RE.fullmatch(text):
+        return 0.0
+    number = float(text)
+    return number if math.isfinite(number) else 0.0
+
+
+def _most_common_max_points(results: List[Dict[str, Any]]) -> Optional[int]:
+    """Most frequent positive max_points among results, or None if there is none.
+    
+    Counted in one pass over the results; ties go to the value seen first.
+    """
+    counts = {}
+    for result in results:
+        max_points = result['max_points']
+        if max_points > 0:
+            counts[max_points] = counts.get(max_points, 0) + 1
+    if not counts:
+        return None
+    return int(max(counts, key=counts.get))
+
 
 class ZipGradeParser:
     """Parser for ZipGrade CSV and XLSX export files."""
@@ -27,6 +77,17 @@ class ZipGradeParser:
     PERCENT_COLUMNS = ['Percent', 'Percentage', 'Pct', '%']
     CLASS_COLUMNS = ['Class', 'Section', 'Period', 'Grade']
     
+    # Lower-cased header -> column_map key, built once from the lists above
+    _COLUMN_FIELDS = {
+        **dict.fromkeys((c.lower() for c in STUDENT_ID_COLUMNS), 'student_id'),
+        **dict.fromkeys((c.lower() for c in FIRST_NAME_COLUMNS), 'first_name'),
+        **dict.fromkeys((c.lower() for c in LAST_NAME_COLUMNS), 'last_name'),
+        **dict.fromkeys((c.lower() for c in EARNED_COLUMNS), 'earned'),
+        **dict.fromkeys((c.lower() for c in MAX_COLUMNS), 'max'),
+        **dict.fromkeys((c.lower() for c in PERCENT_COLUMNS), 'percent'),
+        **dict.fromkeys((c.lower() for c in CLASS_COLUMNS), 'class'),
+    }
+    
     def __init__(self, file_content: bytes, encoding: str = 'utf-8', filename: str = ''):
         """Initialize parser with file content.
         
@@ -41,37 +102,43 @@ class ZipGradeParser:
         self.headers = []
         self.data = []
         self.answer_columns = []
+        self.answer_column_indices = []
+        self.answer_keys = []
         self.column_map = {}
+        self.column_index = {}
+        self.header_positions = {}
     
     def _is_xlsx(self) -> bool:
         """Check if file is an XLSX file."""
         return self.filename.endswith('.xlsx') or self.filename.endswith('.xls')
     
-    def _parse_xlsx(self) -> Tuple[List[str], List[Dict[str, str]]]:
-        """Parse XLSX file and return headers and rows as dicts."""
+    def _parse_xlsx(self) -> Tuple[List[str], Iterator[tuple]]:
+        """Parse XLSX file and return headers and an iterator of row value tuples.
+        
+        Rows are read from the sheet as they are consumed rather than loaded up front;
+        the workbook is closed once the iterator is exhausted.
+        """
         from openpyxl import load_workbook
         
         wb = load_workbook(filename=io.BytesIO(self.file_content), read_only=True, data_only=True)
-        ws = wb.active
-        
-        rows = list(ws.iter_rows(values_only=True))
-        if not rows:
-            return [], []
+        rows = wb.active.iter_rows(values_only=True)
         
         # First row is headers
-        headers = [str(cell) if cell is not None else '' for cell in rows[0]]
-        
-        # Convert remaining rows to dicts
-        data = []
-        for row in rows[1:]:
-            row_dict = {}
-            for i, cell in enumerate(row):
-                if i < len(headers):
-                    row_dict[headers[i]] = str(cell) if cell is not None else ''
-            data.append(row_dict)
+        header_row = next(rows, None)
+        if header_row is None:
+            wb.close()
+            return [], iter(())
+        headers = [str(cell) if cell is not None else '' for cell in header_row]
         
-        wb.close()
-        return headers, data
+        return headers, self._iter_xlsx_rows(wb, rows)
+    
+    @staticmethod
+    def _iter_xlsx_rows(wb, rows) -> Iterator[tuple]:
+        """Yield the remaining sheet rows, closing the workbook at the end."""
+        try:
+            yield from rows
+        finally:
+            wb.close()
         
     def parse(self) -> Dict[str, Any]:
         """Parse the ZipGrade file and return structured data.
@@ -83,123 +150,110 @@ class ZipGradeParser:
             - results: List of student results
             - errors: List of parsing errors
         """
-        errors = []
-        results = []
+        if self._is_xlsx():
+            return self._parse_xlsx_full()
+        return self._parse_csv_full()
+    
+    @staticmethod
+    def _error_result(message: str) -> Dict[str, Any]:
+        """Parse result for a file that could not be read at all."""
+        return {
+            'total_questions': 0,
+            'total_students': 0,
+            'results': [],
+            'errors': [message]
+        }
+    
+    def _parse_xlsx_full(self) -> Dict[str, Any]:
+        """Parse an XLSX export."""
+        self.headers, rows_data = self._parse_xlsx()
+        if not self.headers:
+            return self._error_result('Empty or invalid XLSX file.')
         
+        # Map columns and find answer columns
+        self._map_columns()
+        self._find_answer_columns()
+        
+        results, errors = self._parse_rows(rows_data)
+        # Sheets often carry extra trailing columns, so trust max points over detected columns
+        return self._finalize(results, errors, truncate_to_max_points=True)
+    
+    def _parse_csv_full(self) -> Dict[str, Any]:
+        """Parse a CSV export."""
+        text_content = self._decode_text()
+        if text_content is None:
+            return self._error_result('Could not decode file. Please ensure it is a valid CSV or XLSX file.')
+        
+        reader = csv.reader(io.StringIO(text_content))
+        self.headers = next(reader, None) or []
+        if not self.headers:
+            return self._error_result('Empty or invalid CSV file.')
+        
+        # Map columns
+        self._map_columns()
+        
+        # Find answer columns (usually named like Q1, Q2, etc. or 1, 2, 3)
+        self._find_answer_columns()
+        
+        results, errors = self._parse_rows(reader)
+        return self._finalize(results, errors)
+    
+    def _decode_text(self) -> Optional[str]:
+        """Decode CSV content, falling back through common encodings; None if none fits."""
         try:
-            # Check if XLSX format
-            if self._is_xlsx():
-                self.headers, rows_data = self._parse_xlsx()
-                if not self.headers:
-                    return {
-                        'total_questions': 0,
-                        'total_students': 0,
-                        'results': [],
-                        'errors': ['Empty or invalid XLSX file.']
-                    }
-                
-                # Map columns and find answer columns
-                self._map_columns()
-                self._find_answer_columns()
-                
-                # Parse each row
-                for row_num, row in enumerate(rows_data, start=2):
-                    try:
-                        result = self._parse_row(row)
-                        if result:
-                            results.append(result)
-                    except Exception as e:
-                        errors.append(f"Row {row_num}: {str(e)}")
-                
-                
-                # Check for max points to fix possible over-detection of columns
-                # If we detected way more columns than max points, trust max points
-                max_values = [r['max_points'] for r in results if r['max_points'] > 0]
-                if max_values:
-                    from collections import Counter
-                    most_common = Counter(max_values).most_common(1)
-                    if most_common:
-                        likely_max_points = int(most_common[0][0])
-                        
-                        # If we found significantly more columns than expected, truncate
-                        if len(self.answer_columns) > likely_max_points:
-                             # Also update the derived count if needed
-                            derived_total_questions = likely_max_points
-                            # Truncate answer columns to match likely question count
-                            self.answer_columns = self.answer_columns[:likely_max_points]
-
-                return {
-                    'total_questions': derived_total_questions if derived_total_questions > 0 else len(self.answer_columns),
-                    'total_students': len(results),
-                    'results': results,
-                    'errors': errors,
-                    'answer_columns': self.answer_columns,
-                }
-            
-            # CSV parsing (original logic)
-            # Decode file content
             text_content = self.file_content.decode(self.encoding)
-            
-            # Try to fix common encoding issues
-            if '\ufeff' in text_content:
-                text_content = text_content.replace('\ufeff', '')
-                
         except UnicodeDecodeError:
             # Try different encodings
             for enc in ['utf-8-sig', 'latin-1', 'cp1251', 'cp1252']:
                 try:
                     text_content = self.file_content.decode(enc)
                     self.encoding = enc
-                    break
+                    return text_content
                 except UnicodeDecodeError:
                     continue
-            else:
-                return {
-                    'total_questions': 0,
-                    'total_students': 0,
-                    'results': [],
-                    'errors': ['Could not decode file. Please ensure it is a valid CSV or XLSX file.']
-                }
-        
-        # Parse CSV
-        reader = csv.DictReader(io.StringIO(text_content))
-        self.headers = reader.fieldnames or []
-        
-        if not self.headers:
-            return {
-                'total_questions': 0,
-                'total_students': 0,
-                'results': [],
-                'errors': ['Empty or invalid CSV file.']
-            }
-        
-        # Map columns
-        self._map_columns()
-        
-        # Find answer columns (usually named like Q1, Q2, etc. or 1, 2, 3)
-        self._find_answer_columns()
+            return None
         
-        # Parse each row
-        for row_num, row in enumerate(reader, start=2):
+        # Try to fix common encoding issues
+        if '\ufeff' in text_content:
+            text_content = text_content.replace('\ufeff', '')
+        return text_content
+    
+    def _parse_rows(self, rows: Iterable[Sequence[Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Parse data rows (numbered from 2, after the header) into results and errors."""
+        results = []
+        errors = []
+        for row_num, row in enumerate(rows, start=2):
             try:
                 result = self._parse_row(row)
                 if result:
                     results.append(result)
             except Exception as e:
                 errors.append(f"Row {row_num}: {str(e)}")
+        return results, errors
+    
+    def _finalize(
+        self,
+        results: List[Dict[str, Any]],
+        errors: List[str],
+        truncate_to_max_points: bool = False,
+    ) -> Dict[str, Any]:
+        """Settle the question count and build the parse result.
         
+        Args:
+            results: Parsed student results
+            errors: Row errors
+            truncate_to_max_points: Drop detected answer columns beyond the most
+                common max points (assuming 1 point per question)
+        """
+        likely_max_points = _most_common_max_points(results)
+        if (truncate_to_max_points and likely_max_points is not None
+                and len(self.answer_columns) > likely_max_points):
+            self.answer_columns = self.answer_columns[:likely_max_points]
         
-        # Calculate derived total questions from max points if no columns found
+        # Infer the question count from max points if no answer columns were found
         derived_total_questions = len(self.answer_columns)
-        if derived_total_questions == 0 and results:
-            # Try to infer from max points (assuming 1 point per question)
-            max_values = [r['max_points'] for r in results if r['max_points'] > 0]
-            if max_values:
-                # Use the most common max score or simply the max
-                from collections import Counter
-                most_common = Counter(max_values).most_common(1)
-                if most_common:
-                    derived_total_questions = int(most_common[0][0])
+        if derived_total_questions == 0 and likely_max_points is not None:
+            derived_total_questions = likely_max_points
         
         return {
             'total_questions': derived_total_questions,
@@ -210,51 +264,18 @@ class ZipGradeParser:
         }
     
     def _map_columns(self):
-        """Map column names to standardized names."""
+        """Map column names to standardized names; a later matching header wins."""
         for header in self.headers:
-            header_lower = header.lower().strip()
-            
-            # Student ID
-            for col in self.STUDENT_ID_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['student_id'] = header
-                    break
-            
-            # First name
-            for col in self.FIRST_NAME_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['first_name'] = header
-                    break
-            
-            # Last name
-            for col in self.LAST_NAME_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['last_name'] = header
-                    break
-            
-            # Earned points
-            for col in self.EARNED_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['earned'] = header
-                    break
-            
-            # Max points
-            for col in self.MAX_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['max'] = header
-                    break
-            
-            # Percentage
-            for col in self.PERCENT_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['percent'] = header
-                    break
-            
-            # Class
-            for col in self.CLASS_COLUMNS:
-                if col.lower() == header_lower:
-                    self.column_map['class'] = header
-                    break
+            field = self._COLUMN_FIELDS.get(header.lower().strip())
+            if field:
+                self.column_map[field] = header
+        
+        # Rows are value sequences, so resolve each mapped column to its position once.
+        # A repeated header resolves to its last column, as a dict keyed by header would.
+        self.header_positions = {header: i for i, header in enumerate(self.headers)}
+        self.column_index = {
+            field: self.header_positions[header] for field, header in self.column_map.items()
+        }
     
     
     def _find_answer_columns(self):
@@ -279,64 +300,50 @@ class ZipGradeParser:
             if upper_header in ['DATE', 'TIME', 'SCHOOL', 'CLASS', 'SECTION', 'TEACHER', 'SUBJECT', 'EXAM']:
                 continue
             
-            # Pattern matching priorities:
-            
-            # Priority 1: Starts with 'Q' followed by digit (Q1, Q 1, Q-1)
-            import re
-            if re.match(r'^Q\s*[-_]?\s*\d+', upper_header):
-                candidates.append(header)
-                continue
-                
-            # Priority 2: Starts with "Question" or "Key" or "Vopros"
-            if re.match(r'^(QUESTION|KEY|VOPROS|ВОПРОС).*?\d+', upper_header):
-                candidates.append(header)
-                continue
-
-            # Priority 3: It is JUST a digit (1, 2, 3)
-            if header_stripped.isdigit():
-                candidates.append(header)
-                continue
-                
-            # Priority 4: Ends with a digit (and isn't huge, likely a q number)
-            # Use regex to find the last number
-            match = re.search(r'(\d+)$', header_stripped)
+            # Most answer headers end in their question number (Q1, 1, Question 1),
+            # so one search both accepts the header and gives its sort key
+            match = _TRAILING_DIGIT_RE.search(header_stripped)
             if match:
-                # If we found a number safely at the end, and it wasn't a mapped column, assumes it's a question
-                candidates.append(header)
+                candidates.append((int(match.group(1)), header))
                 continue
-                
-        # Remove duplicates while preserving order? No, set/list might mess up.
-        # Candidates list should be unique by definition of loop.
-        
-        self.answer_columns = candidates
-
-        # Sort by extracted question number
-        def get_q_number(col):
-            col = col.strip()
-            import re
-            match = re.search(r'(\d+)$', col)
-            if match:
-                 return int(match.group(1))
-            return 999999 # Put at end if no number found (unlikely given filters)
-        
-        self.answer_columns.sort(key=get_q_number)
+            
+            # Otherwise accept a 'Q' or "Question"/"Key"/"Vopros" prefix followed by a
+            # digit (e.g. "Q1 Answer"); these sort after the numbered columns
+            if _ANSWER_PREFIX_RE.match(upper_header):
+                candidates.append((999999, header))
+        
+        # Sort by extracted question number; the sort is stable for equal numbers
+        candidates.sort(key=lambda candidate: candidate[0])
+        self.answer_columns = [header for _, header in candidates]
+        self.answer_column_indices = [self.header_positions[col] for col in self.answer_columns]
+        # Answers are keyed by 1-based question number; the key strings are shared by every row
+        self.answer_keys = [str(i) for i in range(1, len(self.answer_columns) + 1)]
     
-    def _parse_row(self, row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    def _parse_row(self, row: Sequence[Any]) -> Optional[Dict[str, Any]]:
         """Parse a single row of data.
         
         Args:
-            row: Dictionary of column name -> value
+            row: Cell values in header order (CSV strings or XLSX values)
             
         Returns:
             Parsed result dictionary or None if row should be skipped
         """
+        width = len(self.headers)
+        
+        def cell(index):
+            """Text of the cell at index; '' for empty or missing cells."""
+            if index is None or index >= len(row):
+                return ''
+            value = row[index]
+            return '' if value is None else str(value)
+        
+        column_index = self.column_index
+        
         # Get student ID
-        student_id = ''
-        if 'student_id' in self.column_map:
-            student_id = str(row.get(self.column_map['student_id'], '')).strip()
+        student_id = cell(column_index.get('student_id')).strip()
         
         # Skip empty rows
-        if not student_id and not any(row.values()):
+        if not student_id and not any(value is not None and value != '' for value in row[:width]):
             return None
         
         # Use a placeholder for missing student IDs
@@ -344,71 +351,65 @@ class ZipGradeParser:
             student_id = 'NO_ID'
         
         # Get names
-        first_name = ''
-        if 'first_name' in self.column_map:
-            first_name = str(row.get(self.column_map['first_name'], '')).strip()
-        
-        last_name = ''
-        if 'last_name' in self.column_map:
-            last_name = str(row.get(self.column_map['last_name'], '')).strip()
+        first_name = cell(column_index.get('first_name')).strip()
+        last_name = cell(column_index.get('last_name')).strip()
         
         # Get scores
-        earned = Decimal('0')
-        if 'earned' in self.column_map:
-            try:
-                earned_str = str(row.get(self.column_map['earned'], '0')).strip()
-                earned = Decimal(earned_str.replace(',', '.')) if earned_str else Decimal('0')
-            except:
-                pass
-        
-        max_points = Decimal('0')
-        if 'max' in self.column_map:
-            try:
-                max_str = str(row.get(self.column_map['max'], '0')).strip()
-                max_points = Decimal(max_str.replace(',', '.')) if max_str else Decimal('0')
-            except:
-                pass
+        earned = _parse_number(row, column_index.get('earned'))
+        max_points = _parse_number(row, column_index.get('max'))
         
         # Calculate percentage
-        percentage = Decimal('0')
-        if 'percent' in self.column_map:
-            try:
-                pct_str = str(row.get(self.column_map['percent'], '0')).strip()
-                pct_str = pct_str.replace('%', '').replace(',', '.')
-                percentage = Decimal(pct_str) if pct_str else Decimal('0')
-            except:
-                pass
+        if 'percent' in column_index:
+            percentage = _parse_number(row, column_index['percent'])
         elif max_points > 0:
             percentage = (earned / max_points) * 100
+        else:
+            percentage = 0.0
         
         # Get class/section
-        class_name = ''
-        if 'class' in self.column_map:
-            class_name = str(row.get(self.column_map['class'], '')).strip()
+        class_name = cell(column_index.get('class')).strip()
         
         # Get answers
-        answers = {}
-        for i, col in enumerate(self.answer_columns, start=1):
-            answer = str(row.get(col, '')).strip().upper()
-            answers[str(i)] = answer
+        answers = {
+            key: cell(index).strip().upper()
+            for key, index in zip(self.answer_keys, self.answer_column_indices)
+        }
         
         return {
             'student_id': student_id,
             'student_id_normalized': normalize_student_id(student_id),
             'first_name': first_name,
             'last_name': last_name,
-            'earned': float(earned),
-            'max_points': float(max_points),
-            'percentage': float(round(percentage, 2)),
+            'earned': earned,
+            'max_points': max_points,
+            'percentage': round(percentage, 2),
             'class_name': class_name,
             'answers': answers,
         }
 
 
+def _answers_by_question(values: Dict[str, str], size: int) -> List[str]:
+    """Lay out {question_num: answer} as a list indexed by question number."""
+    laid_out = [''] * size
+    for q_str, value in values.items():
+        try:
+            q_num = int(q_str)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= q_num < size:
+            laid_out[q_num] = value
+    return laid_out
+
+
+# Stand-in for a blank answer key entry; compares unequal to every answer
+_NO_KEY = object()
+
+
 def calculate_subject_scores(
     answers: Dict[str, str],
     answer_key: Dict[str, str],
     subject_splits: List[Dict],
+    with_details: bool = False,
 ) -> List[Dict]:
     """Calculate per-subject scores based on question ranges.
     
@@ -416,50 +417,137 @@ def calculate_subject_scores(
         answers: Student's answers {question_num: answer}
         answer_key: Correct answers {question_num: correct_answer}
         subject_splits: List of {'subject_id': int, 'start': int, 'end': int, 'points': float}
+        with_details: Also return per-question 'question_results'
         
     Returns:
         List of subject scores
     """
-    results = []
+    return calculate_subject_scores_bulk([answers], answer_key, subject_splits, with_details)[0]
+
+
+def calculate_subject_scores_bulk(
+    answers_list: Iterable[Dict[str, str]],
+    answer_key: Dict[str, str],
+    subject_splits: List[Dict],
+    with_details: bool = False,
+) -> List[List[Dict]]:
+    """Calculate per-subject scores for many students against one answer key.
+    
+    The split ranges and the answer key layout are prepared once, not per student.
     
+    Returns:
+        One list of subject scores per entry of answers_list, in order
+    """
+    # Answers are laid out by question number so each split is a pair of slices
+    size = max((split['end'] for split in subject_splits), default=0) + 1
+    key_arr = _answers_by_question(answer_key, size)
+    split_ranges = []
     for split in subject_splits:
-        start_q = split['start']
-        end_q = split['end']
-        points = split.get('points', 1.0)
-        
-        correct = 0
-        total = 0
-        question_results = {}
-        
-        for q_num in range(start_q, end_q + 1):
-            q_str = str(q_num)
-            student_answer = answers.get(q_str, '')
-            correct_answer = answer_key.get(q_str, '')
+        key_slice = key_arr[split['start']:split['end'] + 1]
+        # Blank keys become a sentinel no answer equals, so matches can be counted in C
+        match_slice = [k or _NO_KEY for k in key_slice]
+        split_ranges.append((
+            split['subject_id'],
+            split.get('split_id'),
+            split['start'],
+            split['end'] + 1,
+            split.get('points', 1.0),
+            key_slice,
+            match_slice,
+        ))
+    
+    all_scores = []
+    for answers in answers_list:
+        answers_arr = _answers_by_question(answers, size)
+        results = []
+        for subject_id, split_id, start_q, stop_q, points, key_slice, match_slice in split_ranges:
+            student_slice = answers_arr[start_q:stop_q]
+            correct = sum(map(operator.eq, student_slice, match_slice))
+            total = max(stop_q - start_q, 0)
             
-            total += 1
-            is_correct = student_answer == correct_answer if correct_answer else False
-            question_results[q_str] = {
-                'answer': student_answer,
-                'correct': correct_answer,
-                'is_correct': is_correct
-            }
+            earned = correct * points
+            max_pts = total * points
+            pct = (earned / max_pts * 100) if max_pts > 0 else 0
             
-            if is_correct:
-                correct += 1
-        
-        earned = correct * points
-        max_pts = total * points
-        pct = (earned / max_pts * 100) if max_pts > 0 else 0
-        
-        results.append({
-            'subject_id': split['subject_id'],
-            'subject_split_id': split.get('split_id'),
-            'earned': earned,
-            'max_points': max_pts,
-            'percentage': round(pct, 2),
-            'correct_count': correct,
-            'total_count': total,
-            'question_results': question_results,
-        })
+            subject_score = {
+                'subject_id': subject_id,
+                'subject_split_id': split_id,
+                'earned': earned,
+                'max_points': max_pts,
+                'percentage': round(pct, 2),
+                'correct_count': correct,
+                'total_count': total,
+            }
+            if with_details:
+                subject_score['question_results'] = {
+                    str(q_num): {
+                        'answer': a,
+                        'correct': k,
+                        'is_correct': bool(k) and a == k,
+                    }
+                    for q_num, a, k in zip(range(start_q, stop_q), student_slice, key_slice)
+                }
+            results.append(subject_score)
+        all_scores.append(results)
     
-    return results
+    return all_scores
+
+
+# Stored parse results awaiting confirmation; older ones belong to abandoned uploads
+PARSE_RESULT_DIR = os.path.join(tempfile.gettempdir(), 'zipgrade_previews')
+PARSE_RESULT_MAX_AGE = 24 * 60 * 60
+
+
+def _parse_result_path(token: str) -> Optional[str]:
+    """File holding a stored parse result; None for a malformed token."""
+    if not isinstance(token, str) or len(token) != 32 or not token.isalnum():
+        return None
+    return os.path.join(PARSE_RESULT_DIR, f'{token}.json')
+
+
+def _discard_stale_parse_results() -> None:
+    """Delete parse results of uploads abandoned before confirmation."""
+    cutoff = time.time() - PARSE_RESULT_MAX_AGE
+    with os.scandir(PARSE_RESULT_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+
+def store_parse_result(parse_result: Dict[str, Any]) -> str:
+    """Write a parse result to a temporary file and return its token.
+    
+    Keeps the (potentially large) parsed rows out of the session, which is
+    loaded on every request the user makes until the upload is confirmed.
+    """
+    os.makedirs(PARSE_RESULT_DIR, exist_ok=True)
+    _discard_stale_parse_results()
+    token = uuid.uuid4().hex
+    with open(_parse_result_path(token), 'wb') as f:
+        f.write(orjson.dumps(parse_result))
+    return token
+
+
+def load_parse_result(token: str) -> Optional[Dict[str, Any]]:
+    """Parse result stored under token, or None if it is gone."""
+    path = _parse_result_path(token)
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def discard_parse_result(token: str) -> None:
+    """Delete a stored parse result, if it still exists."""
+    path = _parse_result_path(token)
+    if path is not None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
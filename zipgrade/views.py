@@ -1,21 +1,28 @@
 import json
+from itertools import islice
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction
+from django.db.models import F
+from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 
 from accounts.decorators import teacher_or_admin_required, super_admin_required
 from schools.models import MasterStudent
-from schools.utils import normalize_student_id
+from schools.utils import build_student_index, get_active_subjects, normalize_student_id
 from .models import ZipGradeExam, SubjectSplit, ExamResult, SubjectResult
 from .forms import ZipGradeUploadForm, SubjectSplitForm
-from .utils import ZipGradeParser
+from .utils import ZipGradeParser, discard_parse_result, load_parse_result, store_parse_result
+
+# Parsed rows shown on the upload preview page
+PREVIEW_ROWS = 50
+# Exam results loaded per batch when subject results are recalculated
+RECALCULATE_CHUNK_SIZE = 500
 
 
-@login_required
 @teacher_or_admin_required
 def upload_view(request):
     """ZipGrade file upload view."""
@@ -42,13 +49,16 @@ def upload_view(request):
                 messages.error(request, _('No student data found in the file.'))
                 return render(request, 'zipgrade/upload.html', {'form': form})
             
-            # Store in session for preview
+            # Store for preview; the session only keeps the token of the stored parse result
+            previous = request.session.get('zipgrade_preview')
+            if previous:
+                discard_parse_result(previous.get('parse_result_token'))
             request.session['zipgrade_preview'] = {
                 'school_id': school.id,
                 'title': title,
                 'exam_date': str(exam_date),
                 'filename': file.name,
-                'parse_result': parse_result,
+                'parse_result_token': store_parse_result(parse_result),
             }
             
             return redirect('zipgrade:preview')
@@ -58,62 +68,57 @@ def upload_view(request):
     return render(request, 'zipgrade/upload.html', {'form': form})
 
 
-@login_required
 @teacher_or_admin_required
 def preview_view(request):
     """Preview parsed ZipGrade data before saving."""
     preview_data = request.session.get('zipgrade_preview')
+    parse_result = load_parse_result(preview_data.get('parse_result_token')) if preview_data else None
     
-    if not preview_data:
+    if parse_result is None:
         messages.warning(request, _('No upload data found. Please upload a file first.'))
         return redirect('zipgrade:upload')
     
-    from schools.models import School, Subject
+    from schools.models import School
     school = get_object_or_404(School, pk=preview_data['school_id'])
-    parse_result = preview_data['parse_result']
-    
-    # Match students to master list
-    matched_results = []
-    unknown_count = 0
     
-    for result in parse_result['results']:
-        normalized_id = result['student_id_normalized']
-        
-        # Try to find student in master list
-        master_student = MasterStudent.objects.filter(
-            school=school,
-            student_id_normalized=normalized_id
-        ).first()
-        
-        result['matched_student'] = master_student
-        result['is_unknown'] = master_student is None
-        
-        if master_student is None:
-            unknown_count += 1
-        
-        matched_results.append(result)
+    # Match students to master list, loaded once instead of queried per row
+    results = parse_result['results']
+    student_index = build_student_index(
+        school, [result['student_id_normalized'] for result in results]
+    )
+    unknown_count = sum(
+        1 for result in results if result['student_id_normalized'] not in student_index
+    )
+    
+    # Only the rows shown are annotated; copies keep model instances out of the session data
+    preview_results = []
+    for result in results[:PREVIEW_ROWS]:
+        master_student = student_index.get(result['student_id_normalized'])
+        preview_results.append({
+            **result,
+            'matched_student': master_student,
+            'is_unknown': master_student is None,
+        })
     
     # Get subjects for subject split dropdown
-    subjects = Subject.objects.filter(is_active=True).values('id', 'name')
-    subjects_json = json.dumps(list(subjects))
+    subjects_json = json.dumps(get_active_subjects())
     
     context = {
         'school': school,
         'title': preview_data['title'],
         'exam_date': preview_data['exam_date'],
         'filename': preview_data['filename'],
-        'results': matched_results[:50],  # Show first 50 for preview
-        'total_students': len(matched_results),
+        'results': preview_results,
+        'total_students': len(results),
         'total_questions': parse_result['total_questions'],
         'unknown_count': unknown_count,
-        'has_more': len(matched_results) > 50,
+        'has_more': len(results) > PREVIEW_ROWS,
         'subjects_json': subjects_json,
     }
     
     return render(request, 'zipgrade/preview.html', context)
 
 
-@login_required
 @teacher_or_admin_required
 def confirm_upload_view(request):
     """Confirm and save the ZipGrade data."""
@@ -121,13 +126,13 @@ def confirm_upload_view(request):
         return redirect('zipgrade:preview')
     
     preview_data = request.session.get('zipgrade_preview')
-    if not preview_data:
+    parse_result = load_parse_result(preview_data.get('parse_result_token')) if preview_data else None
+    if parse_result is None:
         messages.warning(request, _('No upload data found. Please upload a file first.'))
         return redirect('zipgrade:upload')
     
     from schools.models import School, Subject
     school = get_object_or_404(School, pk=preview_data['school_id'])
-    parse_result = preview_data['parse_result']
     
     # Parse subject splits from POST data
     split_count = int(request.POST.get('split_count', 0))
@@ -156,85 +161,50 @@ def confirm_upload_view(request):
                 total_students=len(parse_result['results']),
             )
             
-            # Create subject splits
-            subject_splits = []
-            for split_data in subject_splits_data:
-                subject = get_object_or_404(Subject, pk=split_data['subject_id'])
-                split = SubjectSplit.objects.create(
+            # Create subject splits, with their subjects fetched in one query
+            subjects = Subject.objects.in_bulk([d['subject_id'] for d in subject_splits_data])
+            if any(d['subject_id'] not in subjects for d in subject_splits_data):
+                raise Http404('No Subject matches the given query.')
+            subject_splits = SubjectSplit.objects.bulk_create([
+                SubjectSplit(
                     exam=exam,
-                    subject=subject,
+                    subject=subjects[split_data['subject_id']],
                     start_question=split_data['start_question'],
                     end_question=split_data['end_question'],
                 )
-                subject_splits.append(split)
+                for split_data in subject_splits_data
+            ])
             
-            unknown_count = 0
-            
-            # Create results
-            for result_data in parse_result['results']:
-                normalized_id = result_data['student_id_normalized']
-                
-                # Find matched student
-                master_student = MasterStudent.objects.filter(
-                    school=school,
-                    student_id_normalized=normalized_id
-                ).first()
-                
-                is_unknown = master_student is None
-                if is_unknown:
-                    unknown_count += 1
-                
-                # Use update_or_create to handle duplicates in the uploaded file
-                exam_result, created = ExamResult.objects.update_or_create(
-                    exam=exam,
-                    zipgrade_student_id=result_data['student_id'],
-                    defaults={
-                        'student': master_student,
-                        'zipgrade_first_name': result_data['first_name'],
-                        'zipgrade_last_name': result_data['last_name'],
-                        'earned_points': result_data['earned'],
-                        'max_points': result_data['max_points'],
-                        'percentage': result_data['percentage'],
-                        'answers': json.dumps(result_data['answers']),
-                        'is_unknown': is_unknown,
-                    }
-                )
-                
-                # Calculate subject results if splits defined
-                if subject_splits:
-                    answers = result_data['answers']
-                    for split in subject_splits:
-                        # Extract answers for this subject's question range
-                        start_idx = split.start_question - 1  # 0-indexed
-                        end_idx = split.end_question  # end is exclusive in slice
-                        subject_answers = answers[start_idx:end_idx] if len(answers) >= end_idx else []
-                        
-                        # Calculate score (1 point per correct answer)
-                        correct_count = sum(1 for a in subject_answers if a.get('correct', False))
-                        max_points = split.question_count
-                        earned_points = correct_count
-                        percentage = (earned_points / max_points * 100) if max_points > 0 else 0
-                        
-                        SubjectResult.objects.update_or_create(
-                            result=exam_result,
-                            subject_split=split,
-                            defaults={
-                                'earned_points': earned_points,
-                                'max_points': max_points,
-                                'percentage': round(percentage, 2),
-                                'question_results': json.dumps(subject_answers),
-                            }
-                        )
+            # Create results in bulk
+            results = exam.create_results_bulk(
+                parse_result['results'],
+                student_index=build_student_index(
+                    school, [data['student_id_normalized'] for data in parse_result['results']]
+                ),
+            )
+            # No answer key is uploaded, so score the splits the same way as ones added later
+            if subject_splits:
+                _recalculate_subject_results(exam)
+            unknown_count = sum(1 for result in results if result.is_unknown)
             
-            # Update unknown count
+            # Repeated student IDs collapse into one result, so count what was saved
+            exam.total_students = len(results)
             exam.unknown_students = unknown_count
-            exam.save()
+            exam.save(update_fields=['total_students', 'unknown_students', 'updated_at'])
+        
+        # bulk_create sends no post_save, so drop the students' cached exam lists here
+        from analytics.utils import STUDENT_EXAM_IDS_CACHE_KEY
+        cache.delete_many([
+            STUDENT_EXAM_IDS_CACHE_KEY.format(source='zipgrade', student_id=result.student_id)
+            for result in results if result.student_id
+        ])
         
         # Clear session data
+        discard_parse_result(preview_data['parse_result_token'])
         del request.session['zipgrade_preview']
         
         messages.success(request, _('Successfully imported %(count)s student results.') % {
-            'count': len(parse_result['results'])
+            'count': len(results)
         })
         
         return redirect('zipgrade:exam_detail', pk=exam.pk)
@@ -244,22 +214,22 @@ def confirm_upload_view(request):
         return redirect('zipgrade:preview')
 
 
-@login_required
 @teacher_or_admin_required
 def cancel_upload_view(request):
     """Cancel the upload and clear session data."""
     if 'zipgrade_preview' in request.session:
+        discard_parse_result(request.session['zipgrade_preview'].get('parse_result_token'))
         del request.session['zipgrade_preview']
     return redirect('zipgrade:upload')
 
 
 from django.db.models import Q
 
-@login_required
 @teacher_or_admin_required
 def results_view(request):
     """List all ZipGrade exams."""
-    exams = ZipGradeExam.objects.all().select_related('school', 'uploaded_by')
+    # The list shows each exam's average; annotate it instead of one query per row
+    exams = ZipGradeExam.objects.select_related('school', 'uploaded_by').with_average_score()
     
     # Filter by school for non-super-admins
     if request.user.role != 'super_admin' and request.user.primary_school:
@@ -307,13 +277,19 @@ def results_view(request):
     return render(request, 'zipgrade/results.html', context)
 
 
-@login_required
 @teacher_or_admin_required
 def exam_detail_view(request, pk):
     """View exam details and results."""
-    exam = get_object_or_404(ZipGradeExam, pk=pk)
+    # The header shows the school and uploader; load them with the exam
+    exam = get_object_or_404(ZipGradeExam.objects.select_related('school', 'uploaded_by'), pk=pk)
     
-    results = exam.results.all()
+    # Only the columns the results table shows, with each linked student in the same query
+    results = exam.results.select_related(None).select_related('student').only(
+        'id', 'exam_id', 'zipgrade_student_id', 'zipgrade_first_name', 'zipgrade_last_name',
+        'manual_first_name', 'manual_last_name', 'manual_class_name',
+        'earned_points', 'max_points', 'percentage', 'is_unknown',
+        'student__id', 'student__name', 'student__surname', 'student__grade', 'student__section',
+    )
     
     # Filter
     show_unknown = request.GET.get('unknown')
@@ -330,8 +306,8 @@ def exam_detail_view(request, pk):
             Q(zipgrade_first_name__icontains=search) |
             Q(zipgrade_last_name__icontains=search) |
             Q(zipgrade_student_id__icontains=search) |
-            Q(student__first_name__icontains=search) |
-            Q(student__last_name__icontains=search)
+            Q(student__name__icontains=search) |
+            Q(student__surname__icontains=search)
         )
     
     # Sort
@@ -350,13 +326,12 @@ def exam_detail_view(request, pk):
         'search': search,
         'show_unknown': show_unknown,
         'sort': sort,
-        'subject_splits': exam.subject_splits.all(),
+        'subject_splits': exam.subject_splits.select_related('subject'),
     }
     
     return render(request, 'zipgrade/exam_detail.html', context)
 
 
-@login_required
 @teacher_or_admin_required
 def add_subject_split_view(request, exam_pk):
     """Add subject split to an exam."""
@@ -386,7 +361,6 @@ def add_subject_split_view(request, exam_pk):
     return render(request, 'zipgrade/subject_split_form.html', context)
 
 
-@login_required
 @teacher_or_admin_required
 def edit_subject_split_view(request, pk):
     """Edit a subject split."""
@@ -416,7 +390,6 @@ def edit_subject_split_view(request, pk):
     return render(request, 'zipgrade/subject_split_form.html', context)
 
 
-@login_required
 @teacher_or_admin_required
 def delete_subject_split_view(request, pk):
     """Delete a subject split."""
@@ -440,67 +413,53 @@ def delete_subject_split_view(request, pk):
 
 def _recalculate_subject_results(exam):
     """Recalculate all subject results for an exam."""
-    from .utils import calculate_subject_scores
-    
     splits = list(exam.subject_splits.all())
     if not splits:
         return
     
-    # Build split data
-    split_data = []
-    for split in splits:
-        split_data.append({
-            'split_id': split.pk,
-            'subject_id': split.subject_id,
-            'start': split.start_question,
-            'end': split.end_question,
-            'points': float(split.points_per_question),
-        })
+    # Max points per split, worked out once rather than for every result
+    split_max_points = [(split, split.question_count * float(split.points_per_question)) for split in splits]
     
     # We need an answer key - for now, skip calculation if no key available
     # In a real implementation, you'd store the answer key or mark correct answers
     # For now, we'll just create basic subject results based on ranges
     
-    for result in exam.results.all():
-        try:
-            answers = json.loads(result.answers) if result.answers else {}
-        except:
-            answers = {}
-        
-        # Delete existing subject results for this result
-        SubjectResult.objects.filter(result=result).delete()
+    # Replace the exam's subject results in one transaction
+    with transaction.atomic():
+        # One DELETE statement instead of loading every row to send post_delete;
+        # the analytics cache those signals would clear is reset below
+        stale = SubjectResult.objects.filter(result__exam=exam)
+        stale._raw_delete(stale.db)
         
-        # Create new subject results
-        for split in splits:
-            # Count questions in range that have answers
-            start_q = split.start_question
-            end_q = split.end_question
-            points = float(split.points_per_question)
-            
-            total_questions = end_q - start_q + 1
-            answered_count = 0
-            
-            for q in range(start_q, end_q + 1):
-                if str(q) in answers and answers[str(q)]:
-                    answered_count += 1
-            
-            # For now, use prorated score based on overall percentage
-            # This is a simplification - real implementation needs answer key
-            earned = (result.percentage / 100) * total_questions * points
-            max_pts = total_questions * points
-            pct = result.percentage  # Same as overall for now
-            
-            SubjectResult.objects.create(
-                result=result,
-                subject_split=split,
-                earned_points=earned,
-                max_points=max_pts,
-                percentage=pct,
-                question_results=json.dumps({}),  # Would need answer key
-            )
+        # Stream the results in chunks; only the overall percentage is needed
+        results = exam.results.select_related(None).only('id', 'percentage').iterator(
+            chunk_size=RECALCULATE_CHUNK_SIZE
+        )
+        while chunk := list(islice(results, RECALCULATE_CHUNK_SIZE)):
+            subject_results = []
+            for result in chunk:
+                share = float(result.percentage) / 100
+                for split, max_pts in split_max_points:
+                    # For now, use prorated score based on overall percentage
+                    # This is a simplification - real implementation needs answer key
+                    earned = share * max_pts
+                    pct = result.percentage  # Same as overall for now
+                    
+                    subject_results.append(SubjectResult(
+                        result=result,
+                        subject_split=split,
+                        earned_points=round(earned, 2),
+                        max_points=max_pts,
+                        percentage=pct,
+                        question_results={},  # Would need answer key
+                    ))
+            SubjectResult.objects.bulk_create(subject_results, batch_size=1000)
+    
+    # bulk_create sends no post_save, so drop cached analytics explicitly
+    from analytics.utils import AnalyticsHelper
+    AnalyticsHelper.bump_cache_generation()
 
 
-@login_required
 @teacher_or_admin_required
 def delete_exam_view(request, pk):
     """Delete a ZipGrade exam."""
@@ -515,7 +474,16 @@ def delete_exam_view(request, pk):
     return render(request, 'zipgrade/exam_confirm_delete.html', context)
 
 
-@login_required
+def _is_unresolved(result):
+    """Whether a result still counts towards its exam's unknown_students."""
+    return (
+        result.is_unknown
+        and result.student_id is None
+        and not result.manual_first_name
+        and not result.manual_last_name
+    )
+
+
 @teacher_or_admin_required
 def edit_unknown_student_view(request, pk):
     """Edit unknown student's manual name or link to existing student."""
@@ -527,6 +495,7 @@ def edit_unknown_student_view(request, pk):
         manual_last_name = request.POST.get('manual_last_name', '').strip()
         manual_class_name = request.POST.get('manual_class_name', '').strip()
         link_student_id = request.POST.get('link_student', '').strip()
+        was_unresolved = _is_unresolved(result)
         
         result.manual_first_name = manual_first_name
         result.manual_last_name = manual_last_name
@@ -540,18 +509,18 @@ def edit_unknown_student_view(request, pk):
             except (MasterStudent.DoesNotExist, ValueError):
                 pass
         
-        result.save()
+        # Only the link and manual name fields change here; post_save still runs for cache invalidation
+        result.save(update_fields=[
+            'student', 'is_unknown', 'manual_first_name', 'manual_last_name', 'manual_class_name',
+        ])
         
-        # Update unknown count if student is now known
-        if result.student or result.manual_first_name or result.manual_last_name:
-            unknown_count = exam.results.filter(
-                is_unknown=True, 
-                student__isnull=True, 
-                manual_first_name='', 
-                manual_last_name=''
-            ).count()
-            exam.unknown_students = unknown_count
-            exam.save()
+        # Adjust the unknown count in the database only when this result changed side
+        is_unresolved = _is_unresolved(result)
+        if is_unresolved != was_unresolved:
+            ZipGradeExam.objects.filter(pk=exam.pk).update(
+                unknown_students=F('unknown_students') + (1 if is_unresolved else -1),
+                updated_at=timezone.now(),
+            )
         
         messages.success(request, _('Student information updated successfully.'))
         return redirect('zipgrade:exam_detail', pk=exam.pk)